@@ -25,22 +25,23 @@ class BaseAgent(ABC):
         self.max_iterations = max_iterations
         self.confidence_threshold = confidence_threshold
         self.current_iteration = 0
+        self._dispatch = {
+            AnalysisState.OBSERVING: self.observe,
+            AnalysisState.DECIDING: self.decide,
+            AnalysisState.ACTING: self.act,
+            AnalysisState.EVALUATING: self.evaluate,
+        }
         
     async def run(self) -> Dict[str, Any]:
         """Main agent execution loop"""
-        logger.info(f"Starting analysis for {self.ticker}")
+        logger.info("Starting analysis for %s", self.ticker)
         
         while self.state != AnalysisState.CONCLUDED and self.current_iteration < self.max_iterations:
-            logger.info(f"Iteration {self.current_iteration + 1}, State: {self.state.value}")
+            logger.info("Iteration %d, State: %s", self.current_iteration + 1, self.state.value)
             
-            if self.state == AnalysisState.OBSERVING:
-                await self.observe()
-            elif self.state == AnalysisState.DECIDING:
-                await self.decide()
-            elif self.state == AnalysisState.ACTING:
-                await self.act()
-            elif self.state == AnalysisState.EVALUATING:
-                await self.evaluate()
+            handler = self._dispatch.get(self.state)
+            if handler:
+                await handler()
                 
             self.current_iteration += 1
             
@@ -1,95 +1,351 @@
 """
 Direct SEC Filing Analyzer
 Simple RAG-based analysis without CrewAI complexity
-Supports streaming progress updates via generator
+Supports streaming progress updates via async generator
 """
 
 import os
 import sys
-from typing import Dict, Any, Generator, Optional
+import asyncio
+import contextlib
+import functools
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Any, AsyncGenerator, Awaitable, Callable, List, Optional, Tuple, Type
 from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:  # Optional speedup, not available on Windows
+    uvloop = None
+
 load_dotenv()
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from rag.pinecone_rag import SECFilingRAG
+from rag.query_cache import ExactCache, SemanticCache, SingleFlight
+from services.file_cache import FileCache
+from services.retry import retry_transient
+
+logger = logging.getLogger(__name__)
+
+# Shared across analyzer instances - the API creates one analyzer per request
+_exact_cache = ExactCache()
+_semantic_cache = SemanticCache()
+_inflight = SingleFlight()
+
+# Caps concurrent OpenAI/Pinecone calls process-wide. A threading semaphore rather
+# than asyncio.Semaphore because each analysis runs on its own event loop.
+_provider_slots = threading.BoundedSemaphore(8)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_rag() -> SECFilingRAG:
+    """Lazily create the process-wide RAG client (keeps Pinecone/OpenAI connections warm)"""
+    return SECFilingRAG()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_structured_llm(schema: Type[BaseModel]):
+    """Structured-output runnable for a schema, built once per schema"""
+    return _get_llm().with_structured_output(schema)
+
+
+# Model behind the report and the structured extractions
+REPORT_MODEL = "gpt-4o-mini"
+
+
+@functools.lru_cache(maxsize=None)
+def _get_llm() -> ChatOpenAI:
+    """Lazily create the process-wide report LLM client"""
+    return ChatOpenAI(
+        model=REPORT_MODEL,
+        temperature=0.2,
+        api_key=os.getenv("OPENAI_API_KEY")
+    )
+
+
+class FinancialMetrics(BaseModel):
+    """Key financial metrics extracted from a filing in a single LLM call"""
+    revenue: str = Field(description="Total revenue or net sales")
+    net_income: str = Field(description="Net income")
+    gross_margin: str = Field(description="Gross profit and gross margin percentage")
+    operating_income: str = Field(description="Operating income")
+    cash: str = Field(description="Total cash and cash equivalents")
+    debt: str = Field(description="Total debt")
+    eps: str = Field(description="Earnings per share (EPS)")
+
+
+@dataclass(slots=True)
+class SectionResult:
+    """Output of one extraction step (financials, risks or business)"""
+    summary: str = ""
+    details: Dict[str, str] = field(default_factory=dict)
+    sources: List[str] = field(default_factory=list)
+
+
+class BusinessInfo(BaseModel):
+    """Business overview extracted from a filing in a single LLM call"""
+    description: str = Field(description="The company's business description")
+    products: str = Field(description="Main products and services")
+    competition: str = Field(description="Main competitors")
+
+
+# Search queries for each section - one retrieval pass per section
+_FINANCIALS_SEARCH = "revenue, net income, gross margin, operating income, cash and cash equivalents, total debt, earnings per share"
+_BUSINESS_SEARCH = "business description, main products and services, competitors and competition"
+_RISKS_QUESTION = "What are the top 5 most important risk factors?"
+_SECTION_QUERIES = [_FINANCIALS_SEARCH, _RISKS_QUESTION, _BUSINESS_SEARCH]
+
+# Display labels for the financial summary, e.g. net_income -> "Net Income"
+_FINANCIAL_LABELS = {name: name.replace('_', ' ').title() for name in FinancialMetrics.model_fields}
+
+_EXTRACTION_TEMPLATE = """You are an expert financial analyst. Using ONLY the context below from {ticker}'s SEC filing,
+fill in every requested field.
+
+IMPORTANT INSTRUCTIONS:
+1. Extract the EXACT numbers from financial tables, including dollar amounts, percentages, and dates.
+2. Cite the SEC section where you found each value (e.g., "From Item 7 - MD&A").
+3. If a value cannot be found in the context, answer "I cannot find this information in the filing."
+
+Context from SEC Filing:
+{context}"""
+
+_REPORT_TEMPLATE = """You are an expert financial analyst. Create a comprehensive investment report for {ticker} based on the following extracted information from their SEC filing.
+
+## Financial Metrics
+{financial_summary}
+
+## Risk Factors
+{risk_summary}
+
+## Business Description
+{business_description}
+
+## Products and Services
+{products}
+
+## Competition
+{competition}
+
+---
+
+Create a well-structured investment report with these sections:
+
+1. **Executive Summary** (2-3 paragraphs summarizing the company and key metrics)
+
+2. **Financial Highlights**
+   - Present the key financial metrics in a clear format
+   - Include specific numbers from the data above
+
+3. **Business Overview**
+   - Describe the business model
+   - List key products/services
+   - Note competitive position
+
+4. **Risk Assessment**
+   - Summarize the top risks
+   - Rate each as High/Medium/Low impact
+
+5. **Key Takeaways**
+   - 5-7 bullet points for investors
+
+Use the ACTUAL NUMBERS from the financial metrics. Be specific and cite the data provided."""
+
+# The static template bytes are hashed once; report cache keys only encode the dynamic fields
+_REPORT_TEMPLATE_HASH = hashlib.sha256(_REPORT_TEMPLATE.encode("utf-8"))
+
+
+def _report_cache_key(fields: Dict[str, Any]) -> Tuple[str, str]:
+    """Cache key for a report - the prompt is fully determined by the template and its fields"""
+    digest = _REPORT_TEMPLATE_HASH.copy()
+    for value in fields.values():
+        digest.update(str(value).encode("utf-8"))
+        digest.update(b"\0")
+    return ("report", digest.hexdigest())
+
+
+# Retrieval tuning: chunks scoring below this fraction of the best match are left out
+# of the LLM context, and single-question lookups start with a small top_k
+_MIN_RELATIVE_SCORE = 0.8
+_INITIAL_TOP_K = 3
+
+# Progress events emitted by analyze_with_progress: step -> (progress, message template)
+_PROGRESS_STEPS = {
+    "indexing": (10, "Indexing {ticker} filing..."),
+    "indexed": (25, "Indexed {chunks} chunks"),
+    "extracting": (35, "Extracting financials, risks and business model..."),
+    "extracted": (85, "Financial, risk and business analysis complete"),
+    "report": (90, "Generating comprehensive report..."),
+    "report_streaming": (90, "Writing report..."),
+}
+
+
+def _progress(step: str, **fields) -> Dict[str, Any]:
+    """Build a progress event, formatting only the dynamic parts of its message"""
+    progress, message = _PROGRESS_STEPS[step]
+    return {
+        "step": step,
+        "progress": progress,
+        "message": message.format_map(fields) if fields else message
+    }
+
+
+def _filing_digest(filing_text: str) -> str:
+    """Content hash of a filing; computed once per analysis"""
+    return hashlib.sha256(filing_text.encode("utf-8")).hexdigest()
+
+
+def _filing_key(ticker: str, digest: str) -> str:
+    """Identify a filing by its content - the analyzer indexes every filing as 'latest'"""
+    return f"{ticker}:{digest}"
+
+
+# Completed analyses are persisted so re-uploading an identical filing skips indexing,
+# retrieval and report generation entirely. Keys include the model and the prompt
+# templates, so changing either starts fresh instead of replaying stale reports.
+RESULT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+_result_cache = FileCache("analysis_results", RESULT_CACHE_TTL_SECONDS)
+_RESULT_KEY_PREFIX = ":".join([
+    REPORT_MODEL,
+    hashlib.sha256(_EXTRACTION_TEMPLATE.encode("utf-8")).hexdigest(),
+    _REPORT_TEMPLATE_HASH.hexdigest(),
+])
+
+
+def _result_key(ticker: str, filing_type: str, digest: str) -> str:
+    """Cache key of the persisted result for a filing: model, prompts, ticker, type and content hash"""
+    return f"{_RESULT_KEY_PREFIX}:{ticker}:{filing_type}:{digest}"
+
+
+async def _call_provider(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking OpenAI/Pinecone call on a worker thread, retrying transient errors"""
+    def call():
+        with _provider_slots:
+            return retry_transient(fn)(*args, **kwargs)
+
+    return await asyncio.to_thread(call)
+
+
+@contextlib.asynccontextmanager
+async def _provider_slot():
+    """Hold one of the process-wide provider slots without blocking the event loop"""
+    acquire = asyncio.ensure_future(asyncio.to_thread(_provider_slots.acquire))
+    try:
+        await asyncio.shield(acquire)
+    except asyncio.CancelledError:
+        # The worker thread still gets the slot; hand it back once it does
+        acquire.add_done_callback(lambda _: _provider_slots.release())
+        raise
+    try:
+        yield
+    finally:
+        _provider_slots.release()
+
+
+def _run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    asyncio.run() refuses to start inside a running event loop (e.g. when
+    called from a FastAPI endpoint), so in that case the coroutine gets its
+    own loop on a worker thread.
+    """
+    run = uvloop.run if uvloop is not None else asyncio.run
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(run, coro).result()
 
 
 class DirectSECAnalyzer:
     """Direct RAG-based SEC filing analyzer - fast and reliable"""
 
+    # Chunks per embedding request when indexing a filing
+    INDEX_BATCH_SIZE = 128
+
     def __init__(self):
-        self.rag = SECFilingRAG()
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.2,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self.rag = _get_rag()
+        self.llm = _get_llm()
+        self._exact_cache = _exact_cache
+        self._semantic_cache = _semantic_cache
+        self._inflight = _inflight
 
-    def analyze_with_progress(self, filing_text: str, ticker: str, filing_type: str = "10-K") -> Generator[Dict[str, Any], None, None]:
+    async def analyze_with_progress(self, filing_text: str, ticker: str, filing_type: str = "10-K") -> AsyncGenerator[Dict[str, Any], None]:
         """
         Analyze with streaming progress updates.
         Yields progress events, final event contains full result.
         """
         try:
+            digest = _filing_digest(filing_text)
+            filing_key = _filing_key(ticker, digest)
+
+            # Identical filing analyzed before - replay the stored result, once the
+            # filing is back in Pinecone if it was deleted or overwritten since
+            result_key = _result_key(ticker, filing_type, digest)
+            cached = await asyncio.to_thread(_result_cache.get, result_key)
+
             # Step 1: Index the filing
-            yield {"step": "indexing", "progress": 10, "message": f"Indexing {ticker} filing..."}
+            if cached is None or not await self._holds_filing(ticker, filing_type, digest):
+                yield _progress("indexing", ticker=ticker)
 
-            index_result = self.rag.index_filing(
-                filing_text=filing_text,
-                ticker=ticker,
-                filing_type=filing_type,
-                filing_date="latest"
-            )
+                index_result = await self._aindex(filing_text, ticker, filing_type, digest)
 
-            if not index_result.get("success"):
+                if not index_result.get("success"):
+                    yield {
+                        "step": "error",
+                        "progress": 100,
+                        "error": f"Failed to index filing: {index_result.get('error')}"
+                    }
+                    return
+
+                yield _progress("indexed", chunks=index_result.get('chunks_indexed', 0))
+
+            if cached is not None:
                 yield {
-                    "step": "error",
+                    "step": "complete",
                     "progress": 100,
-                    "error": f"Failed to index filing: {index_result.get('error')}"
+                    "message": "Analysis complete (cached)",
+                    "result": cached
                 }
                 return
 
-            chunks_indexed = index_result.get('chunks_indexed', 0)
-            yield {"step": "indexed", "progress": 25, "message": f"Indexed {chunks_indexed} chunks"}
-
-            # Step 2: Extract financial metrics
-            yield {"step": "financials", "progress": 35, "message": "Extracting financial metrics..."}
-            financials = self._extract_financials(ticker)
-            yield {"step": "financials_done", "progress": 50, "message": "Financial metrics extracted"}
-
-            # Step 3: Extract risks
-            yield {"step": "risks", "progress": 55, "message": "Analyzing risk factors..."}
-            risks = self._extract_risks(ticker)
-            yield {"step": "risks_done", "progress": 70, "message": "Risk analysis complete"}
-
-            # Step 4: Extract business info
-            yield {"step": "business", "progress": 75, "message": "Analyzing business model..."}
-            business = self._extract_business(ticker)
-            yield {"step": "business_done", "progress": 85, "message": "Business analysis complete"}
+            # Steps 2-4: Extract financials, risks and business info concurrently
+            # (they finish together, so a single event reports all three)
+            yield _progress("extracting")
+            financials, risks, business = await self._extract_sections(ticker, filing_key)
+            yield _progress("extracted")
 
             # Step 5: Generate report
-            yield {"step": "report", "progress": 90, "message": "Generating comprehensive report..."}
-            report = self._generate_report(ticker, financials, risks, business)
+            yield _progress("report")
+            report_parts = []
+            report_length = 0
+            async for delta in self._stream_report(ticker, financials, risks, business):
+                report_parts.append(delta)
+                report_length += len(delta)
+                event = _progress("report_streaming")
+                event["progress"] += min(9, report_length // 500)
+                event["delta"] = delta
+                yield event
+            report = "".join(report_parts)
 
             # Final result
+            result = self._build_result(ticker, filing_type, report, financials, risks, business)
+            await asyncio.to_thread(_result_cache.put, result_key, result)
             yield {
                 "step": "complete",
                 "progress": 100,
                 "message": "Analysis complete",
-                "result": {
-                    "success": True,
-                    "ticker": ticker,
-                    "filing_type": filing_type,
-                    "analysis": report,
-                    "metrics": financials.get("metrics", {}),
-                    "sections": {
-                        "financials": financials,
-                        "risks": risks,
-                        "business": business
-                    }
-                }
+                "result": result
             }
 
         except Exception as e:
@@ -99,7 +355,7 @@ class DirectSECAnalyzer:
                 "error": str(e)
             }
 
-    def analyze(self, filing_text: str, ticker: str, filing_type: str = "10-K") -> Dict[str, Any]:
+    async def analyze(self, filing_text: str, ticker: str, filing_type: str = "10-K") -> Dict[str, Any]:
         """
         Analyze an SEC filing using direct RAG queries
 
@@ -111,153 +367,334 @@ class DirectSECAnalyzer:
         Returns:
             Dictionary with analysis results
         """
-        print(f"Indexing {ticker} filing...")
+        digest = _filing_digest(filing_text)
+        result_key = _result_key(ticker, filing_type, digest)
+        cached = await asyncio.to_thread(_result_cache.get, result_key)
 
-        # Step 1: Index the filing
-        index_result = self.rag.index_filing(
-            filing_text=filing_text,
-            ticker=ticker,
-            filing_type=filing_type,
-            filing_date="latest"
-        )
+        # Step 1: Index the filing; a stored result still needs it in Pinecone for
+        # follow-up questions, and it may have been deleted or overwritten since
+        if cached is None or not await self._holds_filing(ticker, filing_type, digest):
+            logger.info("Indexing %s filing...", ticker)
 
-        if not index_result.get("success"):
-            return {
-                "success": False,
-                "ticker": ticker,
-                "error": f"Failed to index filing: {index_result.get('error')}"
-            }
+            index_result = await self._aindex(filing_text, ticker, filing_type, digest)
 
-        print(f"Indexed {index_result.get('chunks_indexed', 0)} chunks")
+            if not index_result.get("success"):
+                return {
+                    "success": False,
+                    "ticker": ticker,
+                    "error": f"Failed to index filing: {index_result.get('error')}"
+                }
 
-        # Step 2: Query for each analysis section
-        print("Extracting financial metrics...")
-        financials = self._extract_financials(ticker)
+            logger.info("Indexed %d chunks", index_result.get('chunks_indexed', 0))
 
-        print("Analyzing risks...")
-        risks = self._extract_risks(ticker)
+        if cached is not None:
+            logger.info("Reusing stored analysis for identical %s filing", ticker)
+            return cached
 
-        print("Analyzing business...")
-        business = self._extract_business(ticker)
+        # Step 2: Query all analysis sections concurrently
+        filing_key = _filing_key(ticker, digest)
+        logger.info("Extracting financials, risks and business info...")
+        financials, risks, business = await self._extract_sections(ticker, filing_key)
 
         # Step 3: Generate comprehensive report
-        print("Generating report...")
-        report = self._generate_report(ticker, financials, risks, business)
+        logger.info("Generating report...")
+        report = await self._generate_report(ticker, financials, risks, business)
+
+        result = self._build_result(ticker, filing_type, report, financials, risks, business)
+        await asyncio.to_thread(_result_cache.put, result_key, result)
+        return result
 
+    @staticmethod
+    def _build_result(ticker: str, filing_type: str, report: str, financials: SectionResult,
+                      risks: SectionResult, business: SectionResult) -> Dict[str, Any]:
+        """Assemble the final analysis result"""
         return {
             "success": True,
             "ticker": ticker,
             "filing_type": filing_type,
             "analysis": report,
-            "metrics": financials.get("metrics", {}),
+            "metrics": financials.details,
             "sections": {
-                "financials": financials,
-                "risks": risks,
-                "business": business
+                "financials": asdict(financials),
+                "risks": asdict(risks),
+                "business": asdict(business)
             }
         }
 
-    def _extract_financials(self, ticker: str) -> Dict[str, Any]:
-        """Extract key financial metrics"""
-        queries = [
-            ("revenue", "What is the total revenue or net sales?"),
-            ("net_income", "What is the net income?"),
-            ("gross_margin", "What is the gross profit and gross margin percentage?"),
-            ("operating_income", "What is the operating income?"),
-            ("cash", "What is the total cash and cash equivalents?"),
-            ("debt", "What is the total debt?"),
-            ("eps", "What is the earnings per share (EPS)?"),
-        ]
-
-        metrics = {}
-        details = []
-
-        for metric_name, query in queries:
-            result = self.rag.query(query, ticker, top_k=5)
-            if result.get("success"):
-                answer = result.get("answer", "")
-                metrics[metric_name] = answer
-                details.append(f"**{metric_name.replace('_', ' ').title()}**: {answer}")
+    async def analyze_many(self, filings: List[Tuple[str, str, str]],
+                           max_concurrency: int = 20) -> List[Dict[str, Any]]:
+        """
+        Analyze several filings concurrently through the shared RAG and LLM clients
 
-        return {
-            "metrics": metrics,
-            "summary": "\n".join(details)
-        }
+        Args:
+            filings: (filing_text, ticker, filing_type) tuples
+            max_concurrency: Maximum number of filings analyzed at once
 
-    def _extract_risks(self, ticker: str) -> Dict[str, Any]:
-        """Extract key risk factors"""
-        result = self.rag.query(
-            "What are the top 5 most important risk factors?",
-            ticker,
-            top_k=8
+        Returns:
+            One analysis result per filing, in input order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def analyze_one(filing_text: str, ticker: str, filing_type: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self.analyze(filing_text, ticker, filing_type)
+                except Exception as e:
+                    return {
+                        "success": False,
+                        "ticker": ticker,
+                        "error": str(e)
+                    }
+
+        return await asyncio.gather(*[analyze_one(*filing) for filing in filings])
+
+    async def _aindex(self, filing_text: str, ticker: str, filing_type: str, digest: str) -> Dict[str, Any]:
+        """Index the filing with concurrent embedding requests, keeping the event loop free"""
+        return await self.rag.index_filing_async(
+            filing_text=filing_text,
+            ticker=ticker,
+            filing_type=filing_type,
+            filing_date="latest",
+            batch_size=self.INDEX_BATCH_SIZE,
+            source=digest
         )
 
-        return {
-            "summary": result.get("answer", "Risk information not available"),
-            "sections": result.get("sections_searched", [])
-        }
+    async def _holds_filing(self, ticker: str, filing_type: str, digest: str) -> bool:
+        """Whether the 'latest' vectors in Pinecone are still this filing's"""
+        try:
+            return await asyncio.to_thread(self.rag.holds_filing, ticker, filing_type, "latest", digest)
+        except Exception as e:
+            logger.warning("Could not check the index for %s, re-indexing: %s", ticker, e)
+            return False
 
-    def _extract_business(self, ticker: str) -> Dict[str, Any]:
-        """Extract business description and strategy"""
-        queries = [
-            ("description", "What is the company's business description?"),
-            ("products", "What are the main products and services?"),
-            ("competition", "Who are the main competitors?"),
-        ]
+    async def _section_embeddings(self) -> Dict[str, List[float]]:
+        """
+        Embeddings of the fixed section queries.
 
-        details = {}
-        for key, query in queries:
-            result = self.rag.query(query, ticker, top_k=5)
-            if result.get("success"):
-                details[key] = result.get("answer", "")
+        The queries never change, so they are embedded together in one API
+        call and reused by every analysis in the process.
+        """
+        async def embed():
+            vectors = await _call_provider(self.rag.embed_queries, _SECTION_QUERIES)
+            return dict(zip(_SECTION_QUERIES, vectors))
+
+        cached = self._exact_cache.get("section_embeddings")
+        if cached is None:
+            cached = await self._inflight.run("section_embeddings", embed)
+            self._exact_cache.put("section_embeddings", cached)
+        return cached
+
+    async def _cache_lookup(self, filing_key: str, query: str,
+                            embedding: Optional[List[float]] = None) -> Tuple[Optional[Any], Optional[List[float]]]:
+        """
+        Look up a query already answered for this filing.
 
-        return details
+        Tries an exact match first (no embedding needed), then a semantically
+        equivalent query. Returns (cached value or None, query embedding) so a
+        miss can be stored afterwards. `embedding` skips embedding the query.
+        """
+        cached = self._exact_cache.get((filing_key, query))
+        if cached is not None:
+            return cached, embedding
+
+        if embedding is None:
+            embedding = await _call_provider(self.rag.embed_question, query)
+        cached = self._semantic_cache.get(filing_key, embedding)
+        if cached is not None:
+            self._exact_cache.put((filing_key, query), cached)
+        return cached, embedding
+
+    def _cache_store(self, filing_key: str, query: str, embedding: List[float], value: Any):
+        """Remember a freshly computed answer in both cache tiers"""
+        self._exact_cache.put((filing_key, query), value)
+        self._semantic_cache.put(filing_key, embedding, value)
+
+    async def _cached(self, filing_key: str, query: str, compute: Callable[[], Awaitable[Any]],
+                      embedding: Optional[List[float]] = None) -> Any:
+        """
+        Serve `query` for this filing from cache, or compute it.
 
-    def _generate_report(self, ticker: str, financials: Dict, risks: Dict, business: Dict) -> str:
-        """Generate a comprehensive analysis report"""
-        prompt = f"""You are an expert financial analyst. Create a comprehensive investment report for {ticker} based on the following extracted information from their SEC filing.
+        Concurrent callers asking the same query (e.g. two users analyzing the
+        same filing) share one in-flight computation. None results are not cached.
+        """
+        async def lookup_or_compute():
+            cached, embedding_used = await self._cache_lookup(filing_key, query, embedding)
+            if cached is not None:
+                return cached
+
+            result = await compute()
+            if result is not None:
+                self._cache_store(filing_key, query, embedding_used, result)
+            return result
+
+        return await self._inflight.run((filing_key, query), lookup_or_compute)
+
+    async def _aquery(self, question: str, ticker: str, top_k: int, filing_key: str,
+                      embedding: List[float]) -> Dict[str, Any]:
+        """Run a blocking RAG query on a worker thread so queries can overlap"""
+        async def query():
+            result = await _call_provider(
+                self.rag.query_by_embedding, question, embedding, ticker, top_k=top_k,
+                initial_top_k=_INITIAL_TOP_K, min_relative_score=_MIN_RELATIVE_SCORE
+            )
+            return result if result.get("success") else None
+
+        result = await self._cached(filing_key, question, query, embedding)
+        return result or {"success": False, "answer": None}
+
+    async def _extract_sections(self, ticker: str, filing_key: str) -> Tuple[SectionResult, SectionResult, SectionResult]:
+        """Extract financials, risks and business info in parallel - they are independent until the report"""
+        embeddings = await self._section_embeddings()
+        financials, risks, business = await asyncio.gather(
+            self._extract_financials(ticker, filing_key, embeddings[_FINANCIALS_SEARCH]),
+            self._extract_risks(ticker, filing_key, embeddings[_RISKS_QUESTION]),
+            self._extract_business(ticker, filing_key, embeddings[_BUSINESS_SEARCH])
+        )
+        return financials, risks, business
+
+    async def _aretrieve(self, embedding: List[float], ticker: str, top_k: int) -> Dict[str, Any]:
+        """Run a blocking RAG retrieval (no LLM answer) on a worker thread"""
+        # Combined multi-metric searches need breadth, so only the weak tail is pruned
+        return await _call_provider(
+            self.rag.retrieve_by_embedding, embedding, ticker, top_k=top_k,
+            min_relative_score=_MIN_RELATIVE_SCORE
+        )
 
-## Financial Metrics
-{financials.get('summary', 'No financial data available')}
+    async def _extract_structured(self, schema: Type[BaseModel], search_query: str, ticker: str,
+                                  top_k: int, filing_key: str, embedding: List[float]) -> Optional[BaseModel]:
+        """
+        Answer every field of `schema` with one retrieval pass and one LLM call.
 
-## Risk Factors
-{risks.get('summary', 'No risk data available')}
+        Returns None if nothing relevant is indexed for the ticker or the call fails.
+        """
+        return await self._cached(
+            filing_key,
+            search_query,
+            lambda: self._extract_structured_uncached(schema, embedding, ticker, top_k),
+            embedding
+        )
 
-## Business Description
-{business.get('description', 'No description available')}
+    async def _extract_structured_uncached(self, schema: Type[BaseModel], embedding: List[float],
+                                           ticker: str, top_k: int) -> Optional[BaseModel]:
+        retrieval = await self._aretrieve(embedding, ticker, top_k)
+        if not retrieval.get("success"):
+            return None
 
-## Products and Services
-{business.get('products', 'No product information available')}
+        prompt = _EXTRACTION_TEMPLATE.format_map({"ticker": ticker, "context": retrieval["context"]})
 
-## Competition
-{business.get('competition', 'No competition information available')}
+        try:
+            result = await _call_provider(_get_structured_llm(schema).invoke, prompt)
+        except Exception as e:
+            logger.warning("Structured extraction failed for %s: %s", schema.__name__, e)
+            return None
 
----
+        return result
 
-Create a well-structured investment report with these sections:
+    async def _extract_financials(self, ticker: str, filing_key: str, embedding: List[float]) -> SectionResult:
+        """Extract key financial metrics"""
+        result = await self._extract_structured(
+            FinancialMetrics,
+            _FINANCIALS_SEARCH,
+            ticker,
+            top_k=15,
+            filing_key=filing_key,
+            embedding=embedding
+        )
 
-1. **Executive Summary** (2-3 paragraphs summarizing the company and key metrics)
+        metrics = result.model_dump() if result else {}
+        summary = "\n".join(
+            f"**{_FINANCIAL_LABELS[metric_name]}**: {answer}"
+            for metric_name, answer in metrics.items()
+        )
 
-2. **Financial Highlights**
-   - Present the key financial metrics in a clear format
-   - Include specific numbers from the data above
+        return SectionResult(summary=summary, details=metrics)
 
-3. **Business Overview**
-   - Describe the business model
-   - List key products/services
-   - Note competitive position
+    async def _extract_risks(self, ticker: str, filing_key: str, embedding: List[float]) -> SectionResult:
+        """Extract key risk factors"""
+        result = await self._aquery(
+            _RISKS_QUESTION,
+            ticker,
+            top_k=8,
+            filing_key=filing_key,
+            embedding=embedding
+        )
 
-4. **Risk Assessment**
-   - Summarize the top risks
-   - Rate each as High/Medium/Low impact
+        return SectionResult(
+            summary=result.get("answer") or "Risk information not available",
+            sources=result.get("sections_searched", [])
+        )
 
-5. **Key Takeaways**
-   - 5-7 bullet points for investors
+    async def _extract_business(self, ticker: str, filing_key: str, embedding: List[float]) -> SectionResult:
+        """Extract business description and strategy"""
+        result = await self._extract_structured(
+            BusinessInfo,
+            _BUSINESS_SEARCH,
+            ticker,
+            top_k=10,
+            filing_key=filing_key,
+            embedding=embedding
+        )
 
-Use the ACTUAL NUMBERS from the financial metrics. Be specific and cite the data provided."""
+        return SectionResult(details=result.model_dump() if result else {})
 
-        response = self.llm.invoke(prompt)
-        return response.content
+    def _report_fields(self, ticker: str, financials: SectionResult, risks: SectionResult,
+                       business: SectionResult) -> Dict[str, Any]:
+        """Values substituted into the report template"""
+        return {
+            "ticker": ticker,
+            "financial_summary": financials.summary or 'No financial data available',
+            "risk_summary": risks.summary or 'No risk data available',
+            "business_description": business.details.get('description', 'No description available'),
+            "products": business.details.get('products', 'No product information available'),
+            "competition": business.details.get('competition', 'No competition information available'),
+        }
+
+    async def _generate_report(self, ticker: str, financials: SectionResult, risks: SectionResult,
+                               business: SectionResult) -> str:
+        """Generate a comprehensive analysis report"""
+        fields = self._report_fields(ticker, financials, risks, business)
+        cache_key = _report_cache_key(fields)
+        cached = self._exact_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        prompt = _REPORT_TEMPLATE.format_map(fields)
+
+        async def generate():
+            async with _provider_slot():
+                response = await retry_transient(self.llm.ainvoke)(prompt)
+            self._exact_cache.put(cache_key, response.content)
+            return response.content
+
+        return await self._inflight.run(cache_key, generate)
+
+    async def _stream_report(self, ticker: str, financials: SectionResult, risks: SectionResult,
+                             business: SectionResult) -> AsyncGenerator[str, None]:
+        """Generate the report, yielding text chunks as the LLM produces them"""
+        fields = self._report_fields(ticker, financials, risks, business)
+        cache_key = _report_cache_key(fields)
+        cached = self._exact_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        prompt = _REPORT_TEMPLATE.format_map(fields)
+
+        async def start():
+            # Transient errors surface on the first chunk; once text has been yielded it can't be retried
+            stream = self.llm.astream(prompt)
+            return stream, await anext(stream, None)
+
+        parts = []
+        async with _provider_slot():
+            stream, chunk = await retry_transient(start)()
+            while chunk is not None:
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+                chunk = await anext(stream, None)
+
+        self._exact_cache.put(cache_key, "".join(parts))
 
 
 # For backward compatibility with the API
@@ -268,4 +705,7 @@ class SECAnalysisCrew:
         self.analyzer = DirectSECAnalyzer()
 
     def analyze(self, filing_text: str, ticker: str, filing_type: str = "10-K") -> Dict[str, Any]:
-        return self.analyzer.analyze(filing_text, ticker, filing_type)
+        return _run_sync(self.analyzer.analyze(filing_text, ticker, filing_type))
+
+    def analyze_many(self, filings: List[Tuple[str, str, str]], max_concurrency: int = 20) -> List[Dict[str, Any]]:
+        return _run_sync(self.analyzer.analyze_many(filings, max_concurrency))
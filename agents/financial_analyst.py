@@ -10,16 +10,154 @@ Now uses the proper data pipeline:
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional
+import operator
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from dataclasses import dataclass, fields
+from typing import Dict, Any, List, Optional, Tuple
 from agents.base_agent import BaseAgent, AnalysisState
 from services.metric_extractor import MetricExtractor
 from services.cerebras_search_service import CerebrasSearchService
 from tools.sec_downloader import SECDownloaderTool
 from rag.pinecone_rag import SECFilingRAG
+from rag.index_registry import IndexRegistry
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Positive signals in investigation findings - one case-insensitive pass per findings blob
+_OPPORTUNITY_RE = re.compile(r'growth|expansion|increasing|opportunity|market leader', re.IGNORECASE)
+
+# Metrics observe() extracts: (metric_name, is_required)
+_METRICS_TO_EXTRACT = (
+    ('revenue', True),
+    ('net_income', True),
+    ('operating_margin', False),
+    ('gross_margin', False),
+    ('revenue_growth', True),
+    ('eps', False),
+    ('total_debt', False),
+    ('cash', False),
+    ('roe', False),
+)
+_METRIC_NAMES = [metric_name for metric_name, _ in _METRICS_TO_EXTRACT]
+
+
+@dataclass(slots=True)
+class ObservedMetrics:
+    """Numeric metric values from observe(); None means the metric was not found (not zero)."""
+    revenue: Optional[float] = None
+    net_income: Optional[float] = None
+    operating_margin: Optional[float] = None
+    gross_margin: Optional[float] = None
+    revenue_growth: Optional[float] = None
+    eps: Optional[float] = None
+    total_debt: Optional[float] = None
+    cash: Optional[float] = None
+    roe: Optional[float] = None
+
+    @classmethod
+    def from_observations(cls, observations: Dict[str, Any]) -> "ObservedMetrics":
+        return cls(**{
+            f.name: observations[f.name]['value']
+            for f in fields(cls)
+            if f.name in observations
+        })
+
+
+# Insight headings per investigation area (others use the area name)
+_INSIGHT_LABELS = {
+    'profitability': 'Profitability Analysis',
+    'growth': 'Growth Drivers',
+    'margins': 'Margin Analysis',
+    'leverage': 'Debt Analysis',
+}
+
+# _generate_recommendation() rules in priority order: (predicate over its signals, recommendation).
+# The first rule that holds wins.
+_RECOMMENDATIONS = [
+    (lambda s: s['confidence'] < 0.4,
+     "HOLD - Insufficient data for strong conviction"),
+    (lambda s: s['high_risk_count'] >= 2,
+     "SELL - Multiple significant risk factors identified"),
+    (lambda s: s['net_income'] < 0 and s['revenue_growth'] < 0,
+     "SELL - Unprofitable with declining revenue"),
+    (lambda s: s['revenue_growth'] > 15 and s['operating_margin'] > 15,
+     "BUY - Strong growth with healthy margins"),
+    (lambda s: s['revenue_growth'] > 10 and s['net_income'] > 0,
+     "BUY - Positive growth trajectory with profitability"),
+    (lambda s: s['opportunity_count'] > s['high_risk_count'] + 1,
+     "BUY - Opportunities outweigh risks"),
+    (lambda s: s['high_risk_count'] > s['opportunity_count'],
+     "SELL - Risks outweigh opportunities"),
+]
+_DEFAULT_RECOMMENDATION = "HOLD - Balanced risk/reward profile"
+
+# Investigation query per decision reason; formatted once per agent with its ticker
+_DECISION_QUERIES = {
+    'negative_net_income': "Why is {ticker} unprofitable? What are the main cost drivers?",
+    'declining_revenue': "Why is {ticker} revenue declining? Is this a strategic pivot or market issue?",
+    'strong_growth': "What is driving {ticker}'s strong revenue growth? Is it sustainable?",
+    'low_margins': "Why does {ticker} have low operating margins? What is the industry average?",
+    'high_debt': "Is {ticker}'s debt level sustainable? What are the covenant risks?",
+    'standard_analysis': "What is {ticker}'s competitive position and market share?",
+}
+
+# decide() thresholds (growth and margins in percent)
+NET_INCOME_FLOOR = 0
+REVENUE_DECLINE_PCT = -10
+STRONG_GROWTH_PCT = 20
+LOW_MARGIN_PCT = 5
+MAX_DEBT_TO_CASH = 3
+
+# decide() rules: (metric, comparison, threshold, area, reason, severity).
+# A missing (None) or zero metric never triggers a rule, as in the original if-chain.
+_DECISION_RULES = [
+    ('net_income', operator.lt, NET_INCOME_FLOOR, 'profitability', 'negative_net_income', 'high'),
+    ('revenue_growth', operator.lt, REVENUE_DECLINE_PCT, 'revenue', 'declining_revenue', 'high'),
+    ('revenue_growth', operator.gt, STRONG_GROWTH_PCT, 'growth', 'strong_growth', 'low'),
+    ('operating_margin', operator.lt, LOW_MARGIN_PCT, 'margins', 'low_margins', 'medium'),
+]
+
+
+# Process-wide RAG clients and extractors, shared by every agent and keyed by the RAG
+# config fingerprint so a changed embedding model gets fresh instances
+_shared_lock = threading.Lock()
+_shared_rag: Dict[str, SECFilingRAG] = {}
+_shared_extractors: Dict[str, MetricExtractor] = {}
+
+
+def _get_shared_rag() -> SECFilingRAG:
+    """
+    Return the process-wide SECFilingRAG, creating it on first use.
+
+    Its semantic answer cache is on, at the similarity MetricExtractor uses for its own RAG,
+    so metric questions from the shared extractor reuse near-identical earlier answers.
+    """
+    fingerprint = SECFilingRAG.config_fingerprint()
+    with _shared_lock:
+        if fingerprint not in _shared_rag:
+            _shared_rag[fingerprint] = SECFilingRAG(
+                semantic_cache=True,
+                answer_similarity=MetricExtractor.ANSWER_SIMILARITY
+            )
+        return _shared_rag[fingerprint]
+
+
+def _get_shared_metric_extractor() -> MetricExtractor:
+    """Return the process-wide MetricExtractor bound to the shared RAG."""
+    rag = _get_shared_rag()
+    fingerprint = SECFilingRAG.config_fingerprint()
+    with _shared_lock:
+        if fingerprint not in _shared_extractors:
+            _shared_extractors[fingerprint] = MetricExtractor(rag_instance=rag)
+        return _shared_extractors[fingerprint]
+
 
 class FinancialAnalystAgent(BaseAgent):
     """
@@ -33,62 +171,183 @@ class FinancialAnalystAgent(BaseAgent):
     5. CONCLUDE: Generate investment recommendation
     """
 
+    # Max Pinecone searches in flight during batched metric extraction
+    METRIC_CONCURRENCY = 5
+
+    # Max investigations in flight at once (each is a RAG query + market search)
+    INVESTIGATION_CONCURRENCY = 4
+
+    # Findings kept in memory per action; longer findings are spilled to disk in full
+    FINDINGS_SUMMARY_CHARS = 2048
+
+    # Max insights / opportunities reported in the conclusion
+    MAX_SUMMARY_ITEMS = 5
+
     def __init__(self, ticker: str, filing_type: str = "10-K", **kwargs):
         super().__init__(ticker, **kwargs)
         self.filing_type = filing_type
         self.downloader = SECDownloaderTool()
         self.rag = None  # Lazy initialization
         self.metric_extractor = None  # Lazy initialization
-        self.cerebras = CerebrasSearchService()
+        self._cerebras: Optional[CerebrasSearchService] = None  # Lazy initialization
         self.filing_data = None
+        self.metrics = ObservedMetrics()
+        self._queries = {reason: query.format(ticker=ticker) for reason, query in _DECISION_QUERIES.items()}
+        self._spill_dir: Optional[str] = None
+        # Decisions before this index have already been investigated by act()
+        self._acted_index = 0
+        # Running sum of actions_taken confidences, so evaluate() doesn't rescan every iteration
+        self._action_confidence_sum = 0.0
+        # Areas evaluate() has already queued a follow-up for
+        self._followed_up: set = set()
+        # _format_metrics() result; reset whenever observe() updates observations
+        self._formatted_metrics: Optional[Dict[str, Any]] = None
+        # (actions_taken snapshot, _summarize_actions() result); reset whenever act() adds actions
+        self._summary_cache: Optional[Tuple[Tuple[int, ...], Tuple[List[str], List[str], List[str]]]] = None
+        self.index_registry = IndexRegistry(SECFilingRAG.config_fingerprint())
+
+    @property
+    def cerebras(self) -> CerebrasSearchService:
+        """Market search client, created on first use so runs that never reach act() skip it"""
+        if self._cerebras is None:
+            self._cerebras = CerebrasSearchService()
+        return self._cerebras
+
+    @classmethod
+    async def analyze_batch(cls, tickers: List[str], filing_type: str = "10-K",
+                            concurrency: int = 8, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Analyze several tickers concurrently, each with its own agent.
+
+        Agents share the process-wide RAG client and metric extractor, and
+        EDGAR downloads stay within the shared rate limit.
+
+        Args:
+            tickers: Stock tickers to analyze
+            filing_type: 10-K or 10-Q
+            concurrency: Maximum number of agents running at once
+            **kwargs: Passed to each agent (e.g. max_iterations)
+
+        Returns:
+            One conclude() result per ticker, in input order
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def analyze_one(ticker: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await cls(ticker, filing_type=filing_type, **kwargs).run()
+                except Exception as e:
+                    logger.error("Analysis failed for %s: %s", ticker, e)
+                    return {
+                        'ticker': ticker,
+                        'status': 'failed',
+                        'error': str(e),
+                        'recommendation': 'UNABLE TO ANALYZE',
+                        'confidence': 0.0
+                    }
+
+        return await asyncio.gather(*[analyze_one(ticker) for ticker in tickers])
 
     def _get_rag(self) -> SECFilingRAG:
-        """Lazy initialization of RAG."""
+        """Lazy initialization of RAG (shared across agents)."""
         if self.rag is None:
-            self.rag = SECFilingRAG()
+            self.rag = _get_shared_rag()
         return self.rag
 
+    def _spill(self, text: str) -> str:
+        """Write full findings text to this agent's temp directory and return its id."""
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="sec-analyst-")
+            weakref.finalize(self, shutil.rmtree, self._spill_dir, ignore_errors=True)
+
+        findings_id = uuid.uuid4().hex
+        with open(os.path.join(self._spill_dir, f"{findings_id}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        return findings_id
+
+    def load_findings(self, action: Dict[str, Any]) -> str:
+        """Full findings text for an action (only the summary is kept in memory)."""
+        if action.get('findings_id') is None:
+            return action['findings_summary']
+        with open(os.path.join(self._spill_dir, f"{action['findings_id']}.txt"), "r", encoding="utf-8") as f:
+            return f.read()
+
     def _get_metric_extractor(self) -> MetricExtractor:
-        """Lazy initialization of MetricExtractor."""
+        """Lazy initialization of MetricExtractor (shared across agents)."""
         if self.metric_extractor is None:
-            self.metric_extractor = MetricExtractor(rag_instance=self._get_rag())
+            self.metric_extractor = _get_shared_metric_extractor()
         return self.metric_extractor
 
+    async def _still_indexed(self, cached: Dict[str, Any], accession_number: str) -> bool:
+        """Whether a registry hit's vectors are still in Pinecone (the namespace may have been deleted)"""
+        try:
+            return await asyncio.to_thread(
+                self._get_rag().holds_filing,
+                self.ticker, self.filing_type, cached.get('filing_date', 'unknown'), accession_number
+            )
+        except Exception as e:
+            logger.warning("Could not check the index for %s, re-indexing: %s", self.ticker, e)
+            return False
+
     async def _download_and_index_filing(self) -> bool:
         """
         Step 1: Download SEC filing and index in Pinecone.
         This must happen before any metric extraction.
+
+        Skipped when the latest filing (by accession number) is already indexed.
         """
-        logger.info(f"Downloading {self.filing_type} for {self.ticker}...")
+        # Cheap submissions lookup to see whether the latest filing is already indexed
+        latest = await asyncio.to_thread(self.downloader.get_latest_filing_metadata, self.ticker, self.filing_type)
+        if latest and latest.get('accession_number'):
+            cached = self.index_registry.get(self.ticker, self.filing_type, latest['accession_number'])
+            if cached is not None and await self._still_indexed(cached, latest['accession_number']):
+                self.filing_data = cached
+                logger.info("%s %s for %s already indexed, skipping download",
+                            self.filing_type, latest['accession_number'], self.ticker)
+                return True
 
-        # Download filing
-        self.filing_data = self.downloader._run(self.ticker, self.filing_type)
+        logger.info("Downloading %s for %s...", self.filing_type, self.ticker)
+
+        # Download filing over aiohttp; PDF/HTML parsing runs on a worker thread
+        self.filing_data = await self.downloader._arun(self.ticker, self.filing_type)
 
         if not self.filing_data.get('success'):
-            logger.error(f"Failed to download filing: {self.filing_data.get('error')}")
+            logger.error("Failed to download filing: %s", self.filing_data.get('error'))
             return False
 
-        logger.info(f"Downloaded {self.filing_data.get('full_text_length', 0)} chars")
-        logger.info(f"Company: {self.filing_data.get('company_name')}")
-        logger.info(f"Filing Date: {self.filing_data.get('filing_date')}")
+        logger.info("Downloaded %d chars", self.filing_data.get('full_text_length', 0))
+        logger.info("Company: %s", self.filing_data.get('company_name'))
+        logger.info("Filing Date: %s", self.filing_data.get('filing_date'))
 
         # Index in Pinecone
         logger.info("Indexing filing in Pinecone...")
         rag = self._get_rag()
-        index_result = rag.index_filing(
+        index_result = await asyncio.to_thread(
+            rag.index_filing,
             filing_text=self.filing_data['full_text'],
             ticker=self.ticker,
             filing_type=self.filing_type,
-            filing_date=self.filing_data.get('filing_date', 'unknown')
+            filing_date=self.filing_data.get('filing_date', 'unknown'),
+            batch_size=128,
+            source=self.filing_data.get('accession_number')
         )
 
         if not index_result.get('success'):
-            logger.error(f"Failed to index filing: {index_result.get('error')}")
+            logger.error("Failed to index filing: %s", index_result.get('error'))
             return False
 
-        logger.info(f"Indexed {index_result.get('chunks_indexed')} chunks")
-        logger.info(f"Tables preserved: {index_result.get('tables_preserved', 0)}")
-        logger.info(f"Sections: {index_result.get('sections_indexed', {})}")
+        logger.info("Indexed %s chunks", index_result.get('chunks_indexed'))
+        logger.info("Tables preserved: %s", index_result.get('tables_preserved', 0))
+        logger.info("Sections: %s", index_result.get('sections_indexed', {}))
+
+        if self.filing_data.get('accession_number'):
+            self.index_registry.put(
+                self.ticker,
+                self.filing_type,
+                self.filing_data['accession_number'],
+                {key: value for key, value in self.filing_data.items() if key != 'full_text'}
+            )
 
         return True
 
@@ -100,7 +359,7 @@ class FinancialAnalystAgent(BaseAgent):
         2. Extract key financial metrics using RAG
         3. Store observations for decision making
         """
-        logger.info(f"Observing {self.ticker}...")
+        logger.info("Observing %s...", self.ticker)
 
         # Step 1: Ensure filing is downloaded and indexed
         if self.filing_data is None:
@@ -115,26 +374,19 @@ class FinancialAnalystAgent(BaseAgent):
         logger.info("Extracting financial metrics via RAG...")
         extractor = self._get_metric_extractor()
 
-        # Define metrics to extract
-        metrics_to_extract = [
-            ('revenue', True),  # (metric_name, is_required)
-            ('net_income', True),
-            ('operating_margin', False),
-            ('gross_margin', False),
-            ('revenue_growth', True),
-            ('eps', False),
-            ('total_debt', False),
-            ('cash', False),
-            ('roe', False),
-        ]
-
         critical_metrics_found = 0
         failed_metrics = []
 
-        for metric_name, is_required in metrics_to_extract:
-            logger.info(f"  Extracting {metric_name}...")
-            result = extractor.extract_metric(metric_name, self.ticker)
+        # One batched embedding call, parallel searches and a single LLM extraction
+        results = await asyncio.to_thread(
+            extractor.extract_metrics_batch,
+            _METRIC_NAMES,
+            self.ticker,
+            max_workers=self.METRIC_CONCURRENCY
+        )
 
+        for metric_name, is_required in _METRICS_TO_EXTRACT:
+            result = results[metric_name]
             if result.get('success') and result.get('value') is not None:
                 self.observations[metric_name] = {
                     'value': result['value'],
@@ -142,24 +394,27 @@ class FinancialAnalystAgent(BaseAgent):
                     'confidence': result.get('confidence', 0.0),
                     'section': result.get('source_section', 'unknown')
                 }
-                logger.info(f"    {metric_name}: {result.get('raw_value')} (confidence: {result.get('confidence', 0):.2f})")
+                logger.info("    %s: %s (confidence: %.2f)",
+                            metric_name, result.get('raw_value'), result.get('confidence', 0))
 
                 if is_required:
                     critical_metrics_found += 1
             else:
                 failed_metrics.append(metric_name)
-                logger.warning(f"    {metric_name}: Not found")
+                logger.warning("    %s: Not found", metric_name)
 
         # Step 3: Validate we have enough data
         if critical_metrics_found < 2:
-            logger.error(f"Insufficient data: Only {critical_metrics_found} critical metrics found")
-            logger.error(f"Failed metrics: {failed_metrics}")
+            logger.error("Insufficient data: Only %d critical metrics found", critical_metrics_found)
+            logger.error("Failed metrics: %s", failed_metrics)
             self.state = AnalysisState.CONCLUDED
             self.confidence = 0.0
             self.failure_reason = f"insufficient_data: {', '.join(failed_metrics)}"
             return
 
-        logger.info(f"Successfully extracted {len(self.observations)} metrics")
+        self.metrics = ObservedMetrics.from_observations(self.observations)
+        self._formatted_metrics = None
+        logger.info("Successfully extracted %d metrics", len(self.observations))
         self.state = AnalysisState.DECIDING
 
     async def decide(self):
@@ -169,55 +424,27 @@ class FinancialAnalystAgent(BaseAgent):
         logger.info("Analyzing observations to decide investigations...")
 
         self.decisions = []
-
-        # Decision tree based on extracted metrics
-
-        # Check profitability
-        net_income = self.observations.get('net_income', {}).get('value', 0)
-        if net_income and net_income < 0:
-            self.decisions.append({
-                'area': 'profitability',
-                'reason': 'negative_net_income',
-                'severity': 'high',
-                'query': f"Why is {self.ticker} unprofitable? What are the main cost drivers?"
-            })
-
-        # Check revenue growth
-        revenue_growth = self.observations.get('revenue_growth', {}).get('value', 0)
-        if revenue_growth and revenue_growth < -10:
-            self.decisions.append({
-                'area': 'revenue',
-                'reason': 'declining_revenue',
-                'severity': 'high',
-                'query': f"Why is {self.ticker} revenue declining? Is this a strategic pivot or market issue?"
-            })
-        elif revenue_growth and revenue_growth > 20:
-            self.decisions.append({
-                'area': 'growth',
-                'reason': 'strong_growth',
-                'severity': 'low',
-                'query': f"What is driving {self.ticker}'s strong revenue growth? Is it sustainable?"
-            })
-
-        # Check margins
-        operating_margin = self.observations.get('operating_margin', {}).get('value', 0)
-        if operating_margin and operating_margin < 5:
-            self.decisions.append({
-                'area': 'margins',
-                'reason': 'low_margins',
-                'severity': 'medium',
-                'query': f"Why does {self.ticker} have low operating margins? What is the industry average?"
-            })
+        self._acted_index = 0
+        m = self.metrics
+
+        # Decision tree based on extracted metrics - single-metric thresholds first
+        for metric_name, compare, threshold, area, reason, severity in _DECISION_RULES:
+            value = getattr(m, metric_name)
+            if value and compare(value, threshold):
+                self.decisions.append({
+                    'area': area,
+                    'reason': reason,
+                    'severity': severity,
+                    'query': self._queries[reason]
+                })
 
         # Check debt levels
-        total_debt = self.observations.get('total_debt', {}).get('value', 0)
-        cash = self.observations.get('cash', {}).get('value', 0)
-        if total_debt and cash and total_debt > cash * 3:
+        if m.total_debt and m.cash and m.total_debt > m.cash * MAX_DEBT_TO_CASH:
             self.decisions.append({
                 'area': 'leverage',
                 'reason': 'high_debt',
                 'severity': 'medium',
-                'query': f"Is {self.ticker}'s debt level sustainable? What are the covenant risks?"
+                'query': self._queries['high_debt']
             })
 
         # If no red flags, do standard competitive analysis
@@ -226,12 +453,13 @@ class FinancialAnalystAgent(BaseAgent):
                 'area': 'competitive',
                 'reason': 'standard_analysis',
                 'severity': 'low',
-                'query': f"What is {self.ticker}'s competitive position and market share?"
+                'query': self._queries['standard_analysis']
             })
 
-        logger.info(f"Made {len(self.decisions)} investigation decisions")
-        for d in self.decisions:
-            logger.info(f"  - {d['area']} ({d['severity']}): {d['reason']}")
+        logger.info("Made %d investigation decisions", len(self.decisions))
+        if logger.isEnabledFor(logging.INFO):
+            for d in self.decisions:
+                logger.info("  - %s (%s): %s", d['area'], d['severity'], d['reason'])
 
         self.state = AnalysisState.ACTING
 
@@ -244,19 +472,32 @@ class FinancialAnalystAgent(BaseAgent):
         logger.info("Executing investigations...")
 
         rag = self._get_rag()
+        semaphore = asyncio.Semaphore(self.INVESTIGATION_CONCURRENCY)
+
+        async def investigate(decision: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                logger.info("  Investigating: %s...", decision['area'])
+
+                # Filing context via RAG and broader market context are independent;
+                # a failure in one is treated as "no response" instead of cancelling the other
+                rag_result, search_result = await asyncio.gather(
+                    asyncio.to_thread(
+                        rag.query,
+                        question=decision['query'],
+                        ticker=self.ticker,
+                        top_k=5,
+                        cache_key=decision['reason']
+                    ),
+                    self.cerebras.multi_angle_search(decision['query']),
+                    return_exceptions=True
+                )
 
-        for decision in self.decisions:
-            logger.info(f"  Investigating: {decision['area']}...")
-
-            # First, try to get more context from the filing via RAG
-            rag_result = rag.query(
-                question=decision['query'],
-                ticker=self.ticker,
-                top_k=5
-            )
-
-            # Then, do broader search for market context
-            search_result = await self.cerebras.multi_angle_search(decision['query'])
+            if isinstance(rag_result, Exception):
+                logger.warning("Filing query failed for %s: %s", decision['area'], rag_result)
+                rag_result = {}
+            if isinstance(search_result, Exception):
+                logger.warning("Market search failed for %s: %s", decision['area'], search_result)
+                search_result = {'confidence': 0.0}
 
             # Combine findings
             filing_context = rag_result.get('answer', '') if rag_result.get('success') else ''
@@ -264,15 +505,30 @@ class FinancialAnalystAgent(BaseAgent):
 
             combined_findings = f"From SEC Filing: {filing_context}\n\nMarket Context: {market_context}"
 
-            self.actions_taken.append({
+            # Keep a bounded summary in memory; the full text goes to disk
+            findings_id = None
+            if len(combined_findings) > self.FINDINGS_SUMMARY_CHARS:
+                findings_id = await asyncio.to_thread(self._spill, combined_findings)
+
+            return {
                 'decision': decision,
-                'findings': combined_findings,
+                'findings_summary': combined_findings[:self.FINDINGS_SUMMARY_CHARS],
+                'findings_id': findings_id,
                 'filing_sources': rag_result.get('sections_searched', []),
                 'market_sources': search_result.get('sources', []),
                 'confidence': search_result.get('confidence', 0.5)
-            })
+            }
+
+        # Only investigate decisions added since the last act() (e.g. evaluate() follow-ups)
+        pending = self.decisions[self._acted_index:]
+        self._acted_index = len(self.decisions)
 
-        logger.info(f"Completed {len(self.actions_taken)} investigations")
+        new_actions = await asyncio.gather(*[investigate(decision) for decision in pending])
+        self.actions_taken.extend(new_actions)
+        self._action_confidence_sum += sum(action['confidence'] for action in new_actions)
+        self._summary_cache = None
+
+        logger.info("Completed %d investigations", len(self.actions_taken))
         self.state = AnalysisState.EVALUATING
 
     async def evaluate(self):
@@ -284,28 +540,31 @@ class FinancialAnalystAgent(BaseAgent):
         # Calculate overall confidence
         if self.actions_taken:
             # Weight by number of metrics and investigation quality
-            metric_confidence = len(self.observations) / 9.0  # 9 possible metrics
-            investigation_confidences = [action['confidence'] for action in self.actions_taken]
-            avg_investigation_confidence = sum(investigation_confidences) / len(investigation_confidences)
+            metric_confidence = len(self.observations) / len(_METRICS_TO_EXTRACT)
+            avg_investigation_confidence = self._action_confidence_sum / len(self.actions_taken)
 
             self.confidence = 0.6 * metric_confidence + 0.4 * avg_investigation_confidence
         else:
-            self.confidence = len(self.observations) / 9.0
+            self.confidence = len(self.observations) / len(_METRICS_TO_EXTRACT)
 
-        logger.info(f"Overall confidence: {self.confidence:.1%}")
+        logger.info("Overall confidence: %.1f%%", self.confidence * 100)
 
         # Determine if we need more information
         if self.confidence < self.confidence_threshold and self.current_iteration < self.max_iterations - 1:
-            weak_areas = [
+            # Each weak area gets at most one follow-up, even if several actions on it were weak
+            # (dict keeps first-seen order so the same areas are picked on every run)
+            weak_areas = list(dict.fromkeys(
                 action['decision']['area']
                 for action in self.actions_taken
                 if action['confidence'] < self.confidence_threshold
-            ]
+                and action['decision']['area'] not in self._followed_up
+            ))[:2]  # Limit to 2 follow-ups
 
             if weak_areas:
-                logger.info(f"Need more information on: {weak_areas}")
+                logger.info("Need more information on: %s", weak_areas)
+                self._followed_up.update(weak_areas)
                 # Add follow-up investigations
-                for area in weak_areas[:2]:  # Limit to 2 follow-ups
+                for area in weak_areas:
                     self.decisions.append({
                         'area': area,
                         'reason': 'insufficient_data',
@@ -353,6 +612,11 @@ class FinancialAnalystAgent(BaseAgent):
         # Generate successful analysis
         logger.info("Generating final analysis...")
 
+        # One pass over actions_taken feeds insights, risks, opportunities and the recommendation
+        insights, action_risks, action_opportunities = self._summarize_actions()
+        risks = self._identify_risks(action_risks)
+        opportunities = self._identify_opportunities(action_opportunities)
+
         analysis = {
             'ticker': self.ticker,
             'status': 'success',
@@ -360,119 +624,105 @@ class FinancialAnalystAgent(BaseAgent):
             'filing_type': self.filing_type,
             'filing_date': self.filing_data.get('filing_date') if self.filing_data else None,
             'metrics': self._format_metrics(),
-            'insights': self._generate_insights(),
-            'risks': self._identify_risks(),
-            'opportunities': self._identify_opportunities(),
-            'recommendation': self._generate_recommendation(),
+            'insights': insights,
+            'risks': risks,
+            'opportunities': opportunities,
+            'recommendation': self._generate_recommendation(risks, opportunities),
             'confidence': self.confidence
         }
 
         return analysis
 
     def _format_metrics(self) -> Dict[str, Any]:
-        """Format extracted metrics for output."""
-        formatted = {}
-        for key, data in self.observations.items():
-            formatted[key] = {
-                'value': data['value'],
-                'display': data['raw'],
-                'confidence': data.get('confidence', 0),
-                'section': data.get('section', 'unknown')
+        """Format extracted metrics for output (built once per set of observations)."""
+        if self._formatted_metrics is None:
+            self._formatted_metrics = {
+                key: {
+                    'value': data['value'],
+                    'display': data['raw'],
+                    'confidence': data.get('confidence', 0),
+                    'section': data.get('section', 'unknown')
+                }
+                for key, data in self.observations.items()
             }
-        return formatted
+        return self._formatted_metrics
+
+    def _summarize_actions(self) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Single pass over actions_taken.
+
+        Returns:
+            (insights, action-based risks, action-based opportunities)
+        """
+        snapshot = tuple(id(action) for action in self.actions_taken)
+        if self._summary_cache is not None and self._summary_cache[0] == snapshot:
+            return self._summary_cache[1]
 
-    def _generate_insights(self) -> List[str]:
-        """Generate key insights from investigations."""
-        insights = []
+        insights, risks, opportunities = [], [], []
 
         for action in self.actions_taken:
-            area = action['decision']['area']
-            findings = action['findings']
-
-            # Truncate findings for display
-            findings_summary = findings[:300] + "..." if len(findings) > 300 else findings
-
-            if area == 'profitability':
-                insights.append(f"Profitability Analysis: {findings_summary}")
-            elif area == 'growth':
-                insights.append(f"Growth Drivers: {findings_summary}")
-            elif area == 'margins':
-                insights.append(f"Margin Analysis: {findings_summary}")
-            elif area == 'leverage':
-                insights.append(f"Debt Analysis: {findings_summary}")
-            else:
-                insights.append(f"{area.title()}: {findings_summary}")
+            decision = action['decision']
+            area = decision['area']
+            findings = action['findings_summary']
 
-        return insights[:5]
+            if len(insights) < self.MAX_SUMMARY_ITEMS:
+                # Truncate findings for display
+                findings_summary = findings[:300] + "..." if len(findings) > 300 else findings
+                insights.append(f"{_INSIGHT_LABELS.get(area, area.title())}: {findings_summary}")
 
-    def _identify_risks(self) -> List[str]:
-        """Identify key risks from analysis."""
-        risks = []
+            if decision['severity'] == 'high':
+                risks.append(f"{area.title()} Risk: {decision['reason'].replace('_', ' ')}")
 
-        for action in self.actions_taken:
-            if action['decision']['severity'] == 'high':
-                risks.append(
-                    f"{action['decision']['area'].title()} Risk: {action['decision']['reason'].replace('_', ' ')}"
-                )
+            # Only the first few opportunities are reported, so stop scanning findings after that
+            if len(opportunities) < self.MAX_SUMMARY_ITEMS and _OPPORTUNITY_RE.search(findings):
+                opportunities.append(f"Potential in {area}")
+
+        self._summary_cache = (snapshot, (insights, risks, opportunities))
+        return insights, risks, opportunities
+
+    def _identify_risks(self, action_risks: List[str]) -> List[str]:
+        """Identify key risks: high-severity investigations plus metric-based risks."""
+        risks = list(action_risks)
 
         # Add metric-based risks
-        if self.observations.get('revenue_growth', {}).get('value', 0) < 0:
+        m = self.metrics
+        if m.revenue_growth is not None and m.revenue_growth < 0:
             risks.append("Revenue Decline Risk: Negative revenue growth trend")
 
-        if self.observations.get('operating_margin', {}).get('value', 100) < 5:
+        if m.operating_margin is not None and m.operating_margin < 5:
             risks.append("Margin Pressure Risk: Low operating margins")
 
         return risks
 
-    def _identify_opportunities(self) -> List[str]:
-        """Identify opportunities from analysis."""
+    def _identify_opportunities(self, action_opportunities: List[str]) -> List[str]:
+        """Identify opportunities: metric-based signals plus positive investigation findings."""
         opportunities = []
 
         # Check for positive signals
-        revenue_growth = self.observations.get('revenue_growth', {}).get('value', 0)
-        if revenue_growth and revenue_growth > 15:
-            opportunities.append(f"Strong Growth: {revenue_growth:.1f}% revenue growth")
-
-        operating_margin = self.observations.get('operating_margin', {}).get('value', 0)
-        if operating_margin and operating_margin > 20:
-            opportunities.append(f"High Margins: {operating_margin:.1f}% operating margin")
+        m = self.metrics
+        if m.revenue_growth is not None and m.revenue_growth > 15:
+            opportunities.append(f"Strong Growth: {m.revenue_growth:.1f}% revenue growth")
+
+        if m.operating_margin is not None and m.operating_margin > 20:
+            opportunities.append(f"High Margins: {m.operating_margin:.1f}% operating margin")
+
+        opportunities.extend(action_opportunities[:self.MAX_SUMMARY_ITEMS - len(opportunities)])
+
+        return opportunities
+
+    def _generate_recommendation(self, risks: List[str], opportunities: List[str]) -> str:
+        """Generate BUY/HOLD/SELL recommendation from the identified risks and opportunities."""
+        # Key metrics (missing metrics fail every threshold, same as zero) and risk balance
+        signals = {
+            'confidence': self.confidence,
+            'revenue_growth': self.metrics.revenue_growth or 0,
+            'net_income': self.metrics.net_income or 0,
+            'operating_margin': self.metrics.operating_margin or 0,
+            'high_risk_count': sum(1 for r in risks if 'High' in r or 'Decline' in r),
+            'opportunity_count': len(opportunities),
+        }
 
-        # Check investigation findings for positive mentions
-        for action in self.actions_taken:
-            findings_lower = action['findings'].lower()
-            if any(word in findings_lower for word in ['growth', 'expansion', 'increasing', 'opportunity', 'market leader']):
-                opportunities.append(f"Potential in {action['decision']['area']}")
-
-        return opportunities[:5]
-
-    def _generate_recommendation(self) -> str:
-        """Generate BUY/HOLD/SELL recommendation."""
-        risks = self._identify_risks()
-        opportunities = self._identify_opportunities()
-
-        # Get key metrics
-        revenue_growth = self.observations.get('revenue_growth', {}).get('value', 0) or 0
-        net_income = self.observations.get('net_income', {}).get('value', 0) or 0
-        operating_margin = self.observations.get('operating_margin', {}).get('value', 0) or 0
-
-        # Decision logic
-        if self.confidence < 0.4:
-            return "HOLD - Insufficient data for strong conviction"
-
-        high_risk_count = sum(1 for r in risks if 'High' in r or 'Decline' in r)
-        opportunity_count = len(opportunities)
-
-        if high_risk_count >= 2:
-            return "SELL - Multiple significant risk factors identified"
-        elif net_income < 0 and revenue_growth < 0:
-            return "SELL - Unprofitable with declining revenue"
-        elif revenue_growth > 15 and operating_margin > 15:
-            return "BUY - Strong growth with healthy margins"
-        elif revenue_growth > 10 and net_income > 0:
-            return "BUY - Positive growth trajectory with profitability"
-        elif opportunity_count > high_risk_count + 1:
-            return "BUY - Opportunities outweigh risks"
-        elif high_risk_count > opportunity_count:
-            return "SELL - Risks outweigh opportunities"
-        else:
-            return "HOLD - Balanced risk/reward profile"
+        for predicate, recommendation in _RECOMMENDATIONS:
+            if predicate(signals):
+                return recommendation
+        return _DEFAULT_RECOMMENDATION
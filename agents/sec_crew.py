@@ -3,13 +3,15 @@ SEC Filing Analysis Crew
 Multi-agent system for analyzing SEC 10-K/10-Q filings using RAG
 """
 
+import hashlib
 import os
 import sys
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Type
 from crewai import Agent, Task, Crew, Process
 from crewai.tools import BaseTool
 from langchain_openai import ChatOpenAI
-from pydantic import Field
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,6 +19,10 @@ load_dotenv()
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from rag.pinecone_rag import SECFilingRAG
+from rag.index_registry import DEFAULT_REGISTRY_PATH, IndexRegistry
+
+# Kept apart from the analyst agent's registry so the two never overwrite each other's file
+CREW_REGISTRY_PATH = os.path.join(os.path.dirname(DEFAULT_REGISTRY_PATH), "crew_index_registry.json")
 
 
 class SECQueryTool(BaseTool):
@@ -40,18 +46,65 @@ class SECQueryTool(BaseTool):
             top_k=8  # Get more chunks for better context
         )
 
-        if not result.get("success"):
-            return f"Query failed: {result.get('error', 'Unknown error')}"
+        return _format_answer(result)
+
+
+def _format_answer(result: Dict[str, Any]) -> str:
+    """Turn a RAG query result into the text returned to an agent"""
+    if not result.get("success"):
+        return f"Query failed: {result.get('error', 'Unknown error')}"
+
+    # Return the answer - the RAG already processes and extracts info
+    answer = result.get("answer", "No answer found")
+
+    # Add section info
+    sections = result.get("sections_searched", [])
+    if sections:
+        answer += f"\n\n(Searched sections: {', '.join(sections)})"
+
+    return answer
+
+
+class SECBatchQueryInput(BaseModel):
+    """Input schema for the batched SEC query tool"""
+    queries: List[str] = Field(..., description="List of specific questions about the filing")
+
+
+class SECBatchQueryTool(BaseTool):
+    """Tool for agents to ask several questions about the filing in one call"""
+    name: str = "query_sec_filing_batch"
+    description: str = """Query the SEC filing with several questions at once.
+    Prefer this over query_sec_filing when you have more than one question.
+    Input should be a list of specific questions about the filing."""
+    args_schema: Type[BaseModel] = SECBatchQueryInput
+
+    rag: Any = Field(default=None, exclude=True)
+    ticker: str = Field(default="")
+
+    # Max Pinecone searches + answer generations in flight per batch
+    max_workers: int = Field(default=8)
 
-        # Return the answer - the RAG already processes and extracts info
-        answer = result.get("answer", "No answer found")
+    def _run(self, queries: List[str]) -> str:
+        """Embed all questions in one request, then answer them in parallel"""
+        if not self.rag:
+            return "Error: RAG system not initialized"
+        if not queries:
+            return "No queries provided"
 
-        # Add section info
-        sections = result.get("sections_searched", [])
-        if sections:
-            answer += f"\n\n(Searched sections: {', '.join(sections)})"
+        try:
+            embeddings = self.rag.embed_queries(queries)
+        except Exception as e:
+            return f"Query failed: {e}"
 
-        return answer
+        def answer(query: str, embedding: List[float]) -> str:
+            return _format_answer(self.rag.query_by_embedding(query, embedding, self.ticker, top_k=8))
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(queries))) as pool:
+            answers = list(pool.map(answer, queries, embeddings))
+
+        return "\n\n".join(
+            f"Q: {query}\nA: {text}" for query, text in zip(queries, answers)
+        )
 
 
 class SECAnalysisCrew:
@@ -66,33 +119,61 @@ class SECAnalysisCrew:
         self.rag = SECFilingRAG()
         self._ticker = ""
         self._filing_indexed = False
+        # Tools are built once and re-pointed at the current ticker on reuse
+        self._query_tool: Optional[SECQueryTool] = None
+        self._batch_query_tool: Optional[SECBatchQueryTool] = None
+        self.index_registry = IndexRegistry(SECFilingRAG.config_fingerprint(), path=CREW_REGISTRY_PATH)
 
     def _index_filing(self, filing_text: str, ticker: str, filing_type: str) -> bool:
-        """Index the filing in Pinecone for RAG queries"""
+        """Index the filing in Pinecone for RAG queries, skipping filings already indexed"""
+        # Filings are immutable once filed, so identical text means identical vectors - as long
+        # as the shared "latest" IDs still hold this filing (not deleted, not overwritten by another)
+        content_hash = hashlib.sha256(filing_text.encode("utf-8")).hexdigest()
         try:
+            if (self.index_registry.get(ticker, filing_type, content_hash) is not None
+                    and self.rag.holds_filing(ticker, filing_type, "latest", content_hash)):
+                print(f"{ticker} {filing_type} already indexed, skipping")
+                self._filing_indexed = True
+                return True
+
             result = self.rag.index_filing(
                 filing_text=filing_text,
                 ticker=ticker,
                 filing_type=filing_type,
-                filing_date="latest"
+                filing_date="latest",
+                source=content_hash
             )
             self._filing_indexed = result.get("success", False)
+            if self._filing_indexed:
+                self.index_registry.put(ticker, filing_type, content_hash, {
+                    "chunks_indexed": result.get("chunks_indexed", 0)
+                })
             return self._filing_indexed
         except Exception as e:
             print(f"Failed to index filing: {e}")
             return False
 
     def _create_query_tool(self) -> SECQueryTool:
-        """Create a query tool for agents to use"""
-        tool = SECQueryTool()
-        tool.rag = self.rag
-        tool.ticker = self._ticker
-        return tool
+        """Get the query tool for agents to use, bound to the current ticker"""
+        if self._query_tool is None:
+            self._query_tool = SECQueryTool()
+            self._query_tool.rag = self.rag
+        self._query_tool.ticker = self._ticker
+        return self._query_tool
+
+    def _create_batch_query_tool(self) -> SECBatchQueryTool:
+        """Get the batched query tool for agents to use, bound to the current ticker"""
+        if self._batch_query_tool is None:
+            self._batch_query_tool = SECBatchQueryTool()
+            self._batch_query_tool.rag = self.rag
+        self._batch_query_tool.ticker = self._ticker
+        return self._batch_query_tool
 
     def _create_agents(self) -> Dict[str, Agent]:
         """Create specialized agents for SEC analysis with RAG tools"""
 
         query_tool = self._create_query_tool()
+        batch_query_tool = self._create_batch_query_tool()
 
         financial_researcher = Agent(
             role="Financial Researcher",
@@ -100,11 +181,11 @@ class SECAnalysisCrew:
             backstory="""You are an expert financial analyst with 15+ years of experience
             analyzing SEC filings. You specialize in identifying key financial metrics,
             revenue trends, profit margins, and cash flow patterns.
-            IMPORTANT: Use the query_sec_filing tool to search for specific financial data.
-            Make multiple queries for: revenue, net income, gross margin, operating income,
-            cash flow, debt, and segment breakdowns.""",
+            IMPORTANT: Use the query_sec_filing_batch tool to search for specific financial data,
+            asking about revenue, net income, gross margin, operating income, cash flow, debt,
+            and segment breakdowns in a single call.""",
             llm=self.llm,
-            tools=[query_tool],
+            tools=[batch_query_tool, query_tool],
             verbose=True,
             allow_delegation=False
         )
@@ -113,12 +194,12 @@ class SECAnalysisCrew:
             role="Risk Analyst",
             goal="Identify and assess key risk factors using the query tool",
             backstory="""You are a senior risk analyst who specializes in evaluating
-            corporate risk disclosures. Use the query_sec_filing tool to search for
-            risk factors, legal proceedings, and material uncertainties.
+            corporate risk disclosures. Use the query_sec_filing_batch tool to search for
+            risk factors, legal proceedings, and material uncertainties in a single call.
             Query for: "risk factors", "legal proceedings", "material risks",
             "regulatory risks", "competition risks".""",
             llm=self.llm,
-            tools=[query_tool],
+            tools=[batch_query_tool, query_tool],
             verbose=True,
             allow_delegation=False
         )
@@ -127,12 +208,12 @@ class SECAnalysisCrew:
             role="Business Strategy Analyst",
             goal="Analyze business model and competitive position using the query tool",
             backstory="""You are a strategy consultant who analyzes companies' competitive
-            positions. Use the query_sec_filing tool to search for business description,
-            products, services, competition, and strategic initiatives.
+            positions. Use the query_sec_filing_batch tool to search for business description,
+            products, services, competition, and strategic initiatives in a single call.
             Query for: "business description", "products and services", "competition",
             "growth strategy", "market position".""",
             llm=self.llm,
-            tools=[query_tool],
+            tools=[batch_query_tool, query_tool],
             verbose=True,
             allow_delegation=False
         )
@@ -156,13 +237,19 @@ class SECAnalysisCrew:
             "report_writer": report_writer
         }
 
-    def _create_tasks(self, agents: Dict[str, Agent], ticker: str) -> list:
-        """Create analysis tasks for the crew - agents use RAG tool to query filing"""
+    def _create_tasks(self, agents: Dict[str, Agent], ticker: str) -> Dict[str, Task]:
+        """
+        Create analysis tasks for the crew, by name, in execution order - agents use RAG tool to query filing
+
+        The financial, risk and business tasks make disjoint queries, so they run
+        concurrently (async_execution); the synthesis task waits on all three
+        through its context.
+        """
 
         financial_task = Task(
             description=f"""Analyze the {ticker} SEC filing and extract SPECIFIC financial metrics.
 
-            USE THE query_sec_filing TOOL to search for financial data. Make these queries:
+            USE THE query_sec_filing_batch TOOL ONCE with all of these questions:
             1. "What is the total revenue and revenue growth?"
             2. "What is the net income and profit margin?"
             3. "What is the gross profit and gross margin?"
@@ -179,13 +266,14 @@ class SECAnalysisCrew:
             - Profitability metrics
             - Cash flow summary
             - All metrics must have REAL NUMBERS from the filing""",
-            agent=agents["financial_researcher"]
+            agent=agents["financial_researcher"],
+            async_execution=True
         )
 
         risk_task = Task(
             description=f"""Analyze the risk factors from the {ticker} SEC filing.
 
-            USE THE query_sec_filing TOOL to search for risks. Make these queries:
+            USE THE query_sec_filing_batch TOOL ONCE with all of these questions:
             1. "What are the main risk factors?"
             2. "What are the legal proceedings and litigation risks?"
             3. "What are the regulatory and compliance risks?"
@@ -197,13 +285,14 @@ class SECAnalysisCrew:
             - Top 5 material risks with categories
             - Impact assessment (High/Medium/Low) for each
             - Brief description of each risk""",
-            agent=agents["risk_analyst"]
+            agent=agents["risk_analyst"],
+            async_execution=True
         )
 
         business_task = Task(
             description=f"""Analyze the business strategy and competitive position of {ticker}.
 
-            USE THE query_sec_filing TOOL to search for business info. Make these queries:
+            USE THE query_sec_filing_batch TOOL ONCE with all of these questions:
             1. "What is the company's business description and model?"
             2. "What are the main products and services?"
             3. "Who are the main competitors?"
@@ -217,7 +306,8 @@ class SECAnalysisCrew:
             - Competitive advantages
             - Growth strategy highlights
             - Market position assessment""",
-            agent=agents["business_analyst"]
+            agent=agents["business_analyst"],
+            async_execution=True
         )
 
         synthesis_task = Task(
@@ -257,7 +347,12 @@ class SECAnalysisCrew:
             context=[financial_task, risk_task, business_task]
         )
 
-        return [financial_task, risk_task, business_task, synthesis_task]
+        return {
+            "financial": financial_task,
+            "risk": risk_task,
+            "business": business_task,
+            "synthesis": synthesis_task
+        }
 
     def analyze(self, filing_text: str, ticker: str, filing_type: str = "10-K") -> Dict[str, Any]:
         """
@@ -292,7 +387,7 @@ class SECAnalysisCrew:
         # Step 4: Run the crew
         crew = Crew(
             agents=list(agents.values()),
-            tasks=tasks,
+            tasks=list(tasks.values()),
             process=Process.sequential,
             verbose=True
         )
@@ -301,11 +396,18 @@ class SECAnalysisCrew:
             print(f"Starting multi-agent analysis for {ticker}...")
             result = crew.kickoff()
 
+            # Only the task outputs, not str(result), which drags in the whole agent trace;
+            # read from each task so adding or removing tasks can't shift them
+            outputs = {name: task.output.raw if task.output is not None else "" for name, task in tasks.items()}
+
             return {
                 "success": True,
                 "ticker": ticker,
                 "filing_type": filing_type,
-                "analysis": str(result),
+                "analysis": result.raw,
+                "financial": outputs["financial"],
+                "risk": outputs["risk"],
+                "business": outputs["business"],
                 "agents_used": list(agents.keys())
             }
         except Exception as e:
@@ -4,30 +4,63 @@ FastAPI backend for SEC filing analysis with multi-agent system
 """
 
 import os
+import re
 import json
 import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # Optional: faster SSE encoding
+    orjson = None
+
 load_dotenv()
 
 # Import our modules
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tools.sec_downloader import SECDownloaderTool
-from agents.direct_analyzer import SECAnalysisCrew, DirectSECAnalyzer  # Use direct analyzer instead of CrewAI
+from tools.sec_downloader import EDGAR_MAX_REQUESTS_PER_SECOND, download_filing, set_edgar_rate_limit
+from agents.direct_analyzer import DirectSECAnalyzer  # Use direct analyzer instead of CrewAI
 from rag.pinecone_rag import SECFilingRAG
+from rag.query_cache import SingleFlight
+from services.file_cache import FileCache
+from services.job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the RAG client before serving; stop the download workers on shutdown"""
+    try:
+        await asyncio.to_thread(lambda: get_rag().warmup())
+    except Exception as e:
+        # Missing API keys etc. surface on the first request instead of blocking startup
+        logger.warning("RAG warmup failed: %s", e)
+
+    yield
+
+    if get_download_pool.cache_info().currsize:
+        get_download_pool().shutdown(cancel_futures=True)
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="SEC Filing Analyzer",
     description="Multi-agent system for analyzing SEC 10-K/10-Q filings",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend
@@ -39,31 +72,111 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components (lazy initialization for RAG)
-downloader = SECDownloaderTool()
-_rag = None
+# Initialize components (lazy initialization for the analyzer and RAG)
+@functools.lru_cache(maxsize=1)
+def get_analyzer() -> DirectSECAnalyzer:
+    """Shared analyzer; it keeps no per-request state, so one instance serves every request"""
+    return DirectSECAnalyzer()
+
+
+def get_rag() -> SECFilingRAG:
+    """RAG client shared with the analyzer, created lazily to handle missing API keys gracefully"""
+    return get_analyzer().rag
+
+
+# Filing downloads run in worker processes: PDF/HTML text extraction is CPU-bound
+# and would otherwise hold the GIL the event loop and RAG threads need
+DOWNLOAD_PROCESSES = 2
+
+
+@functools.lru_cache(maxsize=1)
+def get_download_pool() -> ProcessPoolExecutor:
+    """Process pool for filing downloads, started on first use"""
+    return ProcessPoolExecutor(
+        max_workers=DOWNLOAD_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+        # Each worker gets an equal share so together they stay within EDGAR's limit
+        initializer=set_edgar_rate_limit,
+        initargs=(EDGAR_MAX_REQUESTS_PER_SECOND / DOWNLOAD_PROCESSES,)
+    )
+
 
-def get_rag():
-    """Lazy initialization of RAG to handle missing API keys gracefully"""
-    global _rag
-    if _rag is None:
-        _rag = SECFilingRAG()
-    return _rag
+async def fetch_filing(ticker: str, filing_type: str) -> Dict[str, Any]:
+    """Download and extract a filing in the worker process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_download_pool(), download_filing, ticker, filing_type)
 
-# In-memory storage for analysis jobs (use Redis in production)
-analysis_jobs: Dict[str, Dict[str, Any]] = {}
+
+# Analysis jobs; shared across workers via Redis when REDIS_URL is set, otherwise in-memory
+analysis_jobs = JobStore(os.getenv("REDIS_URL"))
+
+# Concurrent /analyze requests for the same (ticker, filing_type) share one pipeline run
+_inflight_analyses = SingleFlight()
+
+# /question answers reused for an hour; on disk so every worker shares them.
+# (/analyze results are persisted by the analyzer itself.)
+RESPONSE_CACHE_TTL_SECONDS = 3600
+question_cache = FileCache("api_question", RESPONSE_CACHE_TTL_SECONDS)
+
+
+async def forget_answers(ticker: str):
+    """Drop cached /question answers for a ticker whose indexed filing was deleted or may have been replaced"""
+    prefix = f"{ticker}|"
+    await asyncio.to_thread(question_cache.clear_where, lambda key: key.startswith(prefix))
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    """Encode one progress event as a Server-Sent Events data frame"""
+    if orjson is not None:
+        return b"data: " + orjson.dumps(event) + b"\n\n"
+    return f"data: {json.dumps(event, separators=(',', ':'))}\n\n".encode()
 
 
 # Request/Response Models
+TICKER_PATTERN = re.compile(r"^[A-Z0-9.-]{1,10}$")
+
+
+def _normalize_ticker(value: str) -> str:
+    """Uppercase a ticker and reject malformed ones (422) before any SEC/Pinecone call"""
+    ticker = value.strip().upper()
+    if not TICKER_PATTERN.match(ticker):
+        raise ValueError(f"Invalid ticker: {value!r}")
+    return ticker
+
+
+def ticker_query(ticker: str) -> str:
+    """Ticker query parameter, validated like the request bodies' tickers"""
+    try:
+        return _normalize_ticker(ticker)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 class AnalyzeRequest(BaseModel):
     ticker: str
     filing_type: str = "10-K"
 
+    @field_validator("ticker")
+    @classmethod
+    def normalize_ticker(cls, value: str) -> str:
+        return _normalize_ticker(value)
+
 
 class QuestionRequest(BaseModel):
     ticker: str
     question: str
 
+    @field_validator("ticker")
+    @classmethod
+    def normalize_ticker(cls, value: str) -> str:
+        return _normalize_ticker(value)
+
 
 class AnalysisResponse(BaseModel):
     job_id: str
@@ -94,55 +207,40 @@ async def run_analysis(job_id: str, ticker: str, filing_type: str):
     """Run the full analysis pipeline in background"""
     try:
         # Update status
-        analysis_jobs[job_id]["status"] = "downloading"
+        analysis_jobs.update(job_id, status="downloading")
 
-        # Step 1: Download filing
-        filing = downloader._run(ticker, filing_type)
+        # Step 1: Download filing (in a worker process, off the event loop)
+        filing = await fetch_filing(ticker, filing_type)
 
         if not filing.get("success"):
-            analysis_jobs[job_id]["status"] = "failed"
-            analysis_jobs[job_id]["error"] = filing.get("error", "Failed to download filing")
+            analysis_jobs.update(job_id, status="failed", error=filing.get("error", "Failed to download filing"))
             return
 
-        analysis_jobs[job_id]["filing_date"] = filing.get("filing_date")
-        analysis_jobs[job_id]["company_name"] = filing.get("company_name")
-        analysis_jobs[job_id]["filing_url"] = filing.get("filing_url")
-        analysis_jobs[job_id]["status"] = "indexing"
-
-        # Step 2: Index in Pinecone for RAG
-        index_result = get_rag().index_filing(
-            filing_text=filing["full_text"],
-            ticker=ticker,
-            filing_type=filing_type,
-            filing_date=filing.get("filing_date", "unknown")
+        analysis_jobs.update(
+            job_id,
+            filing_date=filing.get("filing_date"),
+            company_name=filing.get("company_name"),
+            filing_url=filing.get("filing_url"),
+            status="analyzing"
         )
 
-        if not index_result.get("success"):
-            analysis_jobs[job_id]["status"] = "failed"
-            analysis_jobs[job_id]["error"] = index_result.get("error", "Failed to index filing")
-            return
-
-        analysis_jobs[job_id]["chunks_indexed"] = index_result.get("chunks_indexed")
-        analysis_jobs[job_id]["status"] = "analyzing"
-
-        # Step 3: Run multi-agent analysis
-        crew = SECAnalysisCrew()
-        analysis_result = crew.analyze(
-            filing_text=filing["full_text"],
+        # Step 2: Index and analyze; the analyzer indexes the filing itself, so the
+        # text is chunked and embedded once and the response dict stops holding it
+        analysis_result = await get_analyzer().analyze(
+            filing_text=filing.pop("full_text"),
             ticker=ticker,
             filing_type=filing_type
         )
 
         if analysis_result.get("success"):
-            analysis_jobs[job_id]["status"] = "completed"
-            analysis_jobs[job_id]["analysis"] = analysis_result.get("analysis")
+            await forget_answers(ticker)
+            analysis_jobs.update(job_id, status="completed", analysis=analysis_result.get("analysis"))
         else:
-            analysis_jobs[job_id]["status"] = "failed"
-            analysis_jobs[job_id]["error"] = analysis_result.get("error", "Analysis failed")
+            analysis_jobs.update(job_id, status="failed", error=analysis_result.get("error", "Analysis failed"))
 
     except Exception as e:
-        analysis_jobs[job_id]["status"] = "failed"
-        analysis_jobs[job_id]["error"] = str(e)
+        logger.exception("Analysis job %s failed", job_id)
+        analysis_jobs.update(job_id, status="failed", error=str(e))
 
 
 # API Endpoints
@@ -164,11 +262,18 @@ async def analyze_filing(request: AnalyzeRequest):
     - **ticker**: Stock ticker symbol (e.g., AAPL, MSFT)
     - **filing_type**: 10-K (annual) or 10-Q (quarterly)
     """
-    ticker = request.ticker.upper()
+    ticker = request.ticker
+    return await _inflight_analyses.run(
+        (ticker, request.filing_type),
+        lambda: _analyze_filing(ticker, request.filing_type)
+    )
+
 
+async def _analyze_filing(ticker: str, filing_type: str) -> Dict[str, Any]:
+    """Download and analyze a filing, shaped for the frontend"""
     try:
-        # Step 1: Download filing
-        filing = downloader._run(ticker, request.filing_type)
+        # Step 1: Download filing (in a worker process, off the event loop)
+        filing = await fetch_filing(ticker, filing_type)
 
         if not filing.get("success"):
             raise HTTPException(
@@ -176,12 +281,11 @@ async def analyze_filing(request: AnalyzeRequest):
                 detail=filing.get("error", "Failed to download filing")
             )
 
-        # Step 2: Run multi-agent analysis
-        crew = SECAnalysisCrew()
-        analysis_result = crew.analyze(
+        # Step 2: Run multi-agent analysis (this also indexes the filing for RAG follow-up questions)
+        analysis_result = await get_analyzer().analyze(
             filing_text=filing["full_text"],
             ticker=ticker,
-            filing_type=request.filing_type
+            filing_type=filing_type
         )
 
         if not analysis_result.get("success"):
@@ -190,23 +294,12 @@ async def analyze_filing(request: AnalyzeRequest):
                 detail=analysis_result.get("error", "Analysis failed")
             )
 
-        # Step 3: Index in Pinecone for RAG (background)
-        try:
-            get_rag().index_filing(
-                filing_text=filing["full_text"],
-                ticker=ticker,
-                filing_type=request.filing_type,
-                filing_date=filing.get("filing_date", "unknown")
-            )
-        except Exception as e:
-            print(f"RAG indexing failed (non-critical): {e}")
+        await forget_answers(ticker)
 
-        # Return in format expected by frontend
+        # Canonical field names; the frontend's /api/analyze route maps them to its own types
         return {
             "ticker": ticker,
-            "companyName": filing.get("company_name", ticker),
             "company_name": filing.get("company_name", ticker),
-            "content": analysis_result.get("analysis", ""),
             "analysis": analysis_result.get("analysis", ""),
             "filing_date": filing.get("filing_date"),
             "filing_url": filing.get("filing_url"),
@@ -216,11 +309,12 @@ async def analyze_filing(request: AnalyzeRequest):
     except HTTPException:
         raise
     except Exception as e:
+        logger.exception("Analysis of %s %s failed", ticker, filing_type)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/analyze/stream")
-async def analyze_stream(ticker: str, filing_type: str = "10-K"):
+async def analyze_stream(ticker: str = Depends(ticker_query), filing_type: str = "10-K"):
     """
     SSE endpoint for streaming analysis progress.
 
@@ -229,105 +323,58 @@ async def analyze_stream(ticker: str, filing_type: str = "10-K"):
 
     Returns Server-Sent Events with progress updates.
     """
-    ticker = ticker.upper()
-
     async def generate_events():
         try:
             # Step 1: Download filing with progress
-            yield f"data: {json.dumps({'step': 'downloading', 'progress': 5, 'message': f'Downloading {ticker} {filing_type} from SEC EDGAR...'})}\n\n"
-            await asyncio.sleep(0)  # Flush
+            yield _sse({'step': 'downloading', 'progress': 5, 'message': f'Downloading {ticker} {filing_type} from SEC EDGAR...'})
 
-            # Run download in thread to not block
-            filing = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: downloader._run(ticker, filing_type)
-            )
+            # Run download in a worker process to not block
+            filing = await fetch_filing(ticker, filing_type)
 
             if not filing.get("success"):
-                yield f"data: {json.dumps({'step': 'error', 'progress': 100, 'error': filing.get('error', 'Failed to download filing')})}\n\n"
+                yield _sse({'step': 'error', 'progress': 100, 'error': filing.get('error', 'Failed to download filing')})
                 return
 
             company_name = filing.get("company_name", ticker)
-            yield f"data: {json.dumps({'step': 'downloaded', 'progress': 10, 'message': f'Downloaded {company_name} filing'})}\n\n"
-            await asyncio.sleep(0)  # Flush
-
-            # Step 2: Run streaming analysis in thread
-            analyzer = DirectSECAnalyzer()
-
-            # Create a queue for progress events
-            import queue
-            progress_queue = queue.Queue()
-            analysis_done = False
-            analysis_error = None
-
-            def run_analysis():
-                nonlocal analysis_done, analysis_error
-                try:
-                    for event in analyzer.analyze_with_progress(
-                        filing_text=filing["full_text"],
-                        ticker=ticker,
-                        filing_type=filing_type
-                    ):
-                        progress_queue.put(event)
-                except Exception as e:
-                    analysis_error = str(e)
-                finally:
-                    analysis_done = True
-
-            # Start analysis in background thread
-            import threading
-            analysis_thread = threading.Thread(target=run_analysis, daemon=True)
-            analysis_thread.start()
-
-            # Stream progress events as they come
-            while not analysis_done or not progress_queue.empty():
-                try:
-                    progress_event = progress_queue.get(timeout=0.5)
-
-                    # Transform result for frontend
-                    if progress_event.get("step") == "complete":
-                        result = progress_event.get("result", {})
-                        final_data = {
-                            "step": "complete",
-                            "progress": 100,
-                            "message": "Analysis complete",
-                            "result": {
-                                "ticker": ticker,
-                                "companyName": filing.get("company_name", ticker),
-                                "company_name": filing.get("company_name", ticker),
-                                "content": result.get("analysis", ""),
-                                "analysis": result.get("analysis", ""),
-                                "filing_date": filing.get("filing_date"),
-                                "filing_url": filing.get("filing_url"),
-                                "metrics": None
-                            }
-                        }
-                        yield f"data: {json.dumps(final_data)}\n\n"
-                    elif progress_event.get("step") == "error":
-                        yield f"data: {json.dumps(progress_event)}\n\n"
-                    else:
-                        yield f"data: {json.dumps(progress_event)}\n\n"
-
-                    await asyncio.sleep(0)  # Flush immediately
+            yield _sse({'step': 'downloaded', 'progress': 10, 'message': f'Downloaded {company_name} filing'})
 
-                except queue.Empty:
-                    await asyncio.sleep(0.1)
-                    continue
+            # Step 2: Run streaming analysis on the event loop
+            analyzer = get_analyzer()
 
-            # Check for errors
-            if analysis_error:
-                yield f"data: {json.dumps({'step': 'error', 'progress': 100, 'error': analysis_error})}\n\n"
+            async for progress_event in analyzer.analyze_with_progress(
+                filing_text=filing["full_text"],
+                ticker=ticker,
+                filing_type=filing_type
+            ):
+                # Transform result for frontend
+                if progress_event.get("step") == "complete":
+                    await forget_answers(ticker)
+                    result = progress_event.get("result", {})
+                    final_data = {
+                        "step": "complete",
+                        "progress": 100,
+                        "message": "Analysis complete",
+                        "result": {
+                            "ticker": ticker,
+                            "company_name": filing.get("company_name", ticker),
+                            "analysis": result.get("analysis", ""),
+                            "filing_date": filing.get("filing_date"),
+                            "filing_url": filing.get("filing_url"),
+                            "metrics": None
+                        }
+                    }
+                    yield _sse(final_data)
+                else:
+                    yield _sse(progress_event)
 
         except Exception as e:
-            yield f"data: {json.dumps({'step': 'error', 'progress': 100, 'error': str(e)})}\n\n"
+            logger.exception("Streaming analysis of %s %s failed", ticker, filing_type)
+            yield _sse({'step': 'error', 'progress': 100, 'error': str(e)})
 
     return StreamingResponse(
         generate_events(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
+        headers=SSE_HEADERS
     )
 
 
@@ -339,11 +386,21 @@ async def analyze_filing_async(request: AnalyzeRequest, background_tasks: Backgr
     - **ticker**: Stock ticker symbol (e.g., AAPL, MSFT)
     - **filing_type**: 10-K (annual) or 10-Q (quarterly)
     """
-    ticker = request.ticker.upper()
+    ticker = request.ticker
     job_id = f"{ticker}_{request.filing_type}"
 
+    # A job for the same filing that is still running is reused rather than started again
+    existing = analysis_jobs.get(job_id)
+    if existing is not None and existing["status"] not in ("completed", "failed"):
+        return AnalysisResponse(
+            job_id=job_id,
+            ticker=ticker,
+            status=existing["status"],
+            message=f"Analysis already in progress for {ticker} {request.filing_type}"
+        )
+
     # Initialize job
-    analysis_jobs[job_id] = {
+    analysis_jobs.create(job_id, {
         "ticker": ticker,
         "filing_type": request.filing_type,
         "status": "queued",
@@ -351,7 +408,7 @@ async def analyze_filing_async(request: AnalyzeRequest, background_tasks: Backgr
         "error": None,
         "filing_date": None,
         "company_name": None
-    }
+    })
 
     # Start background analysis
     background_tasks.add_task(run_analysis, job_id, ticker, request.filing_type)
@@ -367,10 +424,10 @@ async def analyze_filing_async(request: AnalyzeRequest, background_tasks: Backgr
 @app.get("/analysis/{job_id}", response_model=AnalysisResult)
 async def get_analysis(job_id: str):
     """Get the status/result of an analysis job"""
-    if job_id not in analysis_jobs:
+    job = analysis_jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = analysis_jobs[job_id]
     return AnalysisResult(
         ticker=job["ticker"],
         filing_type=job["filing_type"],
@@ -390,9 +447,15 @@ async def ask_question(request: QuestionRequest):
     - **ticker**: Stock ticker to query
     - **question**: Your question about the filing
     """
-    ticker = request.ticker.upper()
+    ticker = request.ticker
 
-    result = get_rag().query(
+    cache_key = f"{ticker}|{request.question}"
+    cached = await asyncio.to_thread(question_cache.get, cache_key)
+    if cached is not None:
+        return QuestionResponse(question=request.question, ticker=ticker, **cached)
+
+    result = await asyncio.to_thread(
+        get_rag().query,
         question=request.question,
         ticker=ticker
     )
@@ -403,12 +466,10 @@ async def ask_question(request: QuestionRequest):
             detail=result.get("error", "Failed to process question")
         )
 
-    return QuestionResponse(
-        question=request.question,
-        answer=result["answer"],
-        ticker=ticker,
-        sources=result.get("sources", [])
-    )
+    answer = {"answer": result["answer"], "sources": result.get("sources", [])}
+    await asyncio.to_thread(question_cache.put, cache_key, answer)
+
+    return QuestionResponse(question=request.question, ticker=ticker, **answer)
 
 
 @app.get("/suggested-questions/{ticker}")
@@ -431,7 +492,7 @@ async def list_jobs():
                 "status": job["status"],
                 "filing_type": job["filing_type"]
             }
-            for job_id, job in analysis_jobs.items()
+            for job_id, job in analysis_jobs.all().items()
         ]
     }
 
@@ -439,9 +500,11 @@ async def list_jobs():
 @app.delete("/filing/{ticker}")
 async def delete_filing(ticker: str):
     """Delete indexed data for a ticker"""
-    result = get_rag().delete_filing(ticker.upper())
+    ticker = ticker.upper()
+    result = get_rag().delete_filing(ticker)
     if not result.get("success"):
         raise HTTPException(status_code=400, detail=result.get("error"))
+    await forget_answers(ticker)
     return result
 
 
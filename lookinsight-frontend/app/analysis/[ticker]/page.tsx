@@ -12,13 +12,22 @@ import MarkdownDisplay from '@/components/MarkdownDisplay';
 import ComparisonTable from '@/components/ComparisonTable';
 import TextSelectionPopup from '@/components/TextSelectionPopup';
 
+// Analysis result as sent by the Python backend
+interface StreamResult {
+  ticker: string;
+  company_name: string;
+  analysis: string;
+  filing_date?: string;
+  filing_url?: string;
+}
+
 // Progress step type
 interface ProgressEvent {
   step: string;
   progress: number;
   message?: string;
   error?: string;
-  result?: AnalysisData;
+  result?: StreamResult;
 }
 
 export default function AnalysisPage() {
@@ -68,7 +77,12 @@ export default function AnalysisPage() {
         }
 
         if (data.step === 'complete' && data.result) {
-          setAnalysisData(data.result);
+          setAnalysisData({
+            ticker: data.result.ticker,
+            companyName: data.result.company_name,
+            analysisDate: new Date().toISOString(),
+            content: data.result.analysis,
+          });
           setAnalysisLoading(false);
           eventSource.close();
         } else if (data.step === 'error') {
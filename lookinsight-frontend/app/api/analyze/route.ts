@@ -43,22 +43,22 @@ export async function POST(request: NextRequest) {
     const data = await response.json();
     console.log(`🌐 [FRONTEND API] Python backend response data preview:`, {
       ticker: data.ticker,
-      companyName: data.companyName,
-      contentLength: data.content?.length || 0,
+      companyName: data.company_name,
+      contentLength: data.analysis?.length || 0,
       hasMetrics: !!data.metrics
     });
 
     // DETAILED CONSOLE LOGGING - Show full backend response
     console.log(`🔍 [FRONTEND API] COMPLETE BACKEND RESPONSE:`, data);
-    console.log(`📄 [FRONTEND API] CONTENT SAMPLE:`, data.content?.substring(0, 200) + '...');
+    console.log(`📄 [FRONTEND API] CONTENT SAMPLE:`, data.analysis?.substring(0, 200) + '...');
     console.log(`💰 [FRONTEND API] METRICS RECEIVED:`, data.metrics);
 
     // Transform the response to match our frontend types
     const transformedData = {
       ticker: ticker.toUpperCase(),
-      companyName: data.companyName || data.company_name || ticker,
+      companyName: data.company_name || ticker,
       analysisDate: new Date().toISOString(),
-      content: data.analysis || data.content || '',
+      content: data.analysis || '',
       metrics: data.metrics ? {
         revenue: data.metrics.revenue || '--',
         revenueGrowth: data.metrics.revenue_growth || '--',
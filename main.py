@@ -15,6 +15,11 @@ from typing import Dict, Any, Optional
 from agents.financial_analyst import FinancialAnalystAgent
 import logging
 
+try:
+    import uvloop
+except ImportError:  # Optional speedup, not available on Windows
+    uvloop = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -84,22 +89,25 @@ def print_analysis(analysis: Dict[str, Any]):
     if not analysis or analysis.get('status') == 'failed':
         return
 
-    print("\n" + "="*60)
-    print(f"ANALYSIS RESULTS: {analysis['ticker']}")
-    print("="*60)
+    # Collect the report and write it once instead of one print per line
+    lines = []
+
+    lines.append("\n" + "="*60)
+    lines.append(f"ANALYSIS RESULTS: {analysis['ticker']}")
+    lines.append("="*60)
 
     # Company info
     if analysis.get('company_name'):
-        print(f"\nCompany: {analysis['company_name']}")
+        lines.append(f"\nCompany: {analysis['company_name']}")
     if analysis.get('filing_date'):
-        print(f"Filing Date: {analysis['filing_date']}")
+        lines.append(f"Filing Date: {analysis['filing_date']}")
     if analysis.get('filing_type'):
-        print(f"Filing Type: {analysis['filing_type']}")
+        lines.append(f"Filing Type: {analysis['filing_type']}")
 
     # Metrics
-    print("\n" + "-"*40)
-    print("FINANCIAL METRICS")
-    print("-"*40)
+    lines.append("\n" + "-"*40)
+    lines.append("FINANCIAL METRICS")
+    lines.append("-"*40)
     metrics = analysis.get('metrics', {})
     if metrics:
         for key, data in metrics.items():
@@ -107,48 +115,48 @@ def print_analysis(analysis: Dict[str, Any]):
             confidence = data.get('confidence', 0)
             section = data.get('section', '')
             confidence_indicator = "[HIGH]" if confidence > 0.7 else "[MED]" if confidence > 0.4 else "[LOW]"
-            print(f"  {key.replace('_', ' ').title()}: {display_value} {confidence_indicator}")
+            lines.append(f"  {key.replace('_', ' ').title()}: {display_value} {confidence_indicator}")
     else:
-        print("  No metrics extracted")
+        lines.append("  No metrics extracted")
 
     # Insights
-    print("\n" + "-"*40)
-    print("KEY INSIGHTS")
-    print("-"*40)
+    lines.append("\n" + "-"*40)
+    lines.append("KEY INSIGHTS")
+    lines.append("-"*40)
     insights = analysis.get('insights', [])
     if insights:
         for i, insight in enumerate(insights, 1):
             # Truncate long insights
             if len(insight) > 200:
                 insight = insight[:200] + "..."
-            print(f"  {i}. {insight}")
+            lines.append(f"  {i}. {insight}")
     else:
-        print("  No insights generated")
+        lines.append("  No insights generated")
 
     # Risks
-    print("\n" + "-"*40)
-    print("RISK FACTORS")
-    print("-"*40)
+    lines.append("\n" + "-"*40)
+    lines.append("RISK FACTORS")
+    lines.append("-"*40)
     risks = analysis.get('risks', [])
     if risks:
         for risk in risks:
-            print(f"  [!] {risk}")
+            lines.append(f"  [!] {risk}")
     else:
-        print("  No significant risks identified")
+        lines.append("  No significant risks identified")
 
     # Opportunities
-    print("\n" + "-"*40)
-    print("OPPORTUNITIES")
-    print("-"*40)
+    lines.append("\n" + "-"*40)
+    lines.append("OPPORTUNITIES")
+    lines.append("-"*40)
     opportunities = analysis.get('opportunities', [])
     if opportunities:
         for opp in opportunities:
-            print(f"  [+] {opp}")
+            lines.append(f"  [+] {opp}")
     else:
-        print("  No specific opportunities identified")
+        lines.append("  No specific opportunities identified")
 
     # Recommendation
-    print("\n" + "="*60)
+    lines.append("\n" + "="*60)
     recommendation = analysis.get('recommendation', 'N/A')
     confidence = analysis.get('confidence', 0)
 
@@ -160,9 +168,11 @@ def print_analysis(analysis: Dict[str, Any]):
     else:
         rec_marker = "[HOLD]"
 
-    print(f"RECOMMENDATION: {rec_marker} {recommendation}")
-    print(f"CONFIDENCE: {confidence:.1%}")
-    print("="*60)
+    lines.append(f"RECOMMENDATION: {rec_marker} {recommendation}")
+    lines.append(f"CONFIDENCE: {confidence:.1%}")
+    lines.append("="*60)
+
+    print("\n".join(lines))
 
 
 def save_analysis(analysis: Dict[str, Any], filename: str = None):
@@ -245,8 +255,9 @@ Data Flow:
         print("Error: Confidence threshold must be between 0.0 and 1.0")
         return
 
-    # Run the analysis
-    analysis = asyncio.run(
+    # Run the analysis (on uvloop when installed)
+    run = uvloop.run if uvloop is not None else asyncio.run
+    analysis = run(
         analyze_ticker(
             ticker=args.ticker.upper(),
             filing_type=args.filing,
@@ -1,3 +1,6 @@
 from .pinecone_rag import SECFilingRAG
+from .index_registry import IndexRegistry
+from .embedding_cache import EmbeddingCache
+from .query_cache import ExactCache, SemanticCache, SingleFlight
 
-__all__ = ["SECFilingRAG"]
+__all__ = ["SECFilingRAG", "IndexRegistry", "EmbeddingCache", "ExactCache", "SemanticCache", "SingleFlight"]
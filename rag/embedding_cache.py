@@ -0,0 +1,115 @@
+"""
+Persistent embedding cache
+Chunk embeddings stored in SQLite so re-indexing a filing, or an amendment that
+repeats most of an earlier one, only sends new text to the embedding API
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.file_cache import CACHE_ROOT
+
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(CACHE_ROOT, "embeddings.db")
+
+
+class EmbeddingCache:
+    """
+    SQLite store of embeddings keyed by sha256(model + '::' + text).
+
+    Vectors are kept as float32 bytes. Only the newest `max_entries` vectors
+    are kept. Any database error degrades to a cache miss, so the cache can
+    never fail an indexing run. Safe to share between threads.
+    """
+
+    # SQLite limits the number of bound parameters per statement
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, model: str, path: str = DEFAULT_EMBEDDING_CACHE_PATH,
+                 max_entries: int = 500_000):
+        self.model = model
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS emb (key BLOB PRIMARY KEY, vec BLOB NOT NULL)")
+            conn.commit()
+            return conn
+        except (OSError, sqlite3.Error) as e:
+            print(f"Embedding cache disabled: {e}")
+            return None
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model}::{text}".encode("utf-8")).digest()
+
+    def _lookup(self, keys: Sequence[bytes]) -> Dict[bytes, List[float]]:
+        """Cached vectors for whichever of `keys` are present"""
+        if self._conn is None:
+            return {}
+
+        found = {}
+        try:
+            with self._lock:
+                for start in range(0, len(keys), self.LOOKUP_CHUNK):
+                    chunk = keys[start:start + self.LOOKUP_CHUNK]
+                    rows = self._conn.execute(
+                        f"SELECT key, vec FROM emb WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, vec in rows:
+                        found[key] = np.frombuffer(vec, dtype=np.float32).tolist()
+        except sqlite3.Error as e:
+            print(f"Embedding cache read failed: {e}")
+        return found
+
+    def _store(self, entries: List[Tuple[bytes, List[float]]]):
+        """Save new vectors, then drop the oldest beyond max_entries"""
+        if self._conn is None or not entries:
+            return
+
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO emb (key, vec) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in entries]
+                )
+                self._conn.execute(
+                    "DELETE FROM emb WHERE rowid <= (SELECT MAX(rowid) FROM emb) - ?", (self.max_entries,)
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"Embedding cache write failed: {e}")
+
+    def embed(self, texts: List[str],
+              embed_fn: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """Embeddings for `texts`, calling `embed_fn` once for the ones not cached"""
+        keys = [self._key(text) for text in texts]
+        vectors = self._lookup(keys)
+        missing = [i for i, key in enumerate(keys) if key not in vectors]
+        if missing:
+            fresh = embed_fn([texts[i] for i in missing])
+            self._store([(keys[i], vector) for i, vector in zip(missing, fresh)])
+            vectors.update((keys[i], vector) for i, vector in zip(missing, fresh))
+        return [vectors[key] for key in keys]
+
+    async def aembed(self, texts: List[str],
+                     embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]]) -> List[List[float]]:
+        """Async counterpart of embed(); database access runs on a worker thread"""
+        keys = [self._key(text) for text in texts]
+        vectors = await asyncio.to_thread(self._lookup, keys)
+        missing = [i for i, key in enumerate(keys) if key not in vectors]
+        if missing:
+            fresh = await embed_fn([texts[i] for i in missing])
+            await asyncio.to_thread(self._store, [(keys[i], vector) for i, vector in zip(missing, fresh)])
+            vectors.update((keys[i], vector) for i, vector in zip(missing, fresh))
+        return [vectors[key] for key in keys]
@@ -0,0 +1,88 @@
+"""
+Registry of filings already indexed in Pinecone
+Lets the analyst agent skip the EDGAR download and re-indexing for a filing it has already ingested
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from services.file_cache import CACHE_ROOT
+
+DEFAULT_REGISTRY_PATH = os.path.join(CACHE_ROOT, "index_registry.json")
+
+
+class IndexRegistry:
+    """
+    Persistent record of indexed filings keyed by (ticker, filing_type, accession number).
+
+    Entries expire after `ttl_seconds`, the least recently used ones are dropped
+    beyond `capacity`, and every entry is tagged with the RAG configuration
+    fingerprint so changing the embedding model or chunking invalidates it.
+    Safe to share between threads.
+    """
+
+    def __init__(self, fingerprint: str, path: str = DEFAULT_REGISTRY_PATH,
+                 ttl_seconds: float = 30 * 24 * 3600, capacity: int = 500):
+        self.fingerprint = fingerprint
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict(self._load())
+
+    @staticmethod
+    def _key(ticker: str, filing_type: str, accession_number: str) -> str:
+        return f"{ticker.upper()}:{filing_type}:{accession_number}"
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        """Write the registry atomically; a failed write only costs a re-index later"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save index registry: {e}")
+
+    def get(self, ticker: str, filing_type: str, accession_number: str) -> Optional[Dict[str, Any]]:
+        """Return the stored filing metadata, or None if the filing must be (re-)indexed"""
+        key = self._key(ticker, filing_type, accession_number)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if (entry.get("fingerprint") != self.fingerprint
+                    or time.time() - entry.get("indexed_at", 0) > self.ttl_seconds):
+                del self._entries[key]
+                self._save()
+                return None
+
+            self._entries.move_to_end(key)
+            return entry["metadata"]
+
+    def put(self, ticker: str, filing_type: str, accession_number: str, metadata: Dict[str, Any]):
+        """Record that a filing has been indexed"""
+        key = self._key(ticker, filing_type, accession_number)
+        with self._lock:
+            self._entries[key] = {
+                "fingerprint": self.fingerprint,
+                "indexed_at": time.time(),
+                "metadata": metadata
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            self._save()
@@ -6,44 +6,205 @@ Uses smart chunking to preserve financial tables and section context
 
 import os
 import re
-from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import base64
+import functools
+import hashlib
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from pinecone import Pinecone, ServerlessSpec
+
+try:
+    # gRPC transport keeps persistent HTTP/2 connections (needs the pinecone-client[grpc] extra)
+    from pinecone.grpc import PineconeGRPC
+except ImportError:
+    PineconeGRPC = None
+try:
+    import zstandard
+except ImportError:  # Optional: chunk text is then stored uncompressed
+    zstandard = None
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from dotenv import load_dotenv
 
+from rag.embedding_cache import EmbeddingCache
+from rag.query_cache import SemanticCache
+from services.retry import retry_transient
+
 load_dotenv()
 
+_BLOCK_SEPARATOR_RE = re.compile(r'\n\n+')
+_DOLLARS_RE = re.compile(r'\$[\d,]+')
+_PERCENT_RE = re.compile(r'\d+\.?\d*\s*%')
+# Case-insensitive keyword checks, without building a lowercased copy of each chunk
+_FINANCIAL_TERMS_RE = re.compile('revenue|income', re.IGNORECASE)
+_RISK_RE = re.compile('risk', re.IGNORECASE)
+
+
+# System prompt for query(); the context and question follow as user messages
+_ANSWER_INSTRUCTIONS = """You are an expert financial analyst. Answer the following question
+based ONLY on the provided context from {ticker}'s SEC filing.
+
+IMPORTANT INSTRUCTIONS:
+1. If the context contains financial tables with numbers, extract the EXACT numbers.
+2. Always include specific dollar amounts, percentages, and dates when available.
+3. If the answer cannot be found in the context, say "I cannot find this information in the filing."
+4. Cite the SEC section where you found the information (e.g., "From Item 7 - MD&A").
+
+The first user message is the context from the SEC filing; the second is the question."""
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Offsets of text[start:end].strip() within text"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _iter_block_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) offsets of the stripped, non-empty blocks between blank lines"""
+    last = 0
+    for separator in _BLOCK_SEPARATOR_RE.finditer(text):
+        start, end = _strip_span(text, last, separator.start())
+        if start < end:
+            yield start, end
+        last = separator.end()
+    start, end = _strip_span(text, last, len(text))
+    if start < end:
+        yield start, end
+
+
+def _iter_line_spans(text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) offsets of the lines in text[start:end]"""
+    while True:
+        newline = text.find('\n', start, end)
+        if newline == -1:
+            yield start, end
+            return
+        yield start, newline
+        start = newline + 1
+
+
+# Chunk text kept in vector metadata, the same amount with or without zstandard;
+# when it is available the text is stored compressed (base64 zstd) to shrink the metadata
+METADATA_TEXT_CHARS = 2000
+ZSTD_LEVEL = 3
+
+
+def _metadata_text(text: str, compressor=None) -> Dict[str, str]:
+    """Metadata fields carrying a chunk's text"""
+    text = text[:METADATA_TEXT_CHARS]
+    if compressor is None:
+        return {"text": text}
+    compressed = compressor.compress(text.encode("utf-8"))
+    return {"text_zstd": base64.b64encode(compressed).decode("ascii")}
+
+
+def _chunk_text(metadata: Dict[str, Any], decompressor=None) -> str:
+    """Chunk text from vector metadata, compressed or not"""
+    compressed = metadata.get("text_zstd")
+    if compressed:
+        # Without the text the LLM would answer from nothing, so don't degrade silently
+        if decompressor is None:
+            raise RuntimeError(
+                "Index holds zstd-compressed chunk text; install zstandard to read it"
+            )
+        return decompressor.decompress(base64.b64decode(compressed)).decode("utf-8")
+    return metadata.get("text", "")
+
 
 class SECFilingRAG:
     """RAG system for SEC filing follow-up questions with smart financial chunking"""
 
-    # SEC section patterns for metadata tagging
+    # SEC item numbers mapped to section names for metadata tagging
     SEC_SECTIONS = {
-        r'ITEM\s*1[.\s]': 'business',
-        r'ITEM\s*1A[.\s]': 'risk_factors',
-        r'ITEM\s*1B[.\s]': 'unresolved_staff_comments',
-        r'ITEM\s*2[.\s]': 'properties',
-        r'ITEM\s*3[.\s]': 'legal_proceedings',
-        r'ITEM\s*4[.\s]': 'mine_safety',
-        r'ITEM\s*5[.\s]': 'market_info',
-        r'ITEM\s*6[.\s]': 'selected_financial_data',
-        r'ITEM\s*7[.\s]': 'md_and_a',
-        r'ITEM\s*7A[.\s]': 'market_risk',
-        r'ITEM\s*8[.\s]': 'financial_statements',
-        r'ITEM\s*9[.\s]': 'changes_disagreements',
-        r'ITEM\s*9A[.\s]': 'controls_procedures',
-        r'ITEM\s*10[.\s]': 'directors_officers',
-        r'ITEM\s*11[.\s]': 'executive_compensation',
-        r'ITEM\s*12[.\s]': 'security_ownership',
-        r'ITEM\s*13[.\s]': 'related_transactions',
-        r'ITEM\s*14[.\s]': 'principal_accountant',
-        r'ITEM\s*15[.\s]': 'exhibits',
+        '1': 'business',
+        '1A': 'risk_factors',
+        '1B': 'unresolved_staff_comments',
+        '2': 'properties',
+        '3': 'legal_proceedings',
+        '4': 'mine_safety',
+        '5': 'market_info',
+        '6': 'selected_financial_data',
+        '7': 'md_and_a',
+        '7A': 'market_risk',
+        '8': 'financial_statements',
+        '9': 'changes_disagreements',
+        '9A': 'controls_procedures',
+        '10': 'directors_officers',
+        '11': 'executive_compensation',
+        '12': 'security_ownership',
+        '13': 'related_transactions',
+        '14': 'principal_accountant',
+        '15': 'exhibits',
     }
+    # One alternation over every item heading, so each block is scanned once
+    SEC_SECTION_PATTERN = re.compile(
+        r'ITEM\s*(' + '|'.join(sorted(SEC_SECTIONS, key=len, reverse=True)) + r')[.\s]',
+        re.IGNORECASE
+    )
 
-    def __init__(self):
-        self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    # Adaptive retrieval: widen the search only when the best match is weak, and
+    # trust a very strong best match enough to keep just the top few chunks
+    WIDEN_BELOW_SCORE = 0.6
+    CONFIDENT_SCORE = 0.9
+    CONFIDENT_KEEP = 2
+
+    # Soft content-type / section preference: fetch PREFER_FETCH_FACTOR x top_k candidates
+    # in one query and rank the preferred type's (or section's) scores up by its boost
+    PREFER_FETCH_FACTOR = 2
+    PREFERRED_CONTENT_BOOST = 1.5
+    PREFERRED_SECTION_BOOST = 1.5
+
+    # Indexing pipeline: chunks are embedded in batches and each batch is upserted on a
+    # worker thread while the next one is embedded, with at most UPSERT_WORKERS * 2 in flight.
+    # Upserts are capped at UPSERT_BATCH_SIZE vectors to stay under Pinecone's request size limit.
+    # Embedding requests also close early at EMBED_MAX_TOKENS (estimated as chars / 3), leaving
+    # headroom under OpenAI's per-request token cap when large tables make chunks long.
+    EMBED_BATCH_SIZE = 64
+    EMBED_MAX_TOKENS = 250_000
+    UPSERT_BATCH_SIZE = 100
+    UPSERT_WORKERS = 4
+    # index_filing_async: embedding batches in flight at once (keeps within OpenAI rate limits)
+    ASYNC_INDEX_CONCURRENCY = 8
+
+    # text-embedding-3 models can return shortened vectors; 1024 dims keep retrieval quality
+    # close to the full 1536 while making every stored and queried vector a third smaller.
+    # The index name carries the dimension since Pinecone indexes have a fixed one.
+    INDEX_NAME = "sec-filings-v2"
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS = 1024
+    # Bump when chunking or vector metadata changes so previously indexed filings are re-ingested
+    INDEX_VERSION = 3
+    # holds_filing() checks this many leading chunk IDs (a filing's first chunks may be empty and skipped)
+    SOURCE_PROBE_CHUNKS = 3
+
+    @classmethod
+    def config_fingerprint(cls) -> str:
+        """Identifies how filings are indexed; indexed-filing records are only valid for the same value"""
+        config = f"{cls.INDEX_NAME}:{cls.EMBEDDING_MODEL}:{cls.EMBEDDING_DIMENSIONS}:{cls.INDEX_VERSION}"
+        return hashlib.sha256(config.encode("utf-8")).hexdigest()[:16]
+
+    # Connection pool size for the HTTP client (used when gRPC is unavailable)
+    POOL_THREADS = 30
+
+    # Question embeddings remembered per client
+    QUESTION_CACHE_SIZE = 1024
+
+    # Optional answer cache: a question within this cosine similarity of an earlier one
+    # (same ticker and retrieval settings) reuses its answer for up to the TTL
+    ANSWER_CACHE_SIMILARITY = 0.98
+    ANSWER_CACHE_TTL_SECONDS = 24 * 3600
+
+    def __init__(self, semantic_cache: bool = False, answer_similarity: Optional[float] = None):
+        client = PineconeGRPC if PineconeGRPC is not None else Pinecone
+        self.pc = client(api_key=os.getenv("PINECONE_API_KEY"))
         self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
+            model=self.EMBEDDING_MODEL,
+            dimensions=self.EMBEDDING_DIMENSIONS,
             api_key=os.getenv("OPENAI_API_KEY")
         )
         self.llm = ChatOpenAI(
@@ -51,24 +212,42 @@ class SECFilingRAG:
             temperature=0.2,
             api_key=os.getenv("OPENAI_API_KEY")
         )
-        self.index_name = "sec-filings"
+        self.index_name = self.INDEX_NAME
+        # Chunk embeddings persist across runs, so re-indexed content isn't embedded again
+        self.embedding_cache = EmbeddingCache(f"{self.EMBEDDING_MODEL}:{self.EMBEDDING_DIMENSIONS}")
+        # Repeated questions (follow-ups, metric retries) reuse their embedding
+        self._embed_question_cached = functools.lru_cache(maxsize=self.QUESTION_CACHE_SIZE)(
+            lambda question: tuple(retry_transient(self.embeddings.embed_query)(question))
+        )
+        # Off by default: near-duplicate questions get the earlier answer, skipping Pinecone and the LLM
+        similarity = answer_similarity if answer_similarity is not None else self.ANSWER_CACHE_SIMILARITY
+        self.answer_cache = SemanticCache(max_distance=1.0 - similarity) if semantic_cache else None
         self._ensure_index()
 
     def _ensure_index(self):
         """Ensure Pinecone index exists"""
-        existing_indexes = [idx.name for idx in self.pc.list_indexes()]
+        existing_indexes = {idx.name: idx for idx in self.pc.list_indexes()}
 
-        if self.index_name not in existing_indexes:
+        existing = existing_indexes.get(self.index_name)
+        if existing is not None and existing.dimension != self.EMBEDDING_DIMENSIONS:
+            raise ValueError(
+                f"Pinecone index '{self.index_name}' has dimension {existing.dimension}, "
+                f"expected {self.EMBEDDING_DIMENSIONS}"
+            )
+        if existing is None:
             self.pc.create_index(
                 name=self.index_name,
-                dimension=1536,  # OpenAI embedding dimension
+                dimension=self.EMBEDDING_DIMENSIONS,
                 metric="cosine",
                 spec=ServerlessSpec(
                     cloud="aws",
                     region="us-east-1"
                 )
             )
-        self.index = self.pc.Index(self.index_name)
+        if PineconeGRPC is not None:
+            self.index = self.pc.Index(self.index_name)
+        else:
+            self.index = self.pc.Index(self.index_name, pool_threads=self.POOL_THREADS)
 
     def _smart_chunk_filing(self, filing_text: str, chunk_size: int = 1500,
                              chunk_overlap: int = 200) -> List[Dict[str, Any]]:
@@ -80,125 +259,145 @@ class SECFilingRAG:
         chunks = []
         current_section = 'unknown'
 
-        # Split by double newlines to get paragraphs/blocks
-        blocks = re.split(r'\n\n+', filing_text)
+        # Blocks (split by double newlines) and table rows are handled as offsets into
+        # filing_text; text is only sliced out once, when a chunk is saved
+        def join_spans(spans: List[Tuple[int, int]]) -> str:
+            return '\n\n'.join(filing_text[s:e] for s, e in spans)
 
-        current_chunk = ""
+        # Pending text chunk: block offsets plus the length of their joined text
+        current_spans = []
+        current_len = 0
         current_chunk_section = current_section
 
-        for block in blocks:
-            block = block.strip()
-            if not block:
-                continue
+        for start, end in _iter_block_spans(filing_text):
+            block_len = end - start
 
             # Check if this block starts a new SEC section
-            for pattern, section_name in self.SEC_SECTIONS.items():
-                if re.search(pattern, block.upper()):
-                    current_section = section_name
-                    break
+            match = self.SEC_SECTION_PATTERN.search(filing_text, start, end)
+            if match:
+                current_section = self.SEC_SECTIONS[match.group(1).upper()]
 
             # Check if this block is a table (starts with |)
-            is_table = block.startswith('|') and '|' in block[1:]
+            is_table = filing_text.startswith('|', start) and filing_text.find('|', start + 1, end) != -1
 
             # If it's a table, try to keep it intact
             if is_table:
                 # If current chunk + table is too big, save current chunk first
-                if current_chunk and len(current_chunk) + len(block) > chunk_size:
+                if current_spans and current_len + block_len > chunk_size:
                     chunks.append({
-                        'text': current_chunk.strip(),
+                        'text': join_spans(current_spans),
                         'section': current_chunk_section,
                         'has_table': False
                     })
-                    current_chunk = ""
+                    current_spans = []
+                    current_len = 0
 
                 # If table itself is small enough, add to chunk
-                if len(block) <= chunk_size:
-                    if current_chunk:
-                        current_chunk += "\n\n" + block
-                    else:
-                        current_chunk = block
+                if block_len <= chunk_size:
+                    if not current_spans:
                         current_chunk_section = current_section
+                    current_spans.append((start, end))
 
                     # Mark this chunk as having a table and save it
                     chunks.append({
-                        'text': current_chunk.strip(),
+                        'text': join_spans(current_spans),
                         'section': current_chunk_section,
                         'has_table': True
                     })
-                    current_chunk = ""
+                    current_spans = []
+                    current_len = 0
                 else:
                     # Table is too big - save it as its own chunk(s)
-                    # Split by rows but keep header
-                    table_lines = block.split('\n')
-                    header = '\n'.join(table_lines[:2])  # Header + separator
-
-                    table_chunk = header
-                    for line in table_lines[2:]:
-                        if len(table_chunk) + len(line) > chunk_size:
+                    # Split by rows but keep header (header + separator lines)
+                    lines = _iter_line_spans(filing_text, start, end)
+                    header_end = list(itertools.islice(lines, 2))[-1][1]
+                    header_len = header_end - start
+
+                    # Rows pending after the header: filing_text[rows_start:rows_end]
+                    rows_start = rows_end = None
+                    table_chunk_len = header_len
+
+                    def table_text() -> str:
+                        if rows_start is None:
+                            return filing_text[start:header_end].strip()
+                        if rows_start == header_end + 1:  # Rows follow the header directly
+                            return filing_text[start:rows_end].strip()
+                        return (filing_text[start:header_end] + '\n' + filing_text[rows_start:rows_end]).strip()
+
+                    for line_start, line_end in lines:
+                        line_len = line_end - line_start
+                        if table_chunk_len + line_len > chunk_size:
                             chunks.append({
-                                'text': table_chunk.strip(),
+                                'text': table_text(),
                                 'section': current_section,
                                 'has_table': True
                             })
-                            table_chunk = header + '\n' + line
+                            rows_start = line_start
+                            table_chunk_len = header_len + 1 + line_len
                         else:
-                            table_chunk += '\n' + line
+                            if rows_start is None:
+                                rows_start = line_start
+                            table_chunk_len += 1 + line_len
+                        rows_end = line_end
 
-                    if table_chunk and table_chunk != header:
+                    if rows_start is not None:
                         chunks.append({
-                            'text': table_chunk.strip(),
+                            'text': table_text(),
                             'section': current_section,
                             'has_table': True
                         })
             else:
                 # Regular text block
-                if len(current_chunk) + len(block) > chunk_size:
+                if current_len + block_len > chunk_size:
                     # Save current chunk
-                    if current_chunk:
+                    if current_spans:
                         chunks.append({
-                            'text': current_chunk.strip(),
+                            'text': join_spans(current_spans),
                             'section': current_chunk_section,
                             'has_table': False
                         })
-                    current_chunk = block
+                    current_spans = [(start, end)]
+                    current_len = block_len
                     current_chunk_section = current_section
                 else:
-                    if current_chunk:
-                        current_chunk += "\n\n" + block
+                    if current_spans:
+                        current_len += 2 + block_len
                     else:
-                        current_chunk = block
+                        current_len = block_len
                         current_chunk_section = current_section
+                    current_spans.append((start, end))
 
-        # Don't forget the last chunk
-        if current_chunk:
+        # Don't forget the last chunk (tables are saved as soon as they are added,
+        # so what is left over is plain text, like every other text flush)
+        if current_spans:
             chunks.append({
-                'text': current_chunk.strip(),
+                'text': join_spans(current_spans),
                 'section': current_chunk_section,
-                'has_table': '|' in current_chunk
+                'has_table': False
             })
 
         return chunks
 
     def _detect_content_type(self, text: str) -> str:
         """Detect if chunk contains financial data, risk factors, etc."""
-        text_lower = text.lower()
-
         # Check for financial numbers
-        has_dollars = bool(re.search(r'\$[\d,]+', text))
-        has_percentages = bool(re.search(r'\d+\.?\d*\s*%', text))
+        # ('$' in text) and ('%' in text) are fast memchr scans that skip the regex on plain prose
+        has_dollars = '$' in text and bool(_DOLLARS_RE.search(text))
+        has_percentages = '%' in text and bool(_PERCENT_RE.search(text))
         has_table = '|' in text and text.count('|') > 3
 
         if has_table and (has_dollars or has_percentages):
             return 'financial_table'
-        elif has_dollars or 'revenue' in text_lower or 'income' in text_lower:
+        elif has_dollars or _FINANCIAL_TERMS_RE.search(text):
             return 'financial_data'
-        elif 'risk' in text_lower:
+        elif _RISK_RE.search(text):
             return 'risk_factor'
         else:
             return 'general'
 
     def index_filing(self, filing_text: str, ticker: str, filing_type: str,
-                     filing_date: str) -> Dict[str, Any]:
+                     filing_date: str, batch_size: Optional[int] = None,
+                     source: Optional[str] = None) -> Dict[str, Any]:
         """
         Index a filing's text into Pinecone using smart chunking.
 
@@ -212,6 +411,9 @@ class SECFilingRAG:
             ticker: Stock ticker
             filing_type: 10-K or 10-Q
             filing_date: Filing date
+            batch_size: Chunks per embedding request (defaults to EMBED_BATCH_SIZE)
+            source: Optional id of the filing's content (accession number or content hash),
+                stored with every vector so holds_filing() can tell which filing the IDs hold
 
         Returns:
             Dict with indexing results
@@ -227,59 +429,90 @@ class SECFilingRAG:
                     "ticker": ticker
                 }
 
-            # Create embeddings for all chunks
-            vectors = []
-            for i, chunk_data in enumerate(chunks):
-                chunk_text = chunk_data['text']
-
-                # Skip empty chunks
-                if not chunk_text or len(chunk_text) < 10:
-                    continue
-
-                # Create embedding
-                embedding = self.embeddings.embed_query(chunk_text)
-
-                # Detect content type
-                content_type = self._detect_content_type(chunk_text)
-
-                # Create vector with rich metadata
-                vector_id = f"{ticker}_{filing_type}_{filing_date}_{i}"
-                vectors.append({
-                    "id": vector_id,
-                    "values": embedding,
-                    "metadata": {
-                        "ticker": ticker,
-                        "filing_type": filing_type,
-                        "filing_date": filing_date,
-                        "chunk_index": i,
-                        "section": chunk_data['section'],
-                        "has_table": chunk_data['has_table'],
-                        "content_type": content_type,
-                        "text": chunk_text[:2000]  # Store more text in metadata
-                    }
-                })
-
-            # Upsert in batches of 100
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch, namespace=ticker)
-
-            # Count chunks by section for reporting
-            sections_indexed = {}
-            for chunk_data in chunks:
-                section = chunk_data['section']
-                sections_indexed[section] = sections_indexed.get(section, 0) + 1
+            # Embed batch N+1 while batch N is being upserted; only a bounded
+            # number of embedded batches is held in memory at once
+            chunks_indexed = 0
+            upsert = retry_transient(self.index.upsert)
+            with ThreadPoolExecutor(max_workers=self.UPSERT_WORKERS) as pool:
+                pending = []
+                batches = self._vector_batches(
+                    chunks, ticker, filing_type, filing_date, batch_size or self.EMBED_BATCH_SIZE, source
+                )
+                for batch in batches:
+                    for start in range(0, len(batch), self.UPSERT_BATCH_SIZE):
+                        pending.append(pool.submit(
+                            upsert, vectors=batch[start:start + self.UPSERT_BATCH_SIZE], namespace=ticker
+                        ))
+                    chunks_indexed += len(batch)
+                    while len(pending) >= self.UPSERT_WORKERS * 2:
+                        pending.pop(0).result()
+                for future in pending:
+                    future.result()
+
+            self._invalidate_answers(ticker)
+            return self._index_summary(chunks, chunks_indexed, ticker, filing_type)
 
+        except Exception as e:
             return {
-                "success": True,
-                "ticker": ticker,
-                "chunks_indexed": len(vectors),
-                "filing_type": filing_type,
-                "sections_indexed": sections_indexed,
-                "tables_preserved": sum(1 for c in chunks if c['has_table'])
+                "success": False,
+                "error": str(e),
+                "ticker": ticker
             }
 
+    async def index_filing_async(self, filing_text: str, ticker: str, filing_type: str,
+                                 filing_date: str, batch_size: Optional[int] = None,
+                                 source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async counterpart of index_filing().
+
+        Embedding requests for all batches are issued concurrently (at most
+        ASYNC_INDEX_CONCURRENCY at a time) and each batch is upserted as soon
+        as its embeddings arrive, so indexing takes about one OpenAI round trip
+        per ASYNC_INDEX_CONCURRENCY batches instead of one per batch.
+        """
+        try:
+            chunks = await asyncio.to_thread(self._smart_chunk_filing, filing_text)
+
+            if not chunks:
+                return {
+                    "success": False,
+                    "error": "No chunks generated from filing",
+                    "ticker": ticker
+                }
+
+            embed = retry_transient(self.embeddings.aembed_documents)
+            upsert = retry_transient(self.index.upsert)
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard is not None else None
+            limit = asyncio.Semaphore(self.ASYNC_INDEX_CONCURRENCY)
+
+            async def index_batch(batch: List[List[Tuple[int, Dict[str, Any]]]]) -> int:
+                async with limit:
+                    embeddings = await self.embedding_cache.aembed(self._batch_texts(batch), embed)
+                    vectors = self._to_vectors(batch, embeddings, ticker, filing_type, filing_date, compressor, source)
+                    await asyncio.gather(*(
+                        asyncio.to_thread(
+                            upsert, vectors=vectors[start:start + self.UPSERT_BATCH_SIZE], namespace=ticker
+                        )
+                        for start in range(0, len(vectors), self.UPSERT_BATCH_SIZE)
+                    ))
+                return len(vectors)
+
+            batches = self._chunk_batches(chunks, batch_size or self.EMBED_BATCH_SIZE)
+            tasks = [asyncio.ensure_future(index_batch(batch)) for batch in batches]
+            try:
+                counts = await asyncio.gather(*tasks)
+            except BaseException:
+                # One batch failed: stop the others before they write more of a filing
+                # that is reported as not indexed (upserts already running still finish)
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self._invalidate_answers(ticker)
+                raise
+
+            self._invalidate_answers(ticker)
+            return self._index_summary(chunks, sum(counts), ticker, filing_type)
+
         except Exception as e:
             return {
                 "success": False,
@@ -287,26 +520,171 @@ class SECFilingRAG:
                 "ticker": ticker
             }
 
-    def query(self, question: str, ticker: str, top_k: int = 5,
-              section_filter: Optional[str] = None,
-              content_type_filter: Optional[str] = None) -> Dict[str, Any]:
+    def _index_summary(self, chunks: List[Dict[str, Any]], chunks_indexed: int,
+                       ticker: str, filing_type: str) -> Dict[str, Any]:
+        """Indexing result reported by index_filing() and index_filing_async()"""
+        # Count chunks by section for reporting
+        sections_indexed = {}
+        for chunk_data in chunks:
+            section = chunk_data['section']
+            sections_indexed[section] = sections_indexed.get(section, 0) + 1
+
+        return {
+            "success": True,
+            "ticker": ticker,
+            "chunks_indexed": chunks_indexed,
+            "filing_type": filing_type,
+            "sections_indexed": sections_indexed,
+            "tables_preserved": sum(1 for c in chunks if c['has_table'])
+        }
+
+    def _chunk_batches(self, chunks: List[Dict[str, Any]],
+                       batch_size: int) -> Iterator[List[List[Tuple[int, Dict[str, Any]]]]]:
         """
-        Query the indexed filing to answer a follow-up question.
+        Group non-empty chunks, with their index, into embedding requests.
+
+        Chunks with identical text (boilerplate, repeated table headers) form one
+        group that is embedded once; each batch holds up to `batch_size` groups.
+        """
+        groups: Dict[bytes, List[Tuple[int, Dict[str, Any]]]] = {}
+        for i, chunk_data in enumerate(chunks):
+            # Skip empty chunks
+            if not chunk_data['text'] or len(chunk_data['text']) < 10:
+                continue
+            digest = hashlib.blake2b(chunk_data['text'].encode('utf-8'), digest_size=16).digest()
+            groups.setdefault(digest, []).append((i, chunk_data))
+
+        batch = []
+        batch_tokens = 0
+        for group in groups.values():
+            tokens = len(group[0][1]['text']) // 3
+            if batch and batch_tokens + tokens > self.EMBED_MAX_TOKENS:
+                yield batch
+                batch, batch_tokens = [], 0
+
+            batch.append(group)
+            batch_tokens += tokens
+            if len(batch) == batch_size:
+                yield batch
+                batch, batch_tokens = [], 0
+
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _batch_texts(batch: List[List[Tuple[int, Dict[str, Any]]]]) -> List[str]:
+        """The text to embed for each group in a batch"""
+        return [group[0][1]['text'] for group in batch]
+
+    def _to_vectors(self, batch: List[List[Tuple[int, Dict[str, Any]]]], embeddings: List[List[float]],
+                    ticker: str, filing_type: str, filing_date: str, compressor=None,
+                    source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Pinecone vectors with rich metadata for an embedded batch, one per chunk"""
+        return [
+            {
+                "id": f"{ticker}_{filing_type}_{filing_date}_{i}",
+                "values": embedding,
+                "metadata": {
+                    "ticker": ticker,
+                    "filing_type": filing_type,
+                    "filing_date": filing_date,
+                    "chunk_index": i,
+                    "section": chunk_data['section'],
+                    "has_table": chunk_data['has_table'],
+                    "content_type": self._detect_content_type(chunk_data['text']),
+                    **({"source": source} if source else {}),
+                    **_metadata_text(chunk_data['text'], compressor)
+                }
+            }
+            for group, embedding in zip(batch, embeddings)
+            for i, chunk_data in group
+        ]
+
+    def _vector_batches(self, chunks: List[Dict[str, Any]], ticker: str, filing_type: str,
+                        filing_date: str, batch_size: int,
+                        source: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Embed chunks up to `batch_size` at a time, yielding Pinecone vectors with rich metadata"""
+        embed = retry_transient(self.embeddings.embed_documents)
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard is not None else None
+
+        for batch in self._chunk_batches(chunks, batch_size):
+            embeddings = self.embedding_cache.embed(self._batch_texts(batch), embed)
+            yield self._to_vectors(batch, embeddings, ticker, filing_type, filing_date, compressor, source)
+
+    def _select_matches(self, matches: List[Any], min_relative_score: float) -> List[Any]:
+        """Drop matches scoring well below the best one (the best match is always kept)"""
+        best_score = matches[0].score
+        if best_score >= self.CONFIDENT_SCORE:
+            return matches[:self.CONFIDENT_KEEP]
+        cutoff = best_score * min_relative_score
+        return [m for m in matches if m.score >= cutoff] or matches[:1]
+
+    def warmup(self):
+        """Open the OpenAI and Pinecone connections ahead of the first real request"""
+        self.embeddings.embed_query("warmup")
+        self.index.describe_index_stats()
+
+    def embed_question(self, question: str) -> List[float]:
+        """Embed one question, reusing the vector if the same text was embedded before"""
+        return list(self._embed_question_cached(question))
+
+    def embed_queries(self, questions: List[str]) -> List[List[float]]:
+        """Embed several questions in a single API call (same vectors as embed_query)"""
+        return retry_transient(self.embeddings.embed_documents)(questions)
+
+    def retrieve(self, question: str, ticker: str, top_k: int = 5,
+                 section_filter: Optional[str] = None,
+                 content_type_filter: Optional[str] = None,
+                 initial_top_k: Optional[int] = None,
+                 min_relative_score: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Retrieve the most relevant filing chunks for a question without calling the LLM.
 
         Args:
-            question: User's question
+            question: Search question
             ticker: Stock ticker to search in
             top_k: Number of relevant chunks to retrieve
             section_filter: Optional SEC section to filter by (e.g., 'risk_factors', 'financial_statements')
             content_type_filter: Optional content type filter ('financial_table', 'financial_data', 'risk_factor')
+            initial_top_k: Optional smaller first search; widened to top_k only if the best match is weak
+            min_relative_score: Optional cutoff (fraction of the best score) for keeping chunks in the context
 
         Returns:
-            Dict with answer and sources
+            Dict with formatted context and sources
         """
         try:
-            # Create embedding for the question
-            question_embedding = self.embeddings.embed_query(question)
+            question_embedding = self.embed_question(question)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "context": ""
+            }
+
+        return self.retrieve_by_embedding(
+            question_embedding, ticker, top_k=top_k,
+            section_filter=section_filter,
+            content_type_filter=content_type_filter,
+            initial_top_k=initial_top_k,
+            min_relative_score=min_relative_score
+        )
 
+    def retrieve_by_embedding(self, question_embedding: List[float], ticker: str, top_k: int = 5,
+                              section_filter: Optional[str] = None,
+                              content_type_filter: Optional[str] = None,
+                              initial_top_k: Optional[int] = None,
+                              min_relative_score: Optional[float] = None,
+                              prefer_content_type: Optional[str] = None,
+                              prefer_section: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Same as retrieve(), for a question that has already been embedded
+        (e.g. as part of a batch from embed_queries).
+
+        prefer_content_type and prefer_section rank chunks of that type or
+        section ahead of similarly scored others without excluding the rest,
+        unlike content_type_filter and section_filter.
+        """
+        try:
             # Build filter if specified
             filter_dict = {}
             if section_filter:
@@ -315,29 +693,53 @@ class SECFilingRAG:
                 filter_dict["content_type"] = {"$eq": content_type_filter}
 
             # Query Pinecone
+            prefer = prefer_content_type or prefer_section
+            fetch_k = top_k * self.PREFER_FETCH_FACTOR if prefer else top_k
             query_params = {
                 "vector": question_embedding,
-                "top_k": top_k,
+                "top_k": min(initial_top_k, fetch_k) if initial_top_k else fetch_k,
                 "include_metadata": True,
                 "namespace": ticker
             }
             if filter_dict:
                 query_params["filter"] = filter_dict
 
-            results = self.index.query(**query_params)
+            results = retry_transient(self.index.query)(**query_params)
+            matches = results.matches
 
-            if not results.matches:
+            # Widen the search if the small first pass found nothing convincing
+            if query_params["top_k"] < fetch_k and (
+                    not matches or matches[0].score < self.WIDEN_BELOW_SCORE):
+                query_params["top_k"] = fetch_k
+                matches = retry_transient(self.index.query)(**query_params).matches
+
+            if prefer:
+                def boosted_score(match):
+                    score = match.score
+                    if prefer_content_type and match.metadata.get("content_type") == prefer_content_type:
+                        score *= self.PREFERRED_CONTENT_BOOST
+                    if prefer_section and match.metadata.get("section") == prefer_section:
+                        score *= self.PREFERRED_SECTION_BOOST
+                    return score
+
+                matches = sorted(matches, key=boosted_score, reverse=True)[:top_k]
+
+            if not matches:
                 return {
                     "success": False,
                     "error": f"No indexed data found for {ticker}",
-                    "answer": None
+                    "context": ""
                 }
 
+            if min_relative_score:
+                matches = self._select_matches(matches, min_relative_score)
+
             # Extract relevant chunks with rich metadata
             context_chunks = []
             sources = []
-            for match in results.matches:
-                chunk_text = match.metadata.get("text", "")
+            decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+            for match in matches:
+                chunk_text = _chunk_text(match.metadata, decompressor)
                 section = match.metadata.get("section", "unknown")
                 has_table = match.metadata.get("has_table", False)
 
@@ -356,38 +758,125 @@ class SECFilingRAG:
                     "score": match.score
                 })
 
-            # Build context
-            context = "\n\n---\n\n".join(context_chunks)
+            return {
+                "success": True,
+                "context": "\n\n---\n\n".join(context_chunks),
+                "sources": sources,
+                "context_used": len(context_chunks),
+                "sections_searched": list(set(s["section"] for s in sources))
+            }
 
-            # Generate answer using LLM
-            prompt = f"""You are an expert financial analyst. Answer the following question
-based ONLY on the provided context from {ticker}'s SEC filing.
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "context": ""
+            }
 
-IMPORTANT INSTRUCTIONS:
-1. If the context contains financial tables with numbers, extract the EXACT numbers.
-2. Always include specific dollar amounts, percentages, and dates when available.
-3. If the answer cannot be found in the context, say "I cannot find this information in the filing."
-4. Cite the SEC section where you found the information (e.g., "From Item 7 - MD&A").
+    def query(self, question: str, ticker: str, top_k: int = 5,
+              section_filter: Optional[str] = None,
+              content_type_filter: Optional[str] = None,
+              initial_top_k: Optional[int] = None,
+              min_relative_score: Optional[float] = None,
+              cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Query the indexed filing to answer a follow-up question.
 
-Context from SEC Filing:
-{context}
+        Args:
+            question: User's question
+            ticker: Stock ticker to search in
+            top_k: Number of relevant chunks to retrieve
+            section_filter: Optional SEC section to filter by (e.g., 'risk_factors', 'financial_statements')
+            content_type_filter: Optional content type filter ('financial_table', 'financial_data', 'risk_factor')
+            initial_top_k: Optional smaller first search; widened to top_k only if the best match is weak
+            min_relative_score: Optional cutoff (fraction of the best score) for keeping chunks in the context
+            cache_key: Optional label (e.g. a metric key) confining answer-cache reuse to questions
+                with the same label, so templated questions differing by one word never share an answer
 
-Question: {question}
+        Returns:
+            Dict with answer and sources
+        """
+        try:
+            question_embedding = self.embed_question(question)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "answer": None
+            }
 
-Provide a clear answer with SPECIFIC NUMBERS and citations:"""
+        return self.query_by_embedding(
+            question, question_embedding, ticker, top_k=top_k,
+            section_filter=section_filter,
+            content_type_filter=content_type_filter,
+            initial_top_k=initial_top_k,
+            min_relative_score=min_relative_score,
+            cache_key=cache_key
+        )
 
-            response = self.llm.invoke(prompt)
-            answer = response.content
+    def query_by_embedding(self, question: str, question_embedding: List[float], ticker: str,
+                           top_k: int = 5,
+                           section_filter: Optional[str] = None,
+                           content_type_filter: Optional[str] = None,
+                           initial_top_k: Optional[int] = None,
+                           min_relative_score: Optional[float] = None,
+                           prefer_content_type: Optional[str] = None,
+                           prefer_section: Optional[str] = None,
+                           cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Same as query(), for a question that has already been embedded
+        (e.g. as part of a batch from embed_queries).
+        """
+        cache_scope = (ticker, top_k, section_filter, content_type_filter, initial_top_k, min_relative_score,
+                       prefer_content_type, prefer_section, cache_key)
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(cache_scope, question_embedding)
+            if cached is not None and time.time() - cached[0] < self.ANSWER_CACHE_TTL_SECONDS:
+                return {**cached[1], "question": question, "cached": True}
+
+        retrieval = self.retrieve_by_embedding(
+            question_embedding,
+            ticker=ticker,
+            top_k=top_k,
+            section_filter=section_filter,
+            content_type_filter=content_type_filter,
+            initial_top_k=initial_top_k,
+            min_relative_score=min_relative_score,
+            prefer_content_type=prefer_content_type,
+            prefer_section=prefer_section
+        )
 
+        if not retrieval.get("success"):
             return {
+                "success": False,
+                "error": retrieval.get("error"),
+                "answer": None
+            }
+
+        try:
+            # Generate answer using LLM: fixed instructions as the system message, the
+            # retrieved context and question as the user message (no combined prompt string)
+            messages = [
+                ("system", _ANSWER_INSTRUCTIONS.format(ticker=ticker)),
+                ("human", retrieval["context"]),
+                ("human", f"Question: {question}\n\nProvide a clear answer with SPECIFIC NUMBERS and citations:"),
+            ]
+
+            response = retry_transient(self.llm.invoke)(messages)
+            answer = response.content
+
+            result = {
                 "success": True,
                 "question": question,
                 "answer": answer,
                 "ticker": ticker,
-                "sources": sources,
-                "context_used": len(context_chunks),
-                "sections_searched": list(set(s["section"] for s in sources))
+                "sources": retrieval["sources"],
+                "context_used": retrieval["context_used"],
+                "sections_searched": retrieval["sections_searched"]
             }
+            if self.answer_cache is not None:
+                self.answer_cache.put(cache_scope, question_embedding, (time.time(), result))
+            return result
 
         except Exception as e:
             return {
@@ -426,28 +915,49 @@ Provide a clear answer with SPECIFIC NUMBERS and citations:"""
         # Use specific query if available, otherwise use the metric name directly
         question = metric_queries.get(metric_name.lower(), f"What is {ticker}'s {metric_name}?")
 
-        # Query with preference for financial tables
-        result = self.query(
-            question=question,
-            ticker=ticker,
+        try:
+            question_embedding = self.embed_question(question)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "answer": None
+            }
+
+        # One search across all chunks with financial tables ranked first, so a filing
+        # without a matching table doesn't need a second search and LLM call
+        return self.query_by_embedding(
+            question, question_embedding, ticker,
             top_k=8,  # Get more chunks for financial queries
-            content_type_filter='financial_table'  # Prefer tables
+            prefer_content_type='financial_table',
+            cache_key=metric_name.lower()
         )
 
-        # If no results from tables, try without filter
-        if not result.get('success') or 'cannot find' in result.get('answer', '').lower():
-            result = self.query(
-                question=question,
-                ticker=ticker,
-                top_k=8
-            )
+    def _invalidate_answers(self, ticker: str):
+        """Forget cached answers for a ticker whose indexed content changed"""
+        if self.answer_cache is not None:
+            self.answer_cache.clear_where(lambda scope: scope[0] == ticker)
 
-        return result
+    def holds_filing(self, ticker: str, filing_type: str, filing_date: str, source: str) -> bool:
+        """
+        Whether the index currently holds the filing indexed with `source`.
+
+        A local record of an indexed filing can outlive its vectors: the ticker's
+        namespace may have been deleted, or another filing indexed under the same
+        filing_date (e.g. "latest") may have overwritten the IDs.
+        """
+        ids = [f"{ticker}_{filing_type}_{filing_date}_{i}" for i in range(self.SOURCE_PROBE_CHUNKS)]
+        fetched = retry_transient(self.index.fetch)(ids=ids, namespace=ticker)
+        return any(
+            (vector.metadata or {}).get("source") == source
+            for vector in fetched.vectors.values()
+        )
 
     def delete_filing(self, ticker: str) -> Dict[str, Any]:
         """Delete all vectors for a specific ticker"""
         try:
             self.index.delete(delete_all=True, namespace=ticker)
+            self._invalidate_answers(ticker)
             return {
                 "success": True,
                 "ticker": ticker,
@@ -0,0 +1,207 @@
+"""
+Query caches for RAG lookups
+Lets repeated or paraphrased questions about the same filing skip retrieval and the LLM
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+class _ScopeBucket:
+    """Entries of one scope: normalized embeddings as matrix rows, with parallel ids and values"""
+
+    __slots__ = ("matrix", "ids", "values")
+
+    def __init__(self, dimension: int):
+        self.matrix = np.empty((0, dimension), dtype=np.float32)
+        self.ids: List[int] = []
+        self.values: List[Any] = []
+
+
+class SemanticCache:
+    """
+    Approximate cache keyed by query embedding.
+
+    A lookup hits when a previously stored query in the same scope (e.g. one
+    filing) is within `max_distance` cosine distance of the new query.
+    Each scope keeps its embeddings in one float32 matrix, so a lookup is a
+    single matrix-vector product. Entries are evicted least-recently-used
+    once `capacity` is reached. Safe to share between threads.
+    """
+
+    def __init__(self, max_distance: float = 0.05, capacity: int = 1000):
+        self.max_distance = max_distance
+        self.capacity = capacity
+        self._buckets: Dict[Hashable, _ScopeBucket] = {}
+        self._lru: "OrderedDict[int, Hashable]" = OrderedDict()  # entry id -> scope
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, scope: Hashable, embedding: List[float]) -> Optional[Any]:
+        """Return the cached value for the closest query in `scope`, or None on a miss"""
+        query = self._normalize(embedding)
+
+        with self._lock:
+            bucket = self._buckets.get(scope)
+            if bucket is None or not bucket.ids:
+                return None
+
+            similarities = bucket.matrix @ query
+            best = int(np.argmax(similarities))
+            if 1.0 - similarities[best] > self.max_distance:
+                return None
+
+            self._lru.move_to_end(bucket.ids[best])
+            return bucket.values[best]
+
+    def put(self, scope: Hashable, embedding: List[float], value: Any):
+        """Store a value for a query embedding in `scope`"""
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            bucket = self._buckets.get(scope)
+            if bucket is None:
+                bucket = self._buckets[scope] = _ScopeBucket(vector.shape[0])
+            bucket.matrix = np.vstack([bucket.matrix, vector])
+            bucket.ids.append(self._next_id)
+            bucket.values.append(value)
+            self._lru[self._next_id] = scope
+            self._next_id += 1
+
+            while len(self._lru) > self.capacity:
+                entry_id, entry_scope = self._lru.popitem(last=False)
+                self._remove(entry_scope, entry_id)
+
+    def _remove(self, scope: Hashable, entry_id: int):
+        """Drop one entry from its scope's bucket; caller holds the lock"""
+        bucket = self._buckets[scope]
+        row = bucket.ids.index(entry_id)
+        bucket.matrix = np.delete(bucket.matrix, row, axis=0)
+        del bucket.ids[row]
+        del bucket.values[row]
+        if not bucket.ids:
+            del self._buckets[scope]
+
+    def clear(self, scope: Optional[Hashable] = None):
+        """Drop every entry, or only the entries of one scope"""
+        if scope is None:
+            with self._lock:
+                self._buckets.clear()
+                self._lru.clear()
+            return
+        self.clear_where(lambda entry_scope: entry_scope == scope)
+
+    def clear_where(self, predicate: Callable[[Hashable], bool]):
+        """Drop the entries whose scope satisfies `predicate`"""
+        with self._lock:
+            for scope in [s for s in self._buckets if predicate(s)]:
+                for entry_id in self._buckets.pop(scope).ids:
+                    del self._lru[entry_id]
+
+
+class ExactCache:
+    """
+    Exact-match LRU cache for deterministic lookups (same filing, same query text).
+
+    Checked before SemanticCache because a hit costs a dict lookup instead of an
+    embedding call. Safe to share between threads.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for `key`, or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value under `key`"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into a single execution.
+
+    The first caller for a key does the work; callers arriving while it is in
+    flight wait for the same result instead of repeating it. Uses
+    concurrent.futures so waiters may live on other threads or event loops.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """Return the in-flight future for `key` and whether the caller must run the work"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _finish(self, key: Hashable):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `fn()` once per key among concurrent callers"""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key)
+
+    def call(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Synchronous counterpart of run() for blocking callables"""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key)
@@ -5,17 +5,27 @@ from typing import List, Dict, Any
 from cerebras.cloud.sdk import Cerebras
 from dotenv import load_dotenv
 
+from services.file_cache import FileCache
+
 load_dotenv()
 
+# Market syntheses are reused for a week
+SEARCH_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
 class CerebrasSearchService:
     def __init__(self):
         self.client = Cerebras(api_key=os.getenv('CEREBRAS_API_KEY'))
+        self.cache = FileCache("cerebras_search", SEARCH_CACHE_TTL_SECONDS)
         
     async def multi_angle_search(self, base_query: str) -> Dict[str, Any]:
         """
         Implement Cerebras-style multi-angle search
         Based on their Perplexity cookbook pattern
         """
+        cached = await asyncio.to_thread(self.cache.get, base_query)
+        if cached is not None:
+            return cached
+
         # Generate multiple search angles
         search_queries = self.generate_search_queries(base_query)
         
@@ -25,11 +35,17 @@ class CerebrasSearchService:
         # Synthesize results using LLM
         synthesis = await self.synthesize_results(base_query, search_results)
         
-        return {
+        result = {
             'synthesis': synthesis,
             'sources': search_results,
             'confidence': self.calculate_confidence(search_results)
         }
+
+        # Don't pin a failed synthesis for the whole TTL
+        if synthesis != "Unable to synthesize results":
+            await asyncio.to_thread(self.cache.put, base_query, result)
+
+        return result
     
     def generate_search_queries(self, base_query: str) -> List[str]:
         """Generate multiple search angles for comprehensive coverage"""
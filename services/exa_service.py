@@ -17,14 +17,73 @@ For SEC filing URL search, use:
     result = search._run("AAPL", "10-K")
 """
 
+import functools
 import os
+import re
+import asyncio
 import warnings
 from typing import Dict, Any, Optional
 from exa_py import Exa
 from dotenv import load_dotenv
 
+from services.file_cache import FileCache
+
 load_dotenv()
 
+# SEC fundamentals change quarterly at most; a day keeps repeat runs off the network
+METRIC_CACHE_TTL_SECONDS = 24 * 3600
+
+
+@functools.lru_cache(maxsize=None)
+def _get_exa_client() -> Exa:
+    """Lazily create the process-wide Exa client"""
+    return Exa(api_key=os.getenv('EXA_API_KEY'))
+
+
+_TICKER_RE = re.compile(r'\b([A-Z]{1,5})\b')
+
+# Phrases that mark an answer as "no data" rather than a value
+_FAILURE_RE = re.compile('|'.join(map(re.escape, [
+    "cannot provide",
+    "do not contain",
+    "not available",
+    "unable to",
+    "sorry",
+    "no specific",
+])), re.IGNORECASE)
+
+# Question keywords per metric, in priority order: the first metric with any keyword
+# in the question wins, wherever in the question that keyword appears
+_METRIC_KEYWORDS = {
+    'revenue': ['revenue', 'sales', 'net sales'],
+    'net_income': ['net income', 'profit', 'earnings'],
+    'roe': ['return on equity', 'roe'],
+    'debt_to_equity': ['debt-to-equity', 'debt to equity', 'd/e'],
+    'operating_margin': ['operating margin'],
+    'gross_margin': ['gross margin'],
+    'revenue_growth': ['growth rate', 'revenue growth', 'yoy'],
+    'eps': ['earnings per share', 'eps'],
+    'total_debt': ['total debt', 'debt'],
+    'cash': ['cash', 'cash equivalents'],
+}
+_METRIC_PRIORITY = {metric: rank for rank, metric in enumerate(_METRIC_KEYWORDS)}
+# One case-insensitive pass; the lookahead reports a match at every position, so
+# overlapping keywords are all seen, just like substring checks
+_METRIC_RE = re.compile('(?=(?:' + '|'.join(
+    f"(?P<{metric}>{'|'.join(map(re.escape, keywords))})"
+    for metric, keywords in _METRIC_KEYWORDS.items()
+) + '))', re.IGNORECASE)
+
+# Value patterns tried in order, with the multiplier for each unit
+_NUMERIC_PATTERNS = [(re.compile(pattern, re.IGNORECASE), multiplier) for pattern, multiplier in [
+    (r'\$\s*([\d,]+(?:\.\d+)?)\s*(billion|B)', 1e9),
+    (r'\$\s*([\d,]+(?:\.\d+)?)\s*(million|M)', 1e6),
+    (r'\$\s*([\d,]+(?:\.\d+)?)\s*(thousand|K)', 1e3),
+    (r'\$\s*([\d,]+(?:\.\d+)?)', 1),
+    (r'(-?(?:\d+(?:\.\d+)?|\.\d+))\s*%', 1),  # Percentage
+    (r'(-?(?:\d+(?:\.\d+)?|\.\d+))\s*x', 1),  # Ratio
+]]
+
 
 class ExaService:
     """
@@ -35,8 +94,8 @@ class ExaService:
     """
 
     def __init__(self):
-        self.client = Exa(api_key=os.getenv('EXA_API_KEY'))
         self._metric_extractor = None
+        self.metric_cache = FileCache("exa_metrics", METRIC_CACHE_TTL_SECONDS)
         warnings.warn(
             "ExaService is deprecated. Use MetricExtractor for metric extraction "
             "or SECFilingSearchTool for URL discovery.",
@@ -44,6 +103,11 @@ class ExaService:
             stacklevel=2
         )
 
+    @property
+    def client(self) -> Exa:
+        """Shared Exa client, created on first use."""
+        return _get_exa_client()
+
     @property
     def metric_extractor(self):
         """Lazy initialization of MetricExtractor."""
@@ -67,13 +131,17 @@ class ExaService:
 
         if not ticker:
             # Try to extract ticker from question
-            import re
-            ticker_match = re.search(r'\b([A-Z]{1,5})\b', question)
+            ticker_match = _TICKER_RE.search(question)
             if ticker_match:
                 ticker = ticker_match.group(1)
             else:
                 return {'answer': None, 'citations': [], 'error': 'Ticker not provided'}
 
+        cache_key = f"{ticker}|{question}"
+        cached = await asyncio.to_thread(self.metric_cache.get, cache_key)
+        if cached is not None:
+            return cached
+
         # Extract metric name from question
         metric_name = self._extract_metric_name(question)
 
@@ -82,12 +150,14 @@ class ExaService:
 
         # Convert to old format for backward compatibility
         if result.get('success'):
-            return {
+            response = {
                 'answer': f"{result.get('raw_value', result.get('value'))}",
                 'citations': [result.get('source_section', 'SEC Filing')],
                 'value': result.get('value'),
                 'confidence': result.get('confidence', 0.0)
             }
+            await asyncio.to_thread(self.metric_cache.put, cache_key, response)
+            return response
         else:
             return {
                 'answer': None,
@@ -97,27 +167,14 @@ class ExaService:
 
     def _extract_metric_name(self, question: str) -> str:
         """Extract metric name from a question string."""
-        question_lower = question.lower()
-
-        metric_keywords = {
-            'revenue': ['revenue', 'sales', 'net sales'],
-            'net_income': ['net income', 'profit', 'earnings'],
-            'roe': ['return on equity', 'roe'],
-            'debt_to_equity': ['debt-to-equity', 'debt to equity', 'd/e'],
-            'operating_margin': ['operating margin'],
-            'gross_margin': ['gross margin'],
-            'revenue_growth': ['growth rate', 'revenue growth', 'yoy'],
-            'eps': ['earnings per share', 'eps'],
-            'total_debt': ['total debt', 'debt'],
-            'cash': ['cash', 'cash equivalents'],
-        }
-
-        for metric, keywords in metric_keywords.items():
-            for keyword in keywords:
-                if keyword in question_lower:
-                    return metric
-
-        return 'revenue'  # Default
+        # Keep the highest-priority metric mentioned anywhere in the question
+        best = None
+        for match in _METRIC_RE.finditer(question):
+            metric = match.lastgroup
+            if best is None or _METRIC_PRIORITY[metric] < _METRIC_PRIORITY[best]:
+                best = metric
+
+        return best or 'revenue'  # Default
 
     def parse_numeric_value(self, text: str) -> Optional[float]:
         """
@@ -136,32 +193,13 @@ class ExaService:
         if not text:
             return None
 
-        import re
-
         # Check for failure indicators
-        failure_indicators = [
-            "cannot provide",
-            "do not contain",
-            "not available",
-            "unable to",
-            "sorry",
-            "no specific"
-        ]
-        if any(indicator in text.lower() for indicator in failure_indicators):
+        if _FAILURE_RE.search(text):
             return None
 
         # Look for patterns
-        patterns = [
-            (r'\$\s*([\d,]+(?:\.\d+)?)\s*(billion|B)', 1e9),
-            (r'\$\s*([\d,]+(?:\.\d+)?)\s*(million|M)', 1e6),
-            (r'\$\s*([\d,]+(?:\.\d+)?)\s*(thousand|K)', 1e3),
-            (r'\$\s*([\d,]+(?:\.\d+)?)', 1),
-            (r'([-]?[\d.]+)\s*%', 1),  # Percentage
-            (r'([-]?[\d.]+)\s*x', 1),  # Ratio
-        ]
-
-        for pattern, multiplier in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern, multiplier in _NUMERIC_PATTERNS:
+            match = pattern.search(text)
             if match:
                 try:
                     value = float(match.group(1).replace(',', ''))
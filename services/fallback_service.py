@@ -1,8 +1,17 @@
+import asyncio
 from typing import Dict, Any
 
+from services.file_cache import FileCache
+
+# Whether a ticker is a listed company almost never changes; a week keeps the check off the network
+COMPANY_INFO_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
 class FallbackDataService:
     """Fallback data sources when Exa fails"""
     
+    def __init__(self):
+        self.company_cache = FileCache("company_info", COMPANY_INFO_CACHE_TTL_SECONDS)
+    
     async def try_alternative_sources(self, ticker: str) -> Dict[str, Any]:
         """Try alternative data sources"""
         alternatives = {}
@@ -22,8 +31,9 @@ class FallbackDataService:
             f"What industry is {ticker} in?"
         ]
         
-        for question in simplified_questions:
-            answer = await self.exa.answer(question)
+        # The questions are independent, so ask them all at once
+        answers = await asyncio.gather(*(self.exa.answer(question) for question in simplified_questions))
+        for question, answer in zip(simplified_questions, answers):
             if answer:
                 alternatives[question] = answer
         
@@ -31,10 +41,18 @@ class FallbackDataService:
     
     async def search_company_info(self, ticker: str) -> Dict[str, Any]:
         """Verify if company exists and is public"""
+        cache_key = ticker.upper()
+        cached = await asyncio.to_thread(self.company_cache.get, cache_key)
+        if cached is not None:
+            return cached
+        
         query = f"Is {ticker} a publicly traded company stock ticker?"
         result = await self.exa.answer(query)
         
-        return {
-            'found': result and 'yes' in result.lower(),
+        company_info = {
+            'found': bool(result) and 'yes' in result.lower(),
             'info': result
-        }
\ No newline at end of file
+        }
+        if result:
+            await asyncio.to_thread(self.company_cache.put, cache_key, company_info)
+        return company_info
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+File Cache
+Small persistent TTL cache for external API responses (Exa, Cerebras)
+so repeat analyses of the same ticker skip the network round-trips.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Optional
+
+# Root of every on-disk cache (this module's namespaces, embeddings, index registry, results)
+CACHE_ROOT = os.getenv(
+    "ANALYSIS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".analysis_cache")
+)
+
+
+class FileCache:
+    """
+    JSON-file cache with a time-to-live.
+
+    Each entry is stored as {"timestamp": ..., "key": ..., "payload": ...} in
+    <CACHE_ROOT>/<namespace>/<md5 of key>.json. Expired or unreadable
+    entries are treated as misses.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float, root: str = CACHE_ROOT):
+        self.directory = os.path.join(root, namespace)
+        self.ttl_seconds = ttl_seconds
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached payload for `key`, or None if missing or expired"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("timestamp", 0) > self.ttl_seconds:
+            return None
+        return entry.get("payload")
+
+    def put(self, key: str, payload: Any):
+        """Store a JSON-serializable payload under `key`; write failures are ignored"""
+        path = self._path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"timestamp": time.time(), "key": key, "payload": payload}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            print(f"Could not write cache entry: {e}")
+
+    def clear_where(self, predicate: Callable[[str], bool]):
+        """Delete the entries whose key satisfies `predicate`; entries stored without their key are kept"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    key = json.load(f).get("key")
+                if key is not None and predicate(key):
+                    os.remove(path)
+            except (OSError, ValueError):
+                continue
@@ -0,0 +1,119 @@
+"""
+Job Store
+Status records for background analysis jobs. Backed by Redis when REDIS_URL
+is set so every API worker sees the same jobs; otherwise kept in process memory.
+"""
+
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    import redis
+except ImportError:  # Optional: only needed for a shared store
+    redis = None
+
+# Finished jobs are only polled for a short while
+JOB_TTL_SECONDS = 3600
+
+# Jobs kept by the in-memory store; the least recently touched finished jobs go first
+MAX_MEMORY_JOBS = 1000
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class JobStore:
+    """
+    Job records keyed by job_id.
+
+    In Redis each job is a hash at job:<job_id> whose field values are JSON,
+    so single-field updates are atomic and records expire after `ttl_seconds`.
+    In memory at most `max_jobs` records are kept, evicting finished jobs first.
+    """
+
+    KEY_PREFIX = "job:"
+
+    def __init__(self, url: Optional[str] = None, ttl_seconds: int = JOB_TTL_SECONDS,
+                 max_connections: int = 32, max_jobs: int = MAX_MEMORY_JOBS):
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._redis = None
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        if url:
+            if redis is None:
+                print("REDIS_URL is set but the redis package is not installed; using in-memory job store")
+            else:
+                pool = redis.ConnectionPool.from_url(url, max_connections=max_connections)
+                self._redis = redis.Redis(connection_pool=pool)
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}{job_id}"
+
+    def create(self, job_id: str, job: Dict[str, Any]):
+        """Store a new job record, replacing any previous job with the same id"""
+        if self._redis is None:
+            self._jobs[job_id] = dict(job)
+            self._jobs.move_to_end(job_id)
+            self._evict()
+            return
+
+        key = self._key(job_id)
+        pipe = self._redis.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={field: json.dumps(value) for field, value in job.items()})
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def update(self, job_id: str, **fields):
+        """Set fields on an existing job"""
+        if self._redis is None:
+            job = self._jobs.get(job_id)
+            if job is not None:  # Already evicted
+                job.update(fields)
+                self._jobs.move_to_end(job_id)
+            return
+
+        key = self._key(job_id)
+        pipe = self._redis.pipeline()
+        pipe.hset(key, mapping={field: json.dumps(value) for field, value in fields.items()})
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def _evict(self):
+        """Drop in-memory jobs beyond max_jobs, oldest finished ones first"""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.get("status") in FINISHED_STATUSES][:excess]
+        for job_id in finished:
+            del self._jobs[job_id]
+
+        # Only running jobs left to drop: evict the least recently touched
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job record, or None if unknown or expired"""
+        if self._redis is None:
+            return self._jobs.get(job_id)
+
+        raw = self._redis.hgetall(self._key(job_id))
+        if not raw:
+            return None
+        return {field.decode(): json.loads(value) for field, value in raw.items()}
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """Return every live job record by job_id"""
+        if self._redis is None:
+            return dict(self._jobs)
+
+        jobs = {}
+        for key in self._redis.scan_iter(match=f"{self.KEY_PREFIX}*", count=100):
+            job_id = key.decode()[len(self.KEY_PREFIX):]
+            job = self.get(job_id)
+            if job is not None:
+                jobs[job_id] = job
+        return jobs
@@ -6,15 +6,100 @@ This replaces the Exa Answer API approach with a more reliable
 document-grounded extraction method.
 """
 
+import functools
 import os
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
+from openai import OpenAI
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # Optional: faster parsing of extraction replies
+    orjson = None
+
+from services.file_cache import FileCache
+
 load_dotenv()
 
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so handlers work with either parser
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Extraction runs at temperature 0, so the same prompt (which embeds the filing
+# excerpts) yields the same values; reuse them for a month
+EXTRACTION_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+# Regex fallback patterns by unit, tried in order when the LLM reply can't be parsed
+_FALLBACK_PATTERNS = {
+    unit: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for unit, patterns in {
+        # Match dollar amounts: $123.4 billion, $123,456,789, etc.
+        'dollars': [
+            r'\$\s*([\d,]+(?:\.\d+)?)\s*(billion|million|B|M)?',
+            r'([\d,]+(?:\.\d+)?)\s*(billion|million)\s*(?:dollars)?',
+        ],
+        # A single decimal number: a run like "1.2.3" or a lone "." can't be captured
+        'percentage': [
+            r'(-?(?:\d+(?:\.\d+)?|\.\d+))\s*%',
+            r'(-?(?:\d+(?:\.\d+)?|\.\d+))\s*percent',
+        ],
+        'ratio': [
+            r'(\d+(?:\.\d+)?|\.\d+)\s*(?:to\s*1|:1|x)?',
+        ],
+        None: [
+            r'([\d,]+(?:\.\d+)?)',
+        ],
+    }.items()
+}
+
+# Pulling numbers out of retrieved text into JSON is a small task: a mini model in
+# JSON mode handles it, and the larger model only sees replies that fail to parse
+FAST_EXTRACTION_MODEL = "gpt-4o-mini"
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+# Shape of one extracted metric; the fast model is held to it with strict structured output
+_METRIC_VALUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "found": {"type": "boolean"},
+        "raw_value": {"type": ["string", "null"]},
+        "numeric_value": {"type": ["number", "null"]},
+        "confidence": {"type": "number"},
+    },
+    "required": ["found", "raw_value", "numeric_value", "confidence"],
+    "additionalProperties": False,
+}
+
+
+def _json_schema_format(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """response_format requiring replies that match `schema` exactly"""
+    return {"type": "json_schema", "json_schema": {"name": "metric_values", "strict": True, "schema": schema}}
+
+
+@functools.lru_cache(maxsize=None)
+def _get_llm() -> ChatOpenAI:
+    """Lazily create the process-wide extraction LLM client"""
+    return ChatOpenAI(
+        model="gpt-4-turbo-preview",
+        temperature=0,  # Zero temperature for precise extraction
+        api_key=os.getenv("OPENAI_API_KEY"),
+        model_kwargs={"response_format": JSON_RESPONSE_FORMAT}
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_fast_llm() -> ChatOpenAI:
+    """Lazily create the process-wide JSON-mode extraction client tried before _get_llm()"""
+    return ChatOpenAI(
+        model=FAST_EXTRACTION_MODEL,
+        temperature=0,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        model_kwargs={"response_format": JSON_RESPONSE_FORMAT}
+    )
+
 
 class MetricExtractor:
     """
@@ -115,6 +200,36 @@ class MetricExtractor:
         },
     }
 
+    # Lowercased alias -> metric key; built in reverse so the first definition listing an alias wins
+    ALIAS_INDEX = {
+        alias.lower(): key
+        for key, definition in reversed(list(METRIC_DEFINITIONS.items()))
+        for alias in definition['aliases']
+    }
+
+    # Key metrics extracted by extract_standard_metrics() and submit_batch()
+    STANDARD_METRICS = [
+        'revenue',
+        'net_income',
+        'gross_profit',
+        'operating_income',
+        'operating_margin',
+        'total_assets',
+        'total_debt',
+        'cash',
+        'eps',
+        'revenue_growth',
+    ]
+
+    # Metrics extracted per LLM prompt; accuracy drops when one prompt carries many more
+    MAX_METRICS_PER_PROMPT = 8
+
+    # Metric questions are templated, so paraphrases of the same metric (e.g. an alias
+    # resolved to a generic question) sit close together; reuse answers above this similarity.
+    # Sibling templates ("net income" / "operating income") can score as high, so answers
+    # are only reused within one metric key (the cache_key passed to query_by_embedding).
+    ANSWER_SIMILARITY = 0.95
+
     def __init__(self, rag_instance=None):
         """
         Initialize MetricExtractor.
@@ -123,19 +238,39 @@ class MetricExtractor:
             rag_instance: Optional SECFilingRAG instance. If not provided, one will be created.
         """
         self.rag = rag_instance
-        self.llm = ChatOpenAI(
-            model="gpt-4-turbo-preview",
-            temperature=0,  # Zero temperature for precise extraction
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self.llm = _get_llm()
+        self.llm_fast = _get_fast_llm()
+        self.extraction_cache = FileCache("metric_extraction", EXTRACTION_CACHE_TTL_SECONDS)
 
     def _get_rag(self):
-        """Lazy initialization of RAG instance."""
+        """Lazy initialization of RAG instance, with its semantic answer cache enabled."""
         if self.rag is None:
             from rag.pinecone_rag import SECFilingRAG
-            self.rag = SECFilingRAG()
+            self.rag = SECFilingRAG(semantic_cache=True, answer_similarity=self.ANSWER_SIMILARITY)
         return self.rag
 
+    def _resolve_metric(self, metric_name: str) -> Tuple[str, Dict[str, Any]]:
+        """Map a metric name or alias to its canonical key and definition."""
+        metric_key = metric_name.lower().replace(' ', '_').replace('-', '_')
+
+        # Get metric definition
+        metric_def = self.METRIC_DEFINITIONS.get(metric_key)
+        if metric_def:
+            return metric_key, metric_def
+
+        # Try to find by alias
+        key = self.ALIAS_INDEX.get(metric_name.lower())
+        if key is not None:
+            return key, self.METRIC_DEFINITIONS[key]
+
+        # Use generic extraction
+        return metric_key, {
+            'aliases': [metric_name],
+            'unit': 'unknown',
+            'typical_section': None,
+            'question_template': f"What is {{ticker}}'s {metric_name}? Provide the exact value."
+        }
+
     def extract_metric(self, metric_name: str, ticker: str) -> Dict[str, Any]:
         """
         Extract a specific financial metric from the indexed filing.
@@ -155,50 +290,22 @@ class MetricExtractor:
                 - confidence: float (0-1)
                 - context: str (relevant text snippet)
         """
-        metric_key = metric_name.lower().replace(' ', '_').replace('-', '_')
-
-        # Get metric definition
-        metric_def = self.METRIC_DEFINITIONS.get(metric_key)
-        if not metric_def:
-            # Try to find by alias
-            for key, definition in self.METRIC_DEFINITIONS.items():
-                if metric_name.lower() in [a.lower() for a in definition['aliases']]:
-                    metric_def = definition
-                    metric_key = key
-                    break
-
-        if not metric_def:
-            # Use generic extraction
-            metric_def = {
-                'aliases': [metric_name],
-                'unit': 'unknown',
-                'typical_section': None,
-                'question_template': f"What is {{ticker}}'s {metric_name}? Provide the exact value."
-            }
+        metric_key, metric_def = self._resolve_metric(metric_name)
 
         # Build the question
         question = metric_def['question_template'].format(ticker=ticker)
 
-        # Query RAG
+        # Query RAG once across the whole filing, ranking the typical section first
         rag = self._get_rag()
-
-        # First try with section filter if we know the typical section
-        rag_result = None
-        if metric_def.get('typical_section'):
-            rag_result = rag.query(
-                question=question,
-                ticker=ticker,
-                top_k=5,
-                section_filter=metric_def['typical_section']
-            )
-
-        # If no results or low confidence, try without filter
-        if not rag_result or not rag_result.get('success'):
-            rag_result = rag.query(
-                question=question,
-                ticker=ticker,
-                top_k=8
+        try:
+            rag_result = rag.query_by_embedding(
+                question, rag.embed_question(question), ticker,
+                top_k=8,
+                prefer_section=metric_def.get('typical_section'),
+                cache_key=metric_key
             )
+        except Exception as e:
+            rag_result = {'success': False, 'error': str(e)}
 
         if not rag_result.get('success'):
             return {
@@ -232,6 +339,296 @@ class MetricExtractor:
             'ticker': ticker
         }
 
+    def extract_metrics_batch(self, metric_names: List[str], ticker: str,
+                              max_workers: int = 5) -> Dict[str, Dict[str, Any]]:
+        """
+        Extract several metrics with one embedding call and one LLM call per
+        MAX_METRICS_PER_PROMPT metrics.
+
+        All metric questions are embedded in a single batch, the Pinecone
+        searches run in parallel, and each LLM prompt extracts its metrics'
+        values as JSON (prompts also run in parallel). Falls back to
+        extract_metric() per metric if the batched embedding call fails, or
+        for the metrics of a prompt whose extraction fails.
+
+        Args:
+            metric_names: List of metric names to extract
+            ticker: Stock ticker
+            max_workers: Maximum number of Pinecone searches in flight
+
+        Returns:
+            Dict mapping metric names to extract_metric()-style results
+        """
+        retrieved = self._retrieve_metrics(metric_names, ticker, max_workers)
+        if retrieved is None:
+            return self.extract_multiple_metrics(metric_names, ticker)
+        resolved, retrievals = retrieved
+
+        found = [
+            (name, metric_key, metric_def, retrieval)
+            for name, (metric_key, metric_def), retrieval in zip(metric_names, resolved, retrievals)
+            if retrieval.get('success')
+        ]
+
+        groups = [found[i:i + self.MAX_METRICS_PER_PROMPT]
+                  for i in range(0, len(found), self.MAX_METRICS_PER_PROMPT)]
+
+        def extract_group(group) -> Optional[Dict[str, Dict[str, Any]]]:
+            return self._extract_values_batch(
+                [(metric_key, metric_def['unit'], retrieval['context'])
+                 for _, metric_key, metric_def, retrieval in group],
+                ticker
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            extracted_groups = list(pool.map(extract_group, groups))
+
+        results = {}
+        for name, (metric_key, _), retrieval in zip(metric_names, resolved, retrievals):
+            if not retrieval.get('success'):
+                results[name] = {
+                    'success': False,
+                    'metric_name': metric_key,
+                    'value': None,
+                    'error': retrieval.get('error', 'Failed to query RAG'),
+                    'ticker': ticker
+                }
+
+        extracted = {}
+        for group, group_values in zip(groups, extracted_groups):
+            if group_values is None:
+                # Extraction for this prompt failed: fall back to one query per metric
+                for name, _, _, _ in group:
+                    results[name] = self.extract_metric(name, ticker)
+            else:
+                extracted.update(group_values)
+
+        for name, metric_key, metric_def, retrieval in found:
+            if name in results:
+                continue
+            value = extracted.get(metric_key)
+            if not isinstance(value, dict):
+                value = {}
+            source_sections = retrieval.get('sections_searched', [])
+            results[name] = {
+                'success': bool(value.get('found', False)),
+                'metric_name': metric_key,
+                'value': value.get('numeric_value'),
+                'raw_value': value.get('raw_value'),
+                'unit': metric_def['unit'],
+                'source_section': source_sections[0] if source_sections else 'unknown',
+                'confidence': value.get('confidence', 0.0),
+                'context': retrieval['context'][:500],  # Truncated context
+                'ticker': ticker
+            }
+
+        return {name: results[name] for name in metric_names}
+
+    def _retrieve_metrics(self, metric_names: List[str], ticker: str, max_workers: int
+                          ) -> Optional[Tuple[List[Tuple[str, Dict[str, Any]]], List[Dict[str, Any]]]]:
+        """
+        Resolve metrics and retrieve filing context for each, embedding all questions in one call.
+
+        Returns (resolved metrics, retrievals) in metric order, or None if the embedding call fails.
+        """
+        resolved = [self._resolve_metric(name) for name in metric_names]
+        questions = [metric_def['question_template'].format(ticker=ticker) for _, metric_def in resolved]
+        rag = self._get_rag()
+
+        try:
+            embeddings = rag.embed_queries(questions)
+        except Exception:
+            return None
+
+        def retrieve(metric_def: Dict[str, Any], embedding: List[float]) -> Dict[str, Any]:
+            # Same strategy as extract_metric: one search, typical section ranked first
+            return rag.retrieve_by_embedding(
+                embedding, ticker, top_k=8, prefer_section=metric_def.get('typical_section')
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            retrievals = list(pool.map(retrieve, [d for _, d in resolved], embeddings))
+
+        return resolved, retrievals
+
+    def _extract_values_batch(self, metrics: List[Tuple[str, str, str]],
+                              ticker: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Use one LLM call to extract numeric values for several metrics.
+
+        Args:
+            metrics: (metric_key, unit, filing context) tuples
+
+        Returns:
+            Dict mapping metric keys to {found, raw_value, numeric_value, confidence},
+            or None if the call or JSON parsing fails
+        """
+        try:
+            result = self._invoke_json(
+                self._batch_extraction_prompt(metrics, ticker),
+                self._batch_extraction_schema([metric_key for metric_key, _, _ in metrics])
+            )
+        except Exception:
+            return None
+
+        return result if isinstance(result, dict) else None
+
+    @staticmethod
+    def _batch_extraction_schema(metric_keys: List[str]) -> Dict[str, Any]:
+        """JSON schema for a batched reply: one metric value object per key"""
+        return {
+            "type": "object",
+            "properties": {metric_key: _METRIC_VALUE_SCHEMA for metric_key in metric_keys},
+            "required": list(metric_keys),
+            "additionalProperties": False,
+        }
+
+    def _batch_extraction_prompt(self, metrics: List[Tuple[str, str, str]], ticker: str) -> str:
+        """Prompt asking for several metrics as one JSON object; metrics are (key, unit, context) tuples"""
+        sections = "\n\n".join(
+            f"=== {metric_key} ({unit}) ===\n{context}"
+            for metric_key, unit, context in metrics
+        )
+
+        return f"""Extract the following financial metrics for {ticker} from the SEC filing excerpts below.
+Each metric has its own excerpts, headed by the metric name and its unit.
+
+{sections}
+
+INSTRUCTIONS:
+1. Find the most recent/relevant value for each metric, using only that metric's excerpts
+2. If the value is in millions or billions, convert to full number
+3. For percentages, return the number without the % sign
+4. If you cannot find a value, set found to false for that metric
+
+Return your answer as a JSON object with one key per metric name, each in this exact format:
+{{
+    "found": true or false,
+    "raw_value": "the exact text containing the number (e.g., '$394.3 billion')",
+    "numeric_value": the number as a float (e.g., 394300000000),
+    "confidence": your confidence from 0.0 to 1.0
+}}
+
+Only return the JSON, nothing else."""
+
+    def submit_batch(self, tickers: List[str], metric_names: Optional[List[str]] = None,
+                     max_workers: int = 5) -> Dict[str, Any]:
+        """
+        Queue metric extraction for several tickers as an OpenAI Batch API job.
+
+        For offline runs (e.g. nightly refreshes): batch requests complete within
+        24 hours at half the price of synchronous calls. Filing context is
+        retrieved now; only the extraction prompts are batched. Collect the
+        values with collect_batch().
+
+        Args:
+            tickers: Tickers whose filings are already indexed
+            metric_names: Metrics to extract (defaults to STANDARD_METRICS)
+            max_workers: Maximum number of Pinecone searches in flight
+
+        Returns:
+            Dict with success, batch_id, number of requests, and tickers skipped
+        """
+        metric_names = metric_names or self.STANDARD_METRICS
+        requests = []
+        skipped = []
+        for ticker in tickers:
+            retrieved = self._retrieve_metrics(metric_names, ticker, max_workers)
+            metrics = [
+                (metric_key, metric_def['unit'], retrieval['context'])
+                for (metric_key, metric_def), retrieval in zip(*retrieved)
+                if retrieval.get('success')
+            ] if retrieved is not None else []
+            if not metrics:
+                skipped.append(ticker)
+                continue
+
+            for start in range(0, len(metrics), self.MAX_METRICS_PER_PROMPT):
+                group = metrics[start:start + self.MAX_METRICS_PER_PROMPT]
+                prompt = self._batch_extraction_prompt(group, ticker)
+                requests.append({
+                    "custom_id": f"{ticker}:{start // self.MAX_METRICS_PER_PROMPT}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": self.llm_fast.model_name,
+                        "temperature": 0,
+                        "response_format": _json_schema_format(
+                            self._batch_extraction_schema([metric_key for metric_key, _, _ in group])
+                        ),
+                        "messages": [{"role": "user", "content": prompt}]
+                    }
+                })
+
+        if not requests:
+            return {'success': False, 'error': 'No filing context found for any ticker', 'skipped': skipped}
+
+        try:
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            payload = "\n".join(json.dumps(request) for request in requests).encode("utf-8")
+            input_file = client.files.create(file=("metric_extraction.jsonl", payload), purpose="batch")
+            batch = client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except Exception as e:
+            return {'success': False, 'error': str(e), 'skipped': skipped}
+
+        return {'success': True, 'batch_id': batch.id, 'requests': len(requests), 'skipped': skipped}
+
+    def collect_batch(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Fetch the results of a submit_batch() job.
+
+        Returns:
+            Dict with success and status; once the job has completed, 'metrics'
+            maps each ticker to {metric_key: {found, raw_value, numeric_value, confidence}}
+        """
+        try:
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            batch = client.batches.retrieve(batch_id)
+            if batch.status != "completed":
+                return {'success': False, 'status': batch.status}
+            output = client.files.content(batch.output_file_id).text
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+        metrics: Dict[str, Dict[str, Any]] = {}
+        for line in output.splitlines():
+            record = _json_loads(line)
+            ticker = record['custom_id'].rsplit(':', 1)[0]
+            try:
+                values = _json_loads(record['response']['body']['choices'][0]['message']['content'])
+            except (KeyError, IndexError, TypeError, ValueError):
+                continue  # Failed request or unparseable reply: leave those metrics out
+            if isinstance(values, dict):
+                metrics.setdefault(ticker, {}).update(values)
+
+        return {'success': True, 'status': batch.status, 'metrics': metrics}
+
+    def _invoke_json(self, prompt: str, schema: Dict[str, Any] = _METRIC_VALUE_SCHEMA) -> Any:
+        """
+        Send an extraction prompt and parse the JSON reply.
+
+        Both models run in JSON mode, so replies are bare JSON. The fast model
+        answers first, constrained to `schema`; if its reply does not parse,
+        the prompt is retried on the full model. Parsed replies are cached by
+        model and prompt; raises if the calls fail or no reply is valid JSON.
+        """
+        cache_key = f"{self.llm_fast.model_name}>{self.llm.model_name}|{prompt}"
+        cached = self.extraction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            reply = self.llm_fast.bind(response_format=_json_schema_format(schema)).invoke(prompt)
+            result = _json_loads(reply.content)
+        except json.JSONDecodeError:
+            result = _json_loads(self.llm.invoke(prompt).content)
+        self.extraction_cache.put(cache_key, result)
+        return result
+
     def _extract_value_from_answer(self, answer: str, metric_name: str,
                                     unit: str, ticker: str) -> Dict[str, Any]:
         """
@@ -260,17 +657,7 @@ Return your answer in this exact JSON format:
 Only return the JSON, nothing else."""
 
         try:
-            response = self.llm.invoke(extraction_prompt)
-            response_text = response.content.strip()
-
-            # Parse JSON from response
-            # Handle potential markdown code blocks
-            if '```json' in response_text:
-                response_text = response_text.split('```json')[1].split('```')[0]
-            elif '```' in response_text:
-                response_text = response_text.split('```')[1].split('```')[0]
-
-            result = json.loads(response_text)
+            result = self._invoke_json(extraction_prompt)
 
             return {
                 'success': result.get('found', False),
@@ -287,29 +674,10 @@ Only return the JSON, nothing else."""
         """
         Fallback regex-based extraction when LLM parsing fails.
         """
-        # Patterns for different units
-        if unit == 'dollars':
-            # Match dollar amounts: $123.4 billion, $123,456,789, etc.
-            patterns = [
-                r'\$\s*([\d,]+(?:\.\d+)?)\s*(billion|million|B|M)?',
-                r'([\d,]+(?:\.\d+)?)\s*(billion|million)\s*(?:dollars)?',
-            ]
-        elif unit == 'percentage':
-            patterns = [
-                r'([-]?[\d.]+)\s*%',
-                r'([-]?[\d.]+)\s*percent',
-            ]
-        elif unit == 'ratio':
-            patterns = [
-                r'([\d.]+)\s*(?:to\s*1|:1|x)?',
-            ]
-        else:
-            patterns = [
-                r'([\d,]+(?:\.\d+)?)',
-            ]
+        patterns = _FALLBACK_PATTERNS.get(unit, _FALLBACK_PATTERNS[None])
 
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = pattern.search(text)
             if match:
                 value_str = match.group(1).replace(',', '')
                 try:
@@ -339,21 +707,22 @@ Only return the JSON, nothing else."""
             'confidence': 0.0
         }
 
-    def extract_multiple_metrics(self, metric_names: List[str], ticker: str) -> Dict[str, Dict[str, Any]]:
+    def extract_multiple_metrics(self, metric_names: List[str], ticker: str,
+                                 max_workers: int = 5) -> Dict[str, Dict[str, Any]]:
         """
-        Extract multiple metrics at once.
+        Extract multiple metrics at once, running extract_metric() for each in parallel.
 
         Args:
             metric_names: List of metric names to extract
             ticker: Stock ticker
+            max_workers: Maximum number of extractions in flight
 
         Returns:
             Dict mapping metric names to their extraction results
         """
-        results = {}
-        for metric_name in metric_names:
-            results[metric_name] = self.extract_metric(metric_name, ticker)
-        return results
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(lambda metric_name: self.extract_metric(metric_name, ticker), metric_names)
+            return dict(zip(metric_names, results))
 
     def extract_standard_metrics(self, ticker: str) -> Dict[str, Dict[str, Any]]:
         """
@@ -361,19 +730,7 @@ Only return the JSON, nothing else."""
 
         Returns all commonly used metrics for financial analysis.
         """
-        standard_metrics = [
-            'revenue',
-            'net_income',
-            'gross_profit',
-            'operating_income',
-            'operating_margin',
-            'total_assets',
-            'total_debt',
-            'cash',
-            'eps',
-            'revenue_growth',
-        ]
-        return self.extract_multiple_metrics(standard_metrics, ticker)
+        return self.extract_metrics_batch(self.STANDARD_METRICS, ticker)
 
 
 # Test function
@@ -0,0 +1,43 @@
+"""
+Retry policy for OpenAI and Pinecone calls
+Retries rate limits and transient server/connection errors with exponential backoff and jitter
+"""
+
+import openai
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+# HTTP statuses worth retrying (Pinecone API exceptions expose `.status`)
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+MAX_WAIT_SECONDS = 20
+
+_backoff = wait_random_exponential(min=1, max=MAX_WAIT_SECONDS)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """True for rate limits, timeouts, connection drops and 5xx responses"""
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return getattr(exc, "status", None) in TRANSIENT_STATUS_CODES
+
+
+def _wait(retry_state) -> float:
+    """Honour the provider's Retry-After header when present, otherwise back off with jitter"""
+    exc = retry_state.outcome.exception()
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_WAIT_SECONDS)
+        except ValueError:
+            pass
+    return _backoff(retry_state)
+
+
+# Decorator for any sync or async function that calls OpenAI/Pinecone
+retry_transient = retry(
+    retry=retry_if_exception(is_transient_error),
+    wait=_wait,
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
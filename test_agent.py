@@ -17,14 +17,48 @@ class TeeOutput:
         self.stdout.flush()
         self.file.flush()
 
-async def test_hyln():
-    """Test the agent with HYLN ticker"""
+def print_analysis(analysis):
+    """Print one agent result"""
+    print(f"\nAnalysis complete!")
+    print(f"Ticker: {analysis['ticker']}")
+    print(f"Confidence: {analysis['confidence']:.1%}")
+    print(f"Recommendation: {analysis['recommendation']}")
+    if analysis.get('status') == 'failed':
+        print(f"ERROR: {analysis['error']}")
+        return
+
+    # Show detailed results
+    print(f"\n=== DETAILED ANALYSIS ===")
+    print(f"Metrics found: {list(analysis.get('metrics', {}).keys())}")
+    print(f"Insights: {len(analysis.get('insights', []))}")
+    print(f"Risks: {len(analysis.get('risks', []))}")
+    print(f"Opportunities: {len(analysis.get('opportunities', []))}")
+
+    # Show actual metric values
+    print(f"\n=== METRIC VALUES ===")
+    metrics = analysis.get('metrics', {})
+    for key, value in metrics.items():
+        print(f"{key}: {value}")
+
+    # Show insights and opportunities
+    print(f"\n=== INSIGHTS ===")
+    for insight in analysis.get('insights', []):
+        print(f"• {insight}")
+
+    print(f"\n=== OPPORTUNITIES ===")
+    for opp in analysis.get('opportunities', []):
+        print(f"• {opp}")
+
+async def test_hyln(tickers=None):
+    """Test the agent with one or more tickers (default: GOEV) in a single event loop"""
+    tickers = tickers or ["GOEV (Canoo)"]
 
     # Create output file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"agent_test_output_{timestamp}.txt"
 
-    with open(filename, 'w') as f:
+    # Large buffer: the file side only hits the disk every 64KB (or on close)
+    with open(filename, 'w', buffering=65536) as f:
         # Write header to file
         f.write(f"Financial Analyst Agent Test Output\n")
         f.write(f"Generated: {datetime.now().isoformat()}\n")
@@ -35,39 +69,15 @@ async def test_hyln():
         sys.stdout = TeeOutput(f)
 
         try:
-            print("Testing Financial Analyst Agent with GOEV (Canoo)...")
+            print(f"Testing Financial Analyst Agent with {', '.join(tickers)}...")
 
-            agent = FinancialAnalystAgent("GOEV (Canoo)")
-            analysis = await agent.run()
+            # All tickers share one loop, so the RAG, OpenAI and EDGAR clients
+            # (and their open connections) are reused instead of rebuilt per ticker
+            analyses = await FinancialAnalystAgent.analyze_batch(tickers)
+            for analysis in analyses:
+                print_analysis(analysis)
 
-            print(f"\nAnalysis complete!")
-            print(f"Ticker: {analysis['ticker']}")
-            print(f"Confidence: {analysis['confidence']:.1%}")
-            print(f"Recommendation: {analysis['recommendation']}")
-
-            # Show detailed results
-            print(f"\n=== DETAILED ANALYSIS ===")
-            print(f"Metrics found: {list(analysis.get('metrics', {}).keys())}")
-            print(f"Insights: {len(analysis.get('insights', []))}")
-            print(f"Risks: {len(analysis.get('risks', []))}")
-            print(f"Opportunities: {len(analysis.get('opportunities', []))}")
-
-            # Show actual metric values
-            print(f"\n=== METRIC VALUES ===")
-            metrics = analysis.get('metrics', {})
-            for key, value in metrics.items():
-                print(f"{key}: {value}")
-
-            # Show insights and opportunities
-            print(f"\n=== INSIGHTS ===")
-            for insight in analysis.get('insights', []):
-                print(f"• {insight}")
-
-            print(f"\n=== OPPORTUNITIES ===")
-            for opp in analysis.get('opportunities', []):
-                print(f"• {opp}")
-
-            return analysis
+            return analyses
 
         except Exception as e:
             print(f"ERROR: {str(e)}")
@@ -81,4 +91,4 @@ async def test_hyln():
             print(f"\n✅ Test output also saved to: {filename}")
 
 if __name__ == "__main__":
-    asyncio.run(test_hyln())
\ No newline at end of file
+    asyncio.run(test_hyln(sys.argv[1:]))
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Answer-cache scoping for metric questions: templated questions for different
+metrics must never be answered from each other's cache entries, however
+close their embeddings are. Runs without Pinecone or OpenAI calls.
+"""
+
+from rag.pinecone_rag import SECFilingRAG
+from rag.query_cache import SemanticCache
+from services.metric_extractor import MetricExtractor
+
+TICKER = "AAPL"
+
+
+class EchoLLM:
+    """Answers with the question it was asked"""
+    def invoke(self, messages):
+        return type("Response", (), {"content": messages[-1][1]})()
+
+
+def make_rag():
+    """SECFilingRAG with its answer cache on, no clients, and one embedding for every question"""
+    rag = SECFilingRAG.__new__(SECFilingRAG)
+    rag.answer_cache = SemanticCache(max_distance=1.0 - MetricExtractor.ANSWER_SIMILARITY)
+    rag.llm = EchoLLM()
+    rag.embed_question = lambda question: [1.0, 0.0, 0.0]
+    rag.retrieve_by_embedding = lambda *args, **kwargs: {
+        "success": True, "context": "", "sources": [], "context_used": 0, "sections_searched": []
+    }
+    return rag
+
+
+def make_extractor(rag):
+    """MetricExtractor over `rag` that returns the RAG answer without an extraction LLM call"""
+    extractor = MetricExtractor.__new__(MetricExtractor)
+    extractor.rag = rag
+    extractor._extract_value_from_answer = lambda answer, **kwargs: {"success": True, "value": None}
+    return extractor
+
+
+def question_for(metric_key):
+    return MetricExtractor.METRIC_DEFINITIONS[metric_key]['question_template'].format(ticker=TICKER)
+
+
+def test_sibling_metric_templates_never_share_an_answer():
+    for first, second in [("net_income", "operating_income"), ("gross_margin", "operating_margin")]:
+        extractor = make_extractor(make_rag())
+
+        first_result = extractor.extract_metric(first, TICKER)
+        second_result = extractor.extract_metric(second, TICKER)
+
+        assert question_for(first) in first_result['context']
+        assert question_for(second) in second_result['context'], f"{second} got {first}'s answer"
+
+
+def test_same_metric_reuses_its_answer():
+    rag = make_rag()
+    question = question_for("revenue")
+
+    rag.query_by_embedding(question, rag.embed_question(question), TICKER, top_k=8, cache_key="revenue")
+    again = rag.query_by_embedding(question, rag.embed_question(question), TICKER, top_k=8, cache_key="revenue")
+
+    assert again.get("cached")
+
+
+if __name__ == "__main__":
+    test_sibling_metric_templates_never_share_an_answer()
+    test_same_metric_reuses_its_answer()
+    print("ok")
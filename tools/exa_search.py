@@ -3,7 +3,9 @@ Exa Search Tool for finding SEC filing URLs
 Uses Exa AI to search for the latest 10-K/10-Q filings on SEC EDGAR
 """
 
+import functools
 import os
+import re
 from typing import Optional, Type
 from pydantic import BaseModel, Field
 from crewai.tools import BaseTool
@@ -12,6 +14,15 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# EDGAR archive URLs ending in .htm/.html (the actual filing document)
+_SEC_EDGAR_RE = re.compile(r'sec\.gov.*/Archives/edgar/.*\.html?$')
+
+
+@functools.lru_cache(maxsize=None)
+def _get_exa_client() -> Exa:
+    """Lazily create the Exa client shared by every SECFilingSearchTool"""
+    return Exa(api_key=os.getenv("EXA_API_KEY"))
+
 
 class SECFilingSearchInput(BaseModel):
     """Input schema for SEC Filing Search"""
@@ -29,10 +40,6 @@ class SECFilingSearchTool(BaseTool):
     )
     args_schema: Type[BaseModel] = SECFilingSearchInput
 
-    def __init__(self):
-        super().__init__()
-        self._exa = Exa(api_key=os.getenv("EXA_API_KEY"))
-
     def _run(self, ticker: str, filing_type: str = "10-K") -> dict:
         """
         Search for SEC filing URL using Exa AI
@@ -49,7 +56,7 @@ class SECFilingSearchTool(BaseTool):
 
         try:
             # Search using Exa
-            results = self._exa.search(
+            results = _get_exa_client().search(
                 query=query,
                 num_results=5,
                 use_autoprompt=True
@@ -58,15 +65,12 @@ class SECFilingSearchTool(BaseTool):
             # Filter for SEC EDGAR URLs
             sec_urls = []
             for result in results.results:
-                url = result.url
-                if "sec.gov" in url and "/Archives/edgar/" in url:
-                    # Prefer .htm files (the actual filing)
-                    if url.endswith(".htm") or url.endswith(".html"):
-                        sec_urls.append({
-                            "url": url,
-                            "title": result.title,
-                            "published_date": getattr(result, "published_date", None)
-                        })
+                if _SEC_EDGAR_RE.search(result.url):
+                    sec_urls.append({
+                        "url": result.url,
+                        "title": result.title,
+                        "published_date": getattr(result, "published_date", None)
+                    })
 
             if not sec_urls:
                 # Try alternate search
@@ -100,7 +104,7 @@ class SECFilingSearchTool(BaseTool):
             # More specific query
             query = f"SEC EDGAR {ticker} {filing_type} annual report 2024"
 
-            results = self._exa.search(
+            results = _get_exa_client().search(
                 query=query,
                 num_results=10,
                 use_autoprompt=True
@@ -4,14 +4,186 @@ Downloads SEC filings from EDGAR as PDF and extracts text content
 PDFs preserve financial tables and numbers better than HTML
 """
 
+import asyncio
+import functools
+import multiprocessing
 import os
 import re
+import aiohttp
 import requests
 import tempfile
-from typing import Optional, Type, Dict, List, ClassVar
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional, Type, Dict, List, ClassVar
 from pydantic import BaseModel, Field
 from crewai.tools import BaseTool
-import pdfplumber
+import pymupdf
+from requests.adapters import HTTPAdapter
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # Optional: HTML filings are then parsed with BeautifulSoup
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401  (only needed as BeautifulSoup's parser backend)
+    _HTML_PARSER = 'lxml'
+except ImportError:  # Optional: fall back to the slower pure-Python parser
+    _HTML_PARSER = 'html.parser'
+
+from services.file_cache import FileCache
+
+
+# SEC fair-access policy: at most 10 requests per second per client
+EDGAR_MAX_REQUESTS_PER_SECOND = 10
+
+
+class _EdgarThrottle:
+    """Spaces out EDGAR requests process-wide so concurrent downloads stay under the rate limit"""
+
+    def __init__(self, max_per_second: float):
+        self._interval = 1.0 / max_per_second
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Claim the next request slot; returns seconds to wait for it"""
+        with self._lock:
+            slot = max(time.monotonic(), self._next_slot)
+            self._next_slot = slot + self._interval
+        return slot - time.monotonic()
+
+    def wait(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def await_slot(self):
+        """Async counterpart of wait(); shares the same slots, so both paths count toward one limit"""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_edgar_throttle = _EdgarThrottle(EDGAR_MAX_REQUESTS_PER_SECOND)
+
+
+def set_edgar_rate_limit(max_per_second: float):
+    """Replace this process's EDGAR rate limit (worker processes each take a share of it)"""
+    global _edgar_throttle
+    _edgar_throttle = _EdgarThrottle(max_per_second)
+
+# Pooled connections to sec.gov / data.sec.gov, shared by every downloader instance
+_edgar_session = requests.Session()
+_edgar_session.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
+
+# Last EDGAR JSON responses with their validators, for conditional GETs
+_edgar_json_cache = FileCache("edgar_json", ttl_seconds=30 * 24 * 3600)
+
+# Extracted text of each filing by accession number; a filing never changes once
+# published, so a repeat download only costs the submissions lookup. Bump the
+# version when extraction changes so older text is not reused
+_filing_text_cache = FileCache("filing_text", ttl_seconds=365 * 24 * 3600)
+FILING_TEXT_CACHE_VERSION = 1
+
+COMPANY_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+
+# How long a cached EDGAR JSON document is trusted without even a conditional GET.
+# A company's submissions change only when it files; a filing's directory never
+# changes once accepted (so it lives as long as the cache entry itself)
+SUBMISSIONS_MAX_AGE_SECONDS = 3600
+FILING_INDEX_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+# Ticker -> CIK map built from company_tickers.json; EDGAR refreshes that file about daily
+TICKER_MAP_TTL_SECONDS = 24 * 3600
+_ticker_ciks: Optional[Dict[str, str]] = None
+_ticker_ciks_expires = 0.0
+_ticker_ciks_lock = threading.Lock()
+
+
+def _cached_ticker_ciks() -> Optional[Dict[str, str]]:
+    """The in-memory ticker -> CIK map, or None if it hasn't been loaded or has expired"""
+    return _ticker_ciks if time.monotonic() < _ticker_ciks_expires else None
+
+
+def _load_ticker_ciks(data: Dict) -> Dict[str, str]:
+    """Build the ticker -> zero-padded CIK map from company_tickers.json and keep it in memory"""
+    global _ticker_ciks, _ticker_ciks_expires
+    ticker_ciks: Dict[str, str] = {}
+    for entry in data.values():
+        # First listing wins, as with the linear scan this replaces
+        ticker_ciks.setdefault(entry.get('ticker'), str(entry.get('cik_str')).zfill(10))
+    _ticker_ciks, _ticker_ciks_expires = ticker_ciks, time.monotonic() + TICKER_MAP_TTL_SECONDS
+    return ticker_ciks
+
+
+# Substrings marking a filing directory's PDF as the main 10-K / 10-Q document
+_FORM_PDF_NAMES = ('10-k', '10k', '10-q', '10q')
+
+# Markup dropped before text extraction, and the elements whose text is collected
+_NON_CONTENT_TAGS = ['script', 'style', 'meta', 'link', 'head', 'noscript']
+_TEXT_BLOCK_TAGS = ['h1', 'h2', 'h3', 'h4', 'p', 'div', 'span', 'li']
+
+# Inline style of elements hidden from readers (XBRL headers and the like)
+_HIDDEN_STYLE_RE = re.compile(r'display:\s*none', re.IGNORECASE)
+
+# Inline XBRL: the <ix:header> block (hidden facts, contexts, units) is dropped whole;
+# other ix: tags only wrap visible text, so they are unwrapped before parsing
+_IXBRL_HEADER_RE = re.compile(r'<ix:header\b.*?</ix:header\s*>', re.IGNORECASE | re.DOTALL)
+_IXBRL_TAG_RE = re.compile(r'</?ix:[^>]*>', re.IGNORECASE)
+
+# Start of an SEC filing section header (Item 1, Item 1A, Part II, ...), matched against uppercased text
+_SEC_HEADER_RE = re.compile(
+    r'ITEM\s+\d+[A-Z]?\b'
+    r'|PART\s+[IVX]+\b'
+    r'|SIGNATURES?\b'
+    r'|EXHIBIT\s+INDEX\b'
+    r'|FINANCIAL\s+STATEMENTS\b'
+    r'|MANAGEMENT.S\s+DISCUSSION\b'
+    r'|RISK\s+FACTORS\b'
+    r'|BUSINESS\b'
+    r'|PROPERTIES\b'
+    r'|LEGAL\s+PROCEEDINGS\b'
+)
+
+# Extracted-text cleanup
+_WHITESPACE_RE = re.compile(r'\s+')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+_SPACE_RUN_RE = re.compile(r' {2,}')
+_UNDERSCORE_RUN_RE = re.compile(r'_{3,}')
+_URL_RE = re.compile(r'https?://[^\s]+')
+
+# Pages with less text than this (cover art, signature scans, graphics-heavy exhibits)
+# can't hold a useful table, so they skip find_tables() and its layout analysis
+MIN_TABLE_PAGE_CHARS = 100
+
+
+def _page_text_parts(page) -> List[str]:
+    """A PDF page's text followed by its table rows, one ' | '-joined line per row"""
+    text_parts = []
+    page_text = page.get_text("text")
+    if page_text:
+        text_parts.append(page_text)
+    if len(page_text.strip()) < MIN_TABLE_PAGE_CHARS:
+        return text_parts
+
+    # Also extract tables
+    for table in page.find_tables().tables:
+        for row in table.extract():
+            if row:
+                row_text = ' | '.join([str(cell) if cell else '' for cell in row])
+                text_parts.append(row_text)
+    return text_parts
+
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> List[str]:
+    """Text parts of pages [start, stop) of a PDF file; top-level so process pool workers can run it"""
+    text_parts = []
+    with pymupdf.open(path) as pdf:
+        for page_number in range(start, stop):
+            text_parts.extend(_page_text_parts(pdf.load_page(page_number)))
+    return text_parts
 
 
 class SECDownloaderInput(BaseModel):
@@ -36,6 +208,112 @@ class SECDownloaderTool(BaseTool):
         'Accept': 'application/json,application/pdf,text/html',
     }
 
+    # Read size when streaming filing PDFs (tens of MB) into memory
+    PDF_DOWNLOAD_CHUNK_BYTES: ClassVar[int] = 1 << 20
+
+    # Larger PDFs (usually scanned exhibits) are skipped in favour of the HTML filing
+    MAX_PDF_BYTES: ClassVar[int] = 150 * 1024 * 1024
+
+    # A PDF whose first pages carry less text than this is taken to be image-only
+    SCANNED_PDF_SAMPLE_PAGES: ClassVar[int] = 3
+    SCANNED_PDF_MIN_CHARS: ClassVar[int] = 200
+
+    # PDFs longer than this are split across worker processes (PyMuPDF is not thread-safe);
+    # shorter ones aren't worth the process start-up
+    PARALLEL_PDF_MIN_PAGES: ClassVar[int] = 32
+
+    # Connection pool for the async path (requests are still paced by the shared throttle)
+    ASYNC_CONNECTION_LIMIT: ClassVar[int] = 20
+    ASYNC_CONNECTIONS_PER_HOST: ClassVar[int] = 10
+
+    def _get(self, url: str, timeout: float, stream: bool = False) -> requests.Response:
+        """GET an EDGAR URL over the shared session, within the process-wide rate limit"""
+        _edgar_throttle.wait()
+        return _edgar_session.get(url, headers=self.HEADERS, timeout=timeout, stream=stream)
+
+    def _conditional_headers(self, cached: Optional[Dict]) -> Dict[str, str]:
+        """Request headers revalidating a cached JSON document, if there is one"""
+        headers = dict(self.HEADERS)
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    @staticmethod
+    def _is_fresh(cached: Optional[Dict], max_age: float) -> bool:
+        """Whether a cached JSON document was fetched or revalidated within `max_age` seconds"""
+        return cached is not None and time.time() - cached.get("fetched_at", 0) < max_age
+
+    @staticmethod
+    def _remember_json(url: str, response_headers, body: Any):
+        """Keep a JSON document, with any validators the server sent, for later requests"""
+        _edgar_json_cache.put(url, {
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "body": body
+        })
+
+    @staticmethod
+    def _revalidated(url: str, cached: Dict) -> Any:
+        """Restart a cached document's freshness window after a 304; returns its body"""
+        _edgar_json_cache.put(url, {**cached, "fetched_at": time.time()})
+        return cached["body"]
+
+    def _get_json(self, url: str, timeout: float, max_age: float = 0) -> Any:
+        """
+        GET an EDGAR JSON document, revalidating the last copy with
+        If-None-Match / If-Modified-Since so unchanged documents come back as a 304.
+        A copy younger than `max_age` seconds is returned without any request.
+        """
+        cached = _edgar_json_cache.get(url)
+        if self._is_fresh(cached, max_age):
+            return cached["body"]
+        headers = self._conditional_headers(cached)
+
+        _edgar_throttle.wait()
+        response = _edgar_session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            return self._revalidated(url, cached)
+        response.raise_for_status()
+
+        body = response.json()
+        self._remember_json(url, response.headers, body)
+        return body
+
+    def _new_async_session(self) -> aiohttp.ClientSession:
+        """aiohttp session for the async download path; the caller closes it"""
+        return aiohttp.ClientSession(
+            headers=self.HEADERS,
+            connector=aiohttp.TCPConnector(limit=self.ASYNC_CONNECTION_LIMIT,
+                                           limit_per_host=self.ASYNC_CONNECTIONS_PER_HOST)
+        )
+
+    async def _aget_json(self, session: aiohttp.ClientSession, url: str, timeout: float,
+                         max_age: float = 0) -> Any:
+        """Async counterpart of _get_json(), sharing its conditional-GET cache"""
+        cached = await asyncio.to_thread(_edgar_json_cache.get, url)
+        if self._is_fresh(cached, max_age):
+            return cached["body"]
+        headers = self._conditional_headers(cached)
+
+        await _edgar_throttle.await_slot()
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            not_modified = response.status == 304 and cached is not None
+            if not not_modified:
+                response.raise_for_status()
+                # EDGAR sometimes labels JSON as text/html, so don't insist on the content type
+                body = await response.json(content_type=None)
+                response_headers = response.headers
+
+        if not_modified:
+            return await asyncio.to_thread(self._revalidated, url, cached)
+
+        await asyncio.to_thread(self._remember_json, url, response_headers, body)
+        return body
+
     def _run(self, ticker: str, filing_type: str = "10-K") -> Dict:
         """
         Download SEC filing as PDF and extract text
@@ -51,23 +329,20 @@ class SECDownloaderTool(BaseTool):
             # Step 1: Get CIK from ticker
             cik = self._get_cik(ticker)
             if not cik:
-                return {
-                    "success": False,
-                    "error": f"Could not find CIK for ticker {ticker}",
-                    "ticker": ticker
-                }
-
-            # Step 2: Get filing metadata and find PDF URL
-            filing_info = self._get_filing_info(cik, filing_type)
+                return self._failure(ticker, f"Could not find CIK for ticker {ticker}")
+
+            # Step 2: Get filing metadata, reusing the text if this filing was extracted before
+            filing_info = self._get_filing_info(cik, filing_type, find_pdf=False)
             if not filing_info:
-                return {
-                    "success": False,
-                    "error": f"Could not find {filing_type} filing for {ticker}",
-                    "ticker": ticker
-                }
+                return self._failure(ticker, f"Could not find {filing_type} filing for {ticker}")
+
+            cached = _filing_text_cache.get(self._filing_text_key(filing_info))
+            if cached is not None:
+                filing_info['pdf_url'] = cached.get('pdf_url')
+                return self._filing_result(ticker, filing_type, filing_info, cached.get('text'))
 
             # Step 3: Try to download PDF first, fallback to HTML
-            pdf_url = filing_info.get('pdf_url')
+            pdf_url = filing_info['pdf_url'] = self._find_pdf_url(filing_info['base_url'])
             text = None
 
             if pdf_url:
@@ -82,194 +357,422 @@ class SECDownloaderTool(BaseTool):
                 if html_content:
                     text = self._extract_text_from_html(html_content)
 
-            if not text:
-                return {
-                    "success": False,
-                    "error": "Failed to extract text from filing",
-                    "ticker": ticker
-                }
-
-            return {
-                "success": True,
-                "ticker": ticker.upper(),
-                "filing_type": filing_type,
-                "filing_date": filing_info.get('filing_date'),
-                "filing_url": pdf_url or filing_info.get('url'),
-                "company_name": filing_info.get('company_name'),
-                "full_text": text,
-                "full_text_length": len(text),
-                "truncated": False
-            }
+            if text:
+                self._remember_filing_text(filing_info, text)
+            return self._filing_result(ticker, filing_type, filing_info, text)
 
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "ticker": ticker
-            }
+            return self._failure(ticker, str(e))
+
+    async def _arun(self, ticker: str, filing_type: str = "10-K",
+                    session: Optional[aiohttp.ClientSession] = None) -> Dict:
+        """
+        Async counterpart of _run(): EDGAR requests go through aiohttp and text
+        extraction runs off the event loop (HTML in worker processes, PDFs on a thread),
+        so many filings can download at once.
+
+        Args:
+            ticker: Stock ticker symbol
+            filing_type: 10-K or 10-Q
+            session: Optional session to reuse; a new one is opened and closed otherwise
+
+        Returns:
+            dict with extracted text and metadata (same shape as _run)
+        """
+        if session is None:
+            async with self._new_async_session() as own_session:
+                return await self._arun(ticker, filing_type, own_session)
 
-    def _get_cik(self, ticker: str) -> Optional[str]:
-        """Get CIK number from ticker symbol"""
         try:
-            url = "https://www.sec.gov/files/company_tickers.json"
-            response = requests.get(url, headers=self.HEADERS, timeout=10)
-            response.raise_for_status()
+            cik = await self._aget_cik(session, ticker)
+            if not cik:
+                return self._failure(ticker, f"Could not find CIK for ticker {ticker}")
+
+            filing_info = await self._aget_filing_info(session, cik, filing_type, find_pdf=False)
+            if not filing_info:
+                return self._failure(ticker, f"Could not find {filing_type} filing for {ticker}")
+
+            cached = await asyncio.to_thread(_filing_text_cache.get, self._filing_text_key(filing_info))
+            if cached is not None:
+                filing_info['pdf_url'] = cached.get('pdf_url')
+                return self._filing_result(ticker, filing_type, filing_info, cached.get('text'))
+
+            pdf_url = filing_info['pdf_url'] = await self._afind_pdf_url(session, filing_info['base_url'])
+            text = None
 
-            data = response.json()
-            ticker_upper = ticker.upper()
+            if pdf_url:
+                print(f"Downloading PDF from: {pdf_url}")
+                text = await self._adownload_and_extract_pdf(session, pdf_url)
+
+            if not text:
+                print(f"PDF not available, falling back to HTML")
+                html_content = await self._adownload_filing(session, filing_info.get('url'))
+                if html_content:
+                    # Parsing is CPU-bound Python; a worker process keeps it off the event loop's GIL
+                    loop = asyncio.get_running_loop()
+                    text = await loop.run_in_executor(_get_html_parse_pool(), extract_html_text, html_content)
+
+            if text:
+                await asyncio.to_thread(self._remember_filing_text, filing_info, text)
+            return self._filing_result(ticker, filing_type, filing_info, text)
+
+        except Exception as e:
+            return self._failure(ticker, str(e))
+
+    async def run_many(self, tickers: List[str], filing_type: str = "10-K",
+                       concurrency: int = EDGAR_MAX_REQUESTS_PER_SECOND) -> List[Dict]:
+        """
+        Download the latest filing for several tickers over one aiohttp session.
+
+        At most `concurrency` downloads are in flight; the shared throttle keeps
+        the combined request rate within EDGAR's limit.
+
+        Returns:
+            One _run()-style result per ticker, in input order
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async with self._new_async_session() as session:
+            async def run_one(ticker: str) -> Dict:
+                async with semaphore:
+                    return await self._arun(ticker, filing_type, session)
+
+            return await asyncio.gather(*[run_one(ticker) for ticker in tickers])
+
+    @staticmethod
+    def _failure(ticker: str, error: str) -> Dict:
+        return {
+            "success": False,
+            "error": error,
+            "ticker": ticker
+        }
+
+    @staticmethod
+    def _filing_text_key(filing_info: Dict) -> str:
+        return f"v{FILING_TEXT_CACHE_VERSION}:{filing_info['accession_number']}"
+
+    @staticmethod
+    def _remember_filing_text(filing_info: Dict, text: str):
+        """Keep a filing's extracted text, and the PDF it may have come from, for later runs"""
+        _filing_text_cache.put(SECDownloaderTool._filing_text_key(filing_info), {
+            "pdf_url": filing_info.get('pdf_url'),
+            "text": text
+        })
+
+    @staticmethod
+    def _filing_result(ticker: str, filing_type: str, filing_info: Dict, text: Optional[str]) -> Dict:
+        """Result dict for a downloaded filing, or a failure if no text could be extracted"""
+        if not text:
+            return SECDownloaderTool._failure(ticker, "Failed to extract text from filing")
+
+        return {
+            "success": True,
+            "ticker": ticker.upper(),
+            "filing_type": filing_type,
+            "filing_date": filing_info.get('filing_date'),
+            "accession_number": filing_info.get('accession_number'),
+            "filing_url": filing_info.get('pdf_url') or filing_info.get('url'),
+            "company_name": filing_info.get('company_name'),
+            "full_text": text,
+            "full_text_length": len(text),
+            "truncated": False
+        }
+
+    def get_latest_filing_metadata(self, ticker: str, filing_type: str = "10-K") -> Optional[Dict]:
+        """
+        Look up the latest filing's metadata (accession number, date, company)
+        without downloading the document itself.
+
+        Returns:
+            dict with ticker, filing_type, filing_date, accession_number and
+            company_name, or None if the filing cannot be found
+        """
+        cik = self._get_cik(ticker)
+        if not cik:
+            return None
+
+        filing_info = self._get_filing_info(cik, filing_type, find_pdf=False)
+        if not filing_info:
+            return None
 
-            for entry in data.values():
-                if entry.get('ticker') == ticker_upper:
-                    cik = str(entry.get('cik_str'))
-                    return cik.zfill(10)
+        return {
+            "ticker": ticker.upper(),
+            "filing_type": filing_type,
+            "filing_date": filing_info.get('filing_date'),
+            "accession_number": filing_info.get('accession_number'),
+            "company_name": filing_info.get('company_name')
+        }
 
+    def _get_cik(self, ticker: str) -> Optional[str]:
+        """Get CIK number from ticker symbol"""
+        try:
+            ticker_ciks = _cached_ticker_ciks()
+            if ticker_ciks is None:
+                # One thread downloads the map; the others wait for it rather than repeat the fetch
+                with _ticker_ciks_lock:
+                    ticker_ciks = _cached_ticker_ciks()
+                    if ticker_ciks is None:
+                        ticker_ciks = _load_ticker_ciks(self._get_json(COMPANY_TICKERS_URL, timeout=10))
+            return ticker_ciks.get(ticker.upper())
+        except Exception as e:
+            print(f"Error getting CIK: {e}")
             return None
+
+    async def _aget_cik(self, session: aiohttp.ClientSession, ticker: str) -> Optional[str]:
+        """Async counterpart of _get_cik()"""
+        try:
+            ticker_ciks = _cached_ticker_ciks()
+            if ticker_ciks is None:
+                ticker_ciks = _load_ticker_ciks(await self._aget_json(session, COMPANY_TICKERS_URL, timeout=10))
+            return ticker_ciks.get(ticker.upper())
         except Exception as e:
             print(f"Error getting CIK: {e}")
             return None
 
-    def _get_filing_info(self, cik: str, filing_type: str) -> Optional[Dict]:
-        """Get filing metadata from SEC data API, including PDF URL"""
+    def _get_filing_info(self, cik: str, filing_type: str, find_pdf: bool = True) -> Optional[Dict]:
+        """Get filing metadata from SEC data API, including PDF URL unless find_pdf is False"""
         try:
             url = f"https://data.sec.gov/submissions/CIK{cik}.json"
-            response = requests.get(url, headers=self.HEADERS, timeout=15)
-            response.raise_for_status()
-
-            data = response.json()
-            company_name = data.get('name', '')
-
-            filings = data.get('filings', {}).get('recent', {})
-            forms = filings.get('form', [])
-            accession_numbers = filings.get('accessionNumber', [])
-            filing_dates = filings.get('filingDate', [])
-            primary_documents = filings.get('primaryDocument', [])
-
-            # Find the latest filing of requested type
-            for i, form in enumerate(forms):
-                if form == filing_type:
-                    accession = accession_numbers[i].replace('-', '')
-                    accession_dashed = accession_numbers[i]
-                    primary_doc = primary_documents[i]
-                    cik_clean = cik.lstrip('0')
-
-                    # Build URLs
-                    base_url = f"https://www.sec.gov/Archives/edgar/data/{cik_clean}/{accession}"
-                    html_url = f"{base_url}/{primary_doc}"
-
-                    # Try to find PDF in the filing directory
-                    pdf_url = self._find_pdf_url(base_url, cik_clean, accession)
-
-                    return {
-                        'url': html_url,
-                        'pdf_url': pdf_url,
-                        'filing_date': filing_dates[i],
-                        'accession_number': accession_dashed,
-                        'company_name': company_name,
-                        'primary_document': primary_doc,
-                        'base_url': base_url
-                    }
-
+            data = self._get_json(url, timeout=15, max_age=SUBMISSIONS_MAX_AGE_SECONDS)
+            filing_info = self._latest_filing(data, cik, filing_type)
+            if filing_info and find_pdf:
+                filing_info['pdf_url'] = self._find_pdf_url(filing_info['base_url'])
+            return filing_info
+        except Exception as e:
+            print(f"Error getting filing info: {e}")
             return None
+
+    async def _aget_filing_info(self, session: aiohttp.ClientSession, cik: str, filing_type: str,
+                                find_pdf: bool = True) -> Optional[Dict]:
+        """Async counterpart of _get_filing_info()"""
+        try:
+            url = f"https://data.sec.gov/submissions/CIK{cik}.json"
+            data = await self._aget_json(session, url, timeout=15, max_age=SUBMISSIONS_MAX_AGE_SECONDS)
+            filing_info = self._latest_filing(data, cik, filing_type)
+            if filing_info and find_pdf:
+                filing_info['pdf_url'] = await self._afind_pdf_url(session, filing_info['base_url'])
+            return filing_info
         except Exception as e:
             print(f"Error getting filing info: {e}")
             return None
 
-    def _find_pdf_url(self, base_url: str, cik: str, accession: str) -> Optional[str]:
+    @staticmethod
+    def _latest_filing(data: Dict, cik: str, filing_type: str) -> Optional[Dict]:
+        """Metadata and URLs of the latest filing of `filing_type` in a submissions document"""
+        company_name = data.get('name', '')
+
+        filings = data.get('filings', {}).get('recent', {})
+        forms = filings.get('form', [])
+        accession_numbers = filings.get('accessionNumber', [])
+        filing_dates = filings.get('filingDate', [])
+        primary_documents = filings.get('primaryDocument', [])
+
+        # Find the latest filing of requested type (EDGAR lists the newest first)
+        try:
+            i = forms.index(filing_type)
+        except ValueError:
+            return None
+
+        accession = accession_numbers[i].replace('-', '')
+        accession_dashed = accession_numbers[i]
+        primary_doc = primary_documents[i]
+        cik_clean = cik.lstrip('0')
+
+        # Build URLs
+        base_url = f"https://www.sec.gov/Archives/edgar/data/{cik_clean}/{accession}"
+        html_url = f"{base_url}/{primary_doc}"
+
+        return {
+            'url': html_url,
+            'pdf_url': None,
+            'filing_date': filing_dates[i],
+            'accession_number': accession_dashed,
+            'company_name': company_name,
+            'primary_document': primary_doc,
+            'base_url': base_url
+        }
+
+    def _find_pdf_url(self, base_url: str) -> Optional[str]:
         """Try to find PDF version of the filing"""
         try:
             # SEC provides a standard PDF link format
             # Try the filing index to find PDF
             index_url = f"{base_url}/index.json"
-            response = requests.get(index_url, headers=self.HEADERS, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                items = data.get('directory', {}).get('item', [])
-
-                for item in items:
-                    name = item.get('name', '').lower()
-                    # Look for PDF files (usually the main filing)
-                    if name.endswith('.pdf') and ('10-k' in name or '10k' in name or '10-q' in name or '10q' in name):
-                        return f"{base_url}/{item.get('name')}"
-
-                # If no specific 10-K PDF, look for any PDF
-                for item in items:
-                    name = item.get('name', '').lower()
-                    if name.endswith('.pdf') and 'ex' not in name:  # Exclude exhibits
-                        return f"{base_url}/{item.get('name')}"
-
-            return None
+            data = self._get_json(index_url, timeout=10, max_age=FILING_INDEX_MAX_AGE_SECONDS)
+            return self._pdf_from_index(base_url, data)
         except Exception as e:
             print(f"Error finding PDF: {e}")
             return None
 
-    def _download_and_extract_pdf(self, url: str) -> Optional[str]:
-        """Download PDF and extract text using pdfplumber"""
+    async def _afind_pdf_url(self, session: aiohttp.ClientSession, base_url: str) -> Optional[str]:
+        """Async counterpart of _find_pdf_url()"""
         try:
-            response = requests.get(url, headers=self.HEADERS, timeout=120)
-            response.raise_for_status()
+            index_url = f"{base_url}/index.json"
+            data = await self._aget_json(session, index_url, timeout=10, max_age=FILING_INDEX_MAX_AGE_SECONDS)
+            return self._pdf_from_index(base_url, data)
+        except Exception as e:
+            print(f"Error finding PDF: {e}")
+            return None
 
-            # Save to temp file
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-                tmp.write(response.content)
-                tmp_path = tmp.name
-
-            # Extract text from PDF
-            text_parts = []
-            with pdfplumber.open(tmp_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-
-                    # Also extract tables
-                    tables = page.extract_tables()
-                    for table in tables:
-                        if table:
-                            for row in table:
-                                if row:
-                                    row_text = ' | '.join([str(cell) if cell else '' for cell in row])
-                                    text_parts.append(row_text)
-
-            # Clean up temp file
-            os.unlink(tmp_path)
+    @staticmethod
+    def _pdf_from_index(base_url: str, data: Dict) -> Optional[str]:
+        """Pick the filing's PDF from a filing directory's index.json"""
+        fallback = None
+
+        for item in data.get('directory', {}).get('item', []):
+            name = item.get('name', '')
+            lowered = name.lower()
+            if not lowered.endswith('.pdf'):
+                continue
+            # A PDF named for the form is usually the main filing
+            if any(form in lowered for form in _FORM_PDF_NAMES):
+                return f"{base_url}/{name}"
+            # Otherwise the first PDF that isn't an exhibit
+            if fallback is None and 'ex' not in lowered:
+                fallback = name
+
+        return f"{base_url}/{fallback}" if fallback is not None else None
 
-            text = '\n'.join(text_parts)
+    def _download_and_extract_pdf(self, url: str) -> Optional[str]:
+        """Download PDF and extract text using PyMuPDF"""
+        try:
+            # Stream the body into one growing buffer instead of collecting chunks and joining them
+            pdf_bytes = bytearray()
+            with self._get(url, timeout=120, stream=True) as response:
+                response.raise_for_status()
+                content_length = response.headers.get('Content-Length')
+                if content_length and content_length.isdigit() and self._pdf_too_large(int(content_length)):
+                    return None
+                for chunk in response.iter_content(chunk_size=self.PDF_DOWNLOAD_CHUNK_BYTES):
+                    pdf_bytes += chunk
+                    if self._pdf_too_large(len(pdf_bytes)):
+                        return None
+
+            return self._extract_pdf_text(pdf_bytes)
 
-            # Clean up text
-            text = self._clean_text(text)
+        except Exception as e:
+            print(f"Error extracting PDF: {e}")
+            return None
 
-            return text if text else None
+    async def _adownload_and_extract_pdf(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """Async counterpart of _download_and_extract_pdf(); parsing runs on a worker thread"""
+        try:
+            pdf_bytes = bytearray()
+            await _edgar_throttle.await_slot()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=120)) as response:
+                response.raise_for_status()
+                if response.content_length is not None and self._pdf_too_large(response.content_length):
+                    return None
+                async for chunk in response.content.iter_chunked(self.PDF_DOWNLOAD_CHUNK_BYTES):
+                    pdf_bytes += chunk
+                    if self._pdf_too_large(len(pdf_bytes)):
+                        return None
+
+            return await asyncio.to_thread(self._extract_pdf_text, pdf_bytes)
 
         except Exception as e:
             print(f"Error extracting PDF: {e}")
             return None
 
+    def _pdf_too_large(self, size: int) -> bool:
+        """Whether a PDF of `size` bytes (declared or downloaded so far) is over MAX_PDF_BYTES"""
+        if size > self.MAX_PDF_BYTES:
+            print(f"PDF exceeds {self.MAX_PDF_BYTES // (1024 * 1024)} MB, skipping it")
+            return True
+        return False
+
+    def _extract_pdf_text(self, pdf_bytes: bytearray) -> Optional[str]:
+        """Text and table rows of a PDF, cleaned; None if it has no text or looks scanned"""
+        # Extract text from PDF, parsed straight from the downloaded bytes
+        text_parts = []
+        with pymupdf.open(stream=pdf_bytes, filetype="pdf") as pdf:
+            page_count = pdf.page_count
+
+            # Image-only PDFs yield next to no text without OCR; the HTML filing is better
+            sample_chars = sum(len(pdf[i].get_text("text").strip())
+                               for i in range(min(page_count, self.SCANNED_PDF_SAMPLE_PAGES)))
+            if sample_chars < self.SCANNED_PDF_MIN_CHARS:
+                print("PDF appears to be scanned images, skipping it")
+                return None
+
+            # Already in a worker process (e.g. the API's download pool): don't fan out again
+            workers = min(PDF_PARSE_PROCESSES, page_count // self.PARALLEL_PDF_MIN_PAGES)
+            if multiprocessing.parent_process() is not None:
+                workers = 1
+            if workers < 2:
+                for page in pdf:
+                    text_parts.extend(_page_text_parts(page))
+
+        if workers >= 2:
+            text_parts = self._extract_pdf_parallel(pdf_bytes, page_count, workers)
+
+        text = '\n'.join(text_parts)
+        # The per-row strings add up to the whole text again; free them before cleaning copies it
+        del text_parts
+
+        # Clean up text
+        text = self._clean_text(text)
+
+        return text if text else None
+
+    @staticmethod
+    def _extract_pdf_parallel(pdf_bytes: bytearray, page_count: int, workers: int) -> List[str]:
+        """Split a long PDF into contiguous page ranges, one per pool worker, joined in page order"""
+        # Workers open the file themselves, so the PDF is written once instead of pickled per task
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+            tmp.write(pdf_bytes)
+            tmp_path = tmp.name
+
+        try:
+            bounds = [page_count * i // workers for i in range(workers + 1)]
+            ranges = _get_pdf_parse_pool().map(_extract_pdf_pages, [tmp_path] * workers, bounds[:-1], bounds[1:])
+            return [part for text_parts in ranges for part in text_parts]
+        finally:
+            os.unlink(tmp_path)
+
     def _download_filing(self, url: str) -> Optional[str]:
         """Download HTML filing from SEC EDGAR"""
         try:
-            response = requests.get(url, headers=self.HEADERS, timeout=60)
+            response = self._get(url, timeout=60)
             response.raise_for_status()
             return response.text
         except requests.RequestException as e:
             print(f"Error downloading filing: {e}")
             return None
 
+    async def _adownload_filing(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """Async counterpart of _download_filing()"""
+        try:
+            await _edgar_throttle.await_slot()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=60)) as response:
+                response.raise_for_status()
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error downloading filing: {e}")
+            return None
+
     def _extract_text_from_html(self, html_content: str) -> str:
         """
         Extract text from HTML filing with proper table preservation.
         Tables are converted to markdown format to preserve financial data structure.
+        Uses selectolax's C parser when installed, BeautifulSoup otherwise.
         """
+        # Inline XBRL roughly doubles the node count of a modern 10-K without adding text
+        html_content = _IXBRL_TAG_RE.sub('', _IXBRL_HEADER_RE.sub('', html_content))
+
+        if LexborHTMLParser is not None:
+            return self._extract_text_from_html_lexbor(html_content)
+
         from bs4 import BeautifulSoup
 
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, _HTML_PARSER)
 
         # Remove script, style, and other non-content elements
-        for element in soup(['script', 'style', 'meta', 'link', 'head', 'noscript']):
+        for element in soup(_NON_CONTENT_TAGS):
             element.decompose()
 
         # Remove hidden elements
-        for element in soup.find_all(style=re.compile(r'display:\s*none', re.IGNORECASE)):
+        for element in soup.find_all(style=_HIDDEN_STYLE_RE):
             element.decompose()
 
         # Process tables FIRST - convert to markdown format
@@ -284,11 +787,105 @@ class SECDownloaderTool(BaseTool):
                 table.replace_with(placeholder)
 
         # Now extract text with structure preserved
+        block_texts, strings = self._walk_block_texts(soup)
+        return self._structured_text(block_texts, lambda: '\n'.join(strings))
+
+    @staticmethod
+    def _walk_block_texts(soup):
+        """
+        get_text(strip=True) of every block element, in document order, plus the stripped
+        strings of the whole document, from a single walk of the tree. Each block's text is
+        a join over the slice of strings seen while it was open, instead of a fresh walk of
+        its descendants per block.
+        """
+        from bs4 import CData, NavigableString, Tag
+
+        block_tags = set(_TEXT_BLOCK_TAGS)
+        block_texts = []
+        strings = []
+        # Each frame: (iterator over a node's children, (slot, first string) if it is a block)
+        stack = [(iter(soup.contents), None)]
+        while stack:
+            children, block = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if block is not None:
+                    slot, start = block
+                    block_texts[slot] = ''.join(strings[start:])
+            elif isinstance(child, Tag):
+                block = None
+                if child.name in block_tags:
+                    block = (len(block_texts), len(strings))
+                    block_texts.append(None)
+                stack.append((iter(child.contents), block))
+            # Same strings get_text() considers: no comments, doctypes, etc.
+            elif type(child) in (NavigableString, CData):
+                stripped = child.strip()
+                if stripped:
+                    strings.append(stripped)
+
+        return block_texts, strings
+
+    def _extract_text_from_html_lexbor(self, html_content: str) -> str:
+        """_extract_text_from_html() on selectolax's Lexbor parser; produces the same text"""
+        tree = LexborHTMLParser(html_content)
+
+        # Remove script, style, and other non-content elements
+        tree.strip_tags(_NON_CONTENT_TAGS)
+
+        # Remove hidden elements; nested ones go with their hidden ancestor
+        hidden = [node for node in tree.css('[style]') if _HIDDEN_STYLE_RE.search(node.attributes.get('style') or '')]
+        for node in self._outermost(hidden):
+            node.decompose()
+
+        # Tables to markdown; a table inside a converted table is already covered by it
+        tables = tree.css('table')
+        markdown_tables = {table.mem_id: self._lexbor_table_to_markdown(table) for table in tables}
+        converted = [table for table in tables if markdown_tables[table.mem_id]]
+        for table in self._outermost(converted):
+            placeholder = LexborHTMLParser('<div></div>').css_first('div')
+            placeholder.insert_child(f"\n\n{markdown_tables[table.mem_id]}\n\n")
+            table.replace_with(placeholder)
+
+        return self._structured_text(
+            (node.text(deep=True, separator='', strip=True) for node in tree.css(', '.join(_TEXT_BLOCK_TAGS))),
+            # Lexbor keeps a separator for text nodes that strip to nothing; drop those
+            lambda: '\n'.join(filter(None, tree.root.text(deep=True, separator='\0', strip=True).split('\0')))
+        )
+
+    def _lexbor_table_to_markdown(self, table) -> Optional[str]:
+        """_table_to_markdown() for a Lexbor node"""
+        trs = table.css('tr')
+        if len(trs) < 2:
+            return None
+        return self._rows_to_markdown([
+            [cell.text(deep=True, separator='', strip=True) for cell in tr.css('th, td')]
+            for tr in trs
+        ])
+
+    @staticmethod
+    def _outermost(nodes: List) -> List:
+        """Nodes (in document order) that have no ancestor among `nodes`; found before any are detached"""
+        ids = {node.mem_id for node in nodes}
+        outermost = []
+        for node in nodes:
+            parent = node.parent
+            while parent is not None and parent.mem_id not in ids:
+                parent = parent.parent
+            if parent is None:
+                outermost.append(node)
+        return outermost
+
+    def _structured_text(self, block_texts, full_text) -> str:
+        """
+        Join the text of each block element, marking SEC section headers. Falls back to
+        `full_text()` when too few blocks were found for the structure to be meaningful.
+        """
         text_parts = []
 
         # Process the document maintaining structure
-        for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'div', 'span', 'li']):
-            text = element.get_text(strip=True)
+        for text in block_texts:
             if text and len(text) > 1:
                 # Identify SEC section headers
                 if self._is_sec_section_header(text):
@@ -298,7 +895,7 @@ class SECDownloaderTool(BaseTool):
 
         # If structured extraction didn't work well, fall back to full text
         if len(text_parts) < 100:
-            text = soup.get_text(separator='\n', strip=True)
+            text = full_text()
         else:
             text = '\n'.join(text_parts)
 
@@ -309,16 +906,25 @@ class SECDownloaderTool(BaseTool):
         Convert HTML table to markdown format, preserving financial data.
         Returns None if table is empty or invalid.
         """
+        # Extract all rows (including header rows); get cell text, preserving numbers
+        trs = table.find_all('tr')
+        if len(trs) < 2:  # can't make a table; skip reading its cells
+            return None
+        return self._rows_to_markdown([
+            [cell.get_text(strip=True) for cell in tr.find_all(['th', 'td'])]
+            for tr in trs
+        ])
+
+    @staticmethod
+    def _rows_to_markdown(cell_texts: List[List[str]]) -> Optional[str]:
+        """Markdown table from per-row cell texts; None if fewer than two non-empty rows"""
         rows = []
 
-        # Extract all rows (including header rows)
-        for tr in table.find_all('tr'):
+        for row_texts in cell_texts:
             cells = []
-            for cell in tr.find_all(['th', 'td']):
-                # Get cell text, preserving numbers
-                cell_text = cell.get_text(strip=True)
+            for cell_text in row_texts:
                 # Clean up but preserve financial formatting
-                cell_text = re.sub(r'\s+', ' ', cell_text)
+                cell_text = _WHITESPACE_RE.sub(' ', cell_text)
                 # Handle empty cells
                 if not cell_text:
                     cell_text = '-'
@@ -333,55 +939,75 @@ class SECDownloaderTool(BaseTool):
         # Normalize column count
         max_cols = max(len(row) for row in rows)
         for row in rows:
-            while len(row) < max_cols:
-                row.append('-')
-
-        # Build markdown table
-        markdown_lines = []
-
-        # Header row
-        markdown_lines.append('| ' + ' | '.join(rows[0]) + ' |')
-
-        # Separator row
-        markdown_lines.append('| ' + ' | '.join(['---'] * max_cols) + ' |')
+            row.extend(['-'] * (max_cols - len(row)))
 
-        # Data rows
-        for row in rows[1:]:
-            markdown_lines.append('| ' + ' | '.join(row) + ' |')
-
-        return '\n'.join(markdown_lines)
+        # Build markdown table: header row, separator row, then data rows, in one join
+        rows.insert(1, ['---'] * max_cols)
+        return '\n'.join(['| ' + ' | '.join(row) + ' |' for row in rows])
 
     def _is_sec_section_header(self, text: str) -> bool:
         """Check if text is an SEC filing section header (Item 1, Item 1A, etc.)"""
-        sec_headers = [
-            r'^ITEM\s+\d+[A-Z]?\b',
-            r'^PART\s+[IVX]+\b',
-            r'^SIGNATURES?\b',
-            r'^EXHIBIT\s+INDEX\b',
-            r'^FINANCIAL\s+STATEMENTS\b',
-            r'^MANAGEMENT.S\s+DISCUSSION\b',
-            r'^RISK\s+FACTORS\b',
-            r'^BUSINESS\b',
-            r'^PROPERTIES\b',
-            r'^LEGAL\s+PROCEEDINGS\b',
-        ]
-        text_upper = text.upper().strip()
-        return any(re.match(pattern, text_upper) for pattern in sec_headers)
+        return _SEC_HEADER_RE.match(text.upper().strip()) is not None
 
     def _clean_text(self, text: str) -> str:
         """Clean extracted text"""
         # Remove excessive whitespace
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        text = re.sub(r' {2,}', ' ', text)
-        text = re.sub(r'_{3,}', '', text)
+        text = _BLANK_LINES_RE.sub('\n\n', text)
+        text = _SPACE_RUN_RE.sub(' ', text)
+        text = _UNDERSCORE_RUN_RE.sub('', text)
 
         # Remove common artifacts
-        text = re.sub(r'http://[^\s]+', '', text)
-        text = re.sub(r'https://[^\s]+', '', text)
+        text = _URL_RE.sub('', text)
 
         return text.strip()
 
 
+@functools.lru_cache(maxsize=None)
+def _get_worker_downloader() -> SECDownloaderTool:
+    """This process's downloader, created on first use"""
+    return SECDownloaderTool()
+
+
+def download_filing(ticker: str, filing_type: str = "10-K") -> Dict:
+    """
+    Download and extract a filing with a per-process downloader.
+
+    Top-level so it can be sent to a ProcessPoolExecutor, keeping PDF/HTML text
+    extraction off the caller's GIL.
+    """
+    return _get_worker_downloader()._run(ticker, filing_type)
+
+
+def extract_html_text(html_content: str) -> str:
+    """Text of an HTML filing; top-level so it can be sent to a ProcessPoolExecutor"""
+    return _get_worker_downloader()._extract_text_from_html(html_content)
+
+
+# Worker processes parsing HTML filings for the async download path
+HTML_PARSE_PROCESSES = os.cpu_count() or 1
+
+
+@functools.lru_cache(maxsize=None)
+def _get_html_parse_pool() -> ProcessPoolExecutor:
+    """Process pool for HTML parsing, started on first use"""
+    # spawn: forking would copy the event loop's threads and locks into the workers
+    return ProcessPoolExecutor(max_workers=HTML_PARSE_PROCESSES,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+# Worker processes splitting long PDFs; bounded so concurrent downloads don't
+# each claim every core
+PDF_PARSE_PROCESSES = min(os.cpu_count() or 1, 4)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_pdf_parse_pool() -> ProcessPoolExecutor:
+    """Process pool for long PDFs, started on first use"""
+    # spawn: this is reached from worker threads, and forking a threaded process can deadlock
+    return ProcessPoolExecutor(max_workers=PDF_PARSE_PROCESSES,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
 # Test function
 if __name__ == "__main__":
     tool = SECDownloaderTool()